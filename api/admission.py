@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+# Per-stage defaults: (max concurrent workers, max queued waiters, deadline s).
+# Each limit can be overridden with VERICLAIM_<STAGE>_CONCURRENCY,
+# VERICLAIM_<STAGE>_QUEUE and VERICLAIM_<STAGE>_DEADLINE.
+# keywords is the keyword-only NLP fallback, record the claim history insert.
+STAGE_DEFAULTS = {
+    'velocity': (8, 32, 0.5),
+    'nlp':      (4, 16, 2.0),
+    'keywords': (4, 16, 0.5),
+    'damage':   (4, 16, 5.0),
+    'photo':    (4, 16, 1.0),
+    'fraud':    (8, 32, 1.0),
+    'record':   (4, 32, 2.0),
+    'shap':     (2,  8, 2.0),
+}
+
+# Degradation steps, cheapest to lose first, and the load (in-flight requests
+# / VERICLAIM_MAX_IN_FLIGHT) at which each one kicks in.
+DEFAULT_DEGRADE_ORDER = 'shap,semantic_nlp'
+DEFAULT_DEGRADE_AT    = '0.5,0.75'
+
+
+class Overloaded(Exception):
+    """Raised when a request or a required stage cannot be admitted."""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f'{stage} is at capacity')
+        self.stage       = stage
+        self.retry_after = retry_after
+
+
+class StageTimeout(Exception):
+    """Raised when a stage misses its deadline."""
+
+    def __init__(self, stage: str, deadline: float):
+        super().__init__(f'{stage} exceeded its {deadline:.1f}s deadline')
+        self.stage = stage
+
+
+class StageGate:
+    """
+    Bounded worker pool for one pipeline stage.
+
+    At most `concurrency` calls run at once and at most `queue_limit` wait
+    for a slot; beyond that run() fails fast with Overloaded. Each call gets
+    `deadline` seconds from arrival, covering both queueing and running.
+    Calls run on the gate's own `concurrency` threads, not the shared
+    default executor, so a slow stage cannot starve the others of threads.
+    A call that times out keeps its slot until its thread really finishes,
+    so a slow model cannot be oversubscribed by retries.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_limit: int,
+                 deadline: float, retry_after: int):
+        self.name        = name
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.deadline    = deadline
+        self.retry_after = retry_after
+
+        self._slots    = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f'stage-{name}')
+        self._waiting  = 0
+        self._running  = 0
+
+    def snapshot(self) -> dict:
+        return {
+            'running':     self._running,
+            'waiting':     self._waiting,
+            'concurrency': self.concurrency,
+            'queue_limit': self.queue_limit,
+            'deadline_s':  self.deadline,
+        }
+
+    def _release(self, _future=None):
+        self._running -= 1
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        loop  = asyncio.get_running_loop()
+        start = loop.time()
+
+        # Counted synchronously: the semaphore is only acquired once the
+        # wait_for task runs, too late to bound the queue
+        if self._running + self._waiting >= self.concurrency + self.queue_limit:
+            raise Overloaded(self.name, self.retry_after)
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise StageTimeout(self.name, self.deadline)
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        future    = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        remaining = max(self.deadline - (loop.time() - start), 0.0)
+        try:
+            # shield: a timeout must not mark the thread's future as done
+            return await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise StageTimeout(self.name, self.deadline)
+        finally:
+            if future.done():
+                self._release()
+            else:
+                future.add_done_callback(self._release)
+
+
+class AdmissionController:
+    """
+    Request-level admission plus per-stage gates for the claim router.
+
+    acquire() / admit() bound the number of requests in flight and reject
+    the rest with Overloaded. plan() turns the current load into the set of
+    degradation steps to apply to a newly admitted request.
+    """
+
+    def __init__(self, max_in_flight: int, gates: dict, degrade_order: list,
+                 degrade_at: list, retry_after: int):
+        if len(degrade_order) != len(degrade_at):
+            raise ValueError('degrade_order and degrade_at must have the same length')
+        self.max_in_flight = max_in_flight
+        self.gates         = gates
+        self.degrade_order = degrade_order
+        self.degrade_at    = degrade_at
+        self.retry_after   = retry_after
+        self._in_flight    = 0
+
+    @classmethod
+    def from_env(cls, env=os.environ):
+        retry_after = int(env.get('VERICLAIM_RETRY_AFTER', 2))
+        gates = {}
+        for stage, (concurrency, queue_limit, deadline) in STAGE_DEFAULTS.items():
+            prefix = f'VERICLAIM_{stage.upper()}'
+            gates[stage] = StageGate(
+                name        = stage,
+                concurrency = int(env.get(f'{prefix}_CONCURRENCY', concurrency)),
+                queue_limit = int(env.get(f'{prefix}_QUEUE',       queue_limit)),
+                deadline    = float(env.get(f'{prefix}_DEADLINE',  deadline)),
+                retry_after = retry_after,
+            )
+        order = [s.strip() for s in env.get('VERICLAIM_DEGRADE_ORDER', DEFAULT_DEGRADE_ORDER).split(',') if s.strip()]
+        at    = [float(x) for x in env.get('VERICLAIM_DEGRADE_AT', DEFAULT_DEGRADE_AT).split(',') if x.strip()]
+        return cls(
+            max_in_flight = int(env.get('VERICLAIM_MAX_IN_FLIGHT', 32)),
+            gates         = gates,
+            degrade_order = order,
+            degrade_at    = at,
+            retry_after   = retry_after,
+        )
+
+    @property
+    def load(self) -> float:
+        return self._in_flight / self.max_in_flight
+
+    def acquire(self) -> set:
+        """
+        Admit one request or raise Overloaded. Returns the degradation steps
+        to apply to it; every successful acquire() needs a release().
+        """
+        if self._in_flight >= self.max_in_flight:
+            raise Overloaded('api', self.retry_after)
+        self._in_flight += 1
+        return self.plan()
+
+    def release(self):
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        degrade = self.acquire()
+        try:
+            yield degrade
+        finally:
+            self.release()
+
+    def plan(self) -> set:
+        load = self.load
+        return {
+            step for step, threshold in zip(self.degrade_order, self.degrade_at)
+            if load >= threshold
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            'in_flight':     self._in_flight,
+            'max_in_flight': self.max_in_flight,
+            'load':          round(self.load, 3),
+            'degraded':      sorted(self.plan()),
+            'stages':        {name: gate.snapshot() for name, gate in self.gates.items()},
+        }
@@ -1,11 +1,16 @@
+import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.routers.claim import router as claim_router
 
 from models.damage_classifier.predict import load_model
+from models.damage_classifier.photo_index import load_photo_index, save_photo_index
 from models.claim_nlp.embed import load_nlp_model
-from models.fraud_classifier.predict import load_fraud_model
+from models.claim_nlp.text_index import load_text_index, save_text_index
+from models.fraud_classifier.predict import load_fraud_model, get_monitoring_reference
 from models.fraud_classifier.shap_explain import load_explainer
+from models.fraud_classifier.claim_history import load_claim_history, get_claim_history
+from models.drift_monitor import load_drift_monitor, save_drift_monitor
 
 
 @asynccontextmanager
@@ -16,9 +21,19 @@ async def lifespan(app: FastAPI):
     load_nlp_model('models/claim_nlp/fraud_patterns.json')
     load_fraud_model('models/fraud_classifier/xgb_fraud_model.pkl')
     load_explainer('models/fraud_classifier/xgb_fraud_model.pkl')
+    # Claim history, indexes and drift counts; the load test points this elsewhere
+    data_dir = os.environ.get('VERICLAIM_DATA_DIR', 'data')
+    load_claim_history(os.path.join(data_dir, 'claim_history.db'))
+    load_photo_index(os.path.join(data_dir, 'photo_index'))
+    load_text_index(os.path.join(data_dir, 'text_index'))
+    load_drift_monitor(os.path.join(data_dir, 'drift_monitor.npz'), reference=get_monitoring_reference())
     print('All models loaded. API ready.')
     yield
-    # Shutdown — nothing to clean up
+    # Shutdown — flush the indexes and drift counts, close the claim history store
+    save_photo_index()
+    save_text_index()
+    save_drift_monitor()
+    get_claim_history().close()
 
 
 app = FastAPI(
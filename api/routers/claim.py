@@ -1,76 +1,297 @@
 import json
 import io
+import logging
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
 from PIL import Image
 
-from api.schemas import ClaimInput, FraudPredictionResponse, SHAPFactor
+from api.admission import AdmissionController, Overloaded, StageTimeout
+from api.schemas import ClaimInput, FraudPredictionResponse
 from models.damage_classifier.predict import predict_damage
-from models.claim_nlp.anomaly_score import score_text
-from models.fraud_classifier.predict import predict_fraud
+from models.fraud_classifier.predict import predict_fraud, get_thresholds
 from models.fraud_classifier.shap_explain import explain
+from models.drift_monitor import get_drift_monitor, observe_prediction
+from models.pipeline import (
+    DEFAULT_NLP_RESULT, nlp_stage, velocity_stage, run_photo_match, record_claim,
+    build_summary
+)
 
-router = APIRouter()
+router    = APIRouter()
+logger    = logging.getLogger(__name__)
+admission = AdmissionController.from_env()
 
 
-@router.post('/predict/fraud', response_model=FraudPredictionResponse)
-async def predict_fraud_endpoint(
-    image:      UploadFile = File(...),
-    claim_data: str        = Form(...)
-):
-    # Parse claim JSON
+def _parse_claim(claim_data: str) -> ClaimInput:
     try:
         claim_dict = json.loads(claim_data)
-        claim      = ClaimInput(**claim_dict)
+        return ClaimInput(**claim_dict)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f'Invalid claim_data: {e}')
 
-    # Step 1 — DL: damage severity from image
+
+async def _read_image(image: UploadFile) -> Image.Image:
     try:
-        img_bytes    = await image.read()
-        pil_img      = Image.open(io.BytesIO(img_bytes)).convert('RGB')
-        damage_result = predict_damage(pil_img)
+        img_bytes = await image.read()
+        return Image.open(io.BytesIO(img_bytes)).convert('RGB')
     except Exception as e:
         raise HTTPException(status_code=422, detail=f'Image processing failed: {e}')
 
-    # Step 2 — NLP: anomaly score from incident description
-    nlp_result = {
-        'anomaly_score':      0.0,
-        'triggered_keywords': [],
-        'top_fraud_pattern':  None
-    }
-    if claim.incident_description:
-        try:
-            nlp_result = score_text(claim.incident_description)
-        except Exception:
-            pass  # NLP failure is non-fatal, use defaults
+
+def _unavailable(e: Exception) -> HTTPException:
+    # Overload and missed deadlines on a required stage both mean "try again"
+    retry_after = getattr(e, 'retry_after', admission.retry_after)
+    return HTTPException(
+        status_code = 503,
+        detail      = str(e),
+        headers     = {'Retry-After': str(retry_after)}
+    )
+
+
+def _skip_reason(e: Exception) -> str:
+    if isinstance(e, Overloaded):
+        return 'overload'
+    if isinstance(e, StageTimeout):
+        return 'timeout'
+    return 'error'
+
+
+async def _run_stages(pil_img, claim_dict: dict, degrade: set, skipped: list):
+    """
+    Async counterpart of models.pipeline.run_pipeline that runs each model
+    through its admission gate. Yields (stage, result) like run_pipeline and
+    appends {'stage', 'reason'} to skipped for every stage it drops.
+
+    Damage and fraud are required: overload or a missed deadline raises 503,
+    a model error 422 / 500. NLP falls back to keyword-only scoring and SHAP
+    is dropped, either because the degradation plan says so or because
+    their gate is full, late or failing. Velocity and photo matching are
+    dropped when their gate is full, late or failing. Every call, fallbacks
+    included, goes through a gate, so shed work never turns into unbounded
+    threads.
+    """
+    gates    = admission.gates
+    claim_id = claim_dict.get('claim_id')
+
+    # Step 0 — Claim history: velocity per policy / vehicle / workshop
+    try:
+        velocity = await gates['velocity'].run(velocity_stage, claim_dict)
+    except Exception as e:
+        reason = _skip_reason(e)
+        logger.warning('Velocity stage %s', reason, exc_info=reason == 'error')
+        skipped.append({'stage': 'velocity', 'reason': reason})
+        velocity = None
+    yield 'velocity', velocity
+
+    # Step 1 — NLP: semantic + keyword score, keyword-only when degraded
+    description = claim_dict.get('incident_description')
+    semantic    = 'semantic_nlp' not in degrade
+    if not semantic:
+        skipped.append({'stage': 'semantic_nlp', 'reason': 'degraded'})
+    try:
+        nlp_result   = await gates['nlp'].run(nlp_stage, description, claim_id, semantic)
+        semantic_ran = semantic
+    except Exception as e:
+        semantic_ran = False
+        reason = _skip_reason(e)
+        logger.warning('NLP stage %s', reason, exc_info=reason == 'error')
+        if semantic and reason != 'error':
+            # Keyword scoring needs no model. A timed-out call is still
+            # running and will index the text itself.
+            skipped.append({'stage': 'semantic_nlp', 'reason': reason})
+            try:
+                nlp_result = await gates['keywords'].run(
+                    nlp_stage, description, claim_id, False, isinstance(e, Overloaded)
+                )
+            except Exception as fallback_error:
+                reason = _skip_reason(fallback_error)
+                logger.warning('Keyword NLP fallback %s', reason, exc_info=reason == 'error')
+                skipped.append({'stage': 'nlp', 'reason': reason})
+                nlp_result = dict(DEFAULT_NLP_RESULT)
+        else:
+            skipped.append({'stage': 'nlp', 'reason': reason})
+            nlp_result = dict(DEFAULT_NLP_RESULT)
+    yield 'nlp', nlp_result
+
+    # Step 2 — DL: damage severity from image
+    try:
+        damage_result = await gates['damage'].run(predict_damage, pil_img, return_embedding=True)
+    except (Overloaded, StageTimeout) as e:
+        raise _unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f'Image processing failed: {e}')
+    embedding = damage_result.pop('embedding')
+    yield 'damage', damage_result
+
+    # Step 2b — Photo fingerprint: near-duplicates across past claims
+    try:
+        photo_matches = await gates['photo'].run(run_photo_match, pil_img, embedding, claim_id)
+    except (Overloaded, StageTimeout) as e:
+        reason = _skip_reason(e)
+        logger.warning('Photo stage %s', reason)
+        skipped.append({'stage': 'photo', 'reason': reason})
+        photo_matches = []
+    yield 'photo', photo_matches
 
     # Step 3 — XGBoost: fraud probability
     try:
-        fraud_result = predict_fraud(
-            claim_dict   = claim.dict(),
-            damage_pred  = damage_result
-        )
+        fraud_result = await gates['fraud'].run(predict_fraud, claim_dict, damage_pred=damage_result)
+    except (Overloaded, StageTimeout) as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Fraud model error: {e}')
+    # Count the claim towards velocity only once it has been scored. A
+    # timed-out insert still completes; a rejected one is only logged, as
+    # the response does not depend on it.
+    try:
+        await gates['record'].run(record_claim, claim_dict)
+    except (Overloaded, StageTimeout) as e:
+        logger.warning('Claim history insert %s: %s', _skip_reason(e), e)
 
-    # Step 4 — SHAP explanation
+    # Drift monitoring: a fixed-size histogram update, cheap enough to run
+    # inline. Keyword-only NLP scores come from a different distribution,
+    # so they are left out rather than reported as drift.
     try:
-        shap_result  = explain(claim.dict())
-        shap_factors = [
-            SHAPFactor(feature=f['feature'], impact=f['impact'])
-            for f in shap_result['top_factors']
-        ]
+        observe_prediction(
+            claim_dict,
+            fraud_result['fraud_probability'],
+            anomaly_score     = nlp_result.get('anomaly_score') if semantic_ran else None,
+            damage_confidence = damage_result.get('confidence'),
+        )
     except Exception:
-        shap_factors = []
-
-    return FraudPredictionResponse(
-        fraud_probability  = fraud_result['fraud_probability'],
-        fraud_flag         = fraud_result['fraud_flag'],
-        risk_level         = fraud_result['risk_level'],
-        recommendation     = fraud_result['recommendation'],
-        damage_severity    = damage_result['severity'],
-        damage_confidence  = damage_result['confidence'],
-        anomaly_score      = nlp_result.get('anomaly_score'),
-        triggered_keywords = nlp_result.get('triggered_keywords', []),
-        top_shap_factors   = shap_factors
-    )
\ No newline at end of file
+        logger.warning('Drift monitor update failed', exc_info=True)
+    yield 'fraud', fraud_result
+
+    # Step 4 — SHAP explanation, first to go under load
+    explanation = {'top_factors': []}
+    if 'shap' in degrade:
+        skipped.append({'stage': 'shap', 'reason': 'degraded'})
+    else:
+        try:
+            explanation = await gates['shap'].run(explain, claim_dict)
+        except Exception as e:
+            reason = _skip_reason(e)
+            logger.warning('SHAP stage %s', reason, exc_info=reason == 'error')
+            skipped.append({'stage': 'shap', 'reason': reason})
+    yield 'explanation', explanation
+
+
+class _AdmittedStream(StreamingResponse):
+    """
+    StreamingResponse holding an admission slot. The slot is released when
+    the body finishes, or when the response ends without the body ever
+    being iterated (client gone before the first byte, send failure).
+    """
+
+    def __init__(self, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            admission.release()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+@router.post('/predict/fraud', response_model=FraudPredictionResponse)
+async def predict_fraud_endpoint(
+    image:      UploadFile = File(...),
+    claim_data: str        = Form(...)
+):
+    # Parse claim JSON
+    claim   = _parse_claim(claim_data)
+    pil_img = await _read_image(image)
+
+    try:
+        async with admission.admit() as degrade:
+            results = {'skipped': []}
+            async for stage, result in _run_stages(
+                pil_img, claim.dict(), degrade, results['skipped']
+            ):
+                results[stage] = result
+    except Overloaded as e:
+        raise _unavailable(e)
+
+    return FraudPredictionResponse(**build_summary(results))
+
+
+@router.post('/predict/fraud/stream')
+async def predict_fraud_stream_endpoint(
+    image:      UploadFile = File(...),
+    claim_data: str        = Form(...)
+):
+    """
+    Streaming variant of /predict/fraud. Responds with NDJSON, one record
+    per line, in the order the stages finish:
+
+        {"stage": "velocity",    "data": {...} | null}
+        {"stage": "nlp",         "data": {...}}
+        {"stage": "damage",      "data": {...}}
+        {"stage": "photo",       "data": [...]}
+        {"stage": "fraud",       "data": {...}}
+        {"stage": "explanation", "data": {...}}
+        {"stage": "summary",     "data": <FraudPredictionResponse>}
+
+    A failure after streaming has started is reported as a final
+    {"stage": "error", "detail": ...} record instead of an HTTP status.
+    """
+    # Input errors and overload are still reported with a status code
+    claim   = _parse_claim(claim_data)
+    pil_img = await _read_image(image)
+    try:
+        degrade = admission.acquire()
+    except Overloaded as e:
+        raise _unavailable(e)
+
+    async def records():
+        results = {'skipped': []}
+        try:
+            async for stage, result in _run_stages(
+                pil_img, claim.dict(), degrade, results['skipped']
+            ):
+                results[stage] = result
+                yield json.dumps({'stage': stage, 'data': result}) + '\n'
+            summary = FraudPredictionResponse(**build_summary(results))
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield json.dumps({'stage': 'error', 'detail': detail}) + '\n'
+            return
+        finally:
+            # Free the slot as soon as the models are done, not when the
+            # client has read the last line
+            response.release()
+        yield json.dumps({'stage': 'summary', 'data': summary.dict()}) + '\n'
+
+    try:
+        response = _AdmittedStream(records(), media_type='application/x-ndjson')
+    except Exception:
+        admission.release()
+        raise
+    return response
+
+
+@router.get('/admission')
+def admission_status():
+    """Current in-flight load, active degradation steps and per-stage queues."""
+    return admission.snapshot()
+
+
+@router.get('/monitoring/drift')
+def drift_status():
+    """
+    Population stability (PSI) of fraud scores, NLP anomaly scores, damage
+    confidence and every fraud feature over the recent window, against the
+    model's reference profile, plus the decision thresholds in use.
+    Categorical features are tracked by their raw category, so they report
+    PSI but no mean or std.
+    """
+    monitor = get_drift_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail='Drift monitor not loaded')
+    return {'thresholds': get_thresholds(), **monitor.snapshot()}
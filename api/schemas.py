@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+import datetime
+from pydantic import BaseModel, validator
+from typing import Optional, List, Dict
 
 
 class ClaimInput(BaseModel):
@@ -39,12 +40,47 @@ class ClaimInput(BaseModel):
     # Extra fields used by other modules but not XGBoost
     incident_description:   Optional[str] = None
 
+    # Claim history keys for velocity features
+    claim_id:               Optional[str] = None
+    policy_number:          Optional[str] = None
+    vehicle_id:             Optional[str] = None
+    workshop_id:            Optional[str] = None
+    incident_date:          Optional[str] = None   # ISO date, defaults to today
+
+    @validator('incident_date')
+    def incident_date_is_iso(cls, value):
+        if value is None:
+            return value
+        try:
+            day = datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            raise ValueError('incident_date must be an ISO date (YYYY-MM-DD)')
+        if day > datetime.date.today():
+            raise ValueError('incident_date is in the future')
+        return value
+
 
 class SHAPFactor(BaseModel):
     feature: str
     impact:  float
 
 
+class PhotoMatch(BaseModel):
+    claim_id:       str
+    hash_distance:  Optional[int]     # pHash Hamming distance (0 = identical)
+    similarity:     Optional[float]   # backbone embedding cosine similarity
+
+
+class TextMatch(BaseModel):
+    claim_id:       str
+    similarity:     float             # shingle Jaccard of the descriptions
+
+
+class StageSkip(BaseModel):
+    stage:          str               # shap / semantic_nlp / nlp / velocity / photo
+    reason:         str               # degraded / overload / timeout / error
+
+
 class FraudPredictionResponse(BaseModel):
     fraud_probability:   float
     fraud_flag:          bool
@@ -58,6 +94,14 @@ class FraudPredictionResponse(BaseModel):
     # NLP module output
     anomaly_score:       Optional[float]
     triggered_keywords:  Optional[List[str]]
+    similar_claims:      List[TextMatch] = []   # near-duplicate past narratives
 
     # XGBoost SHAP output
-    top_shap_factors:    List[SHAPFactor]
\ No newline at end of file
+    top_shap_factors:    List[SHAPFactor]
+
+    # Claim history and photo fingerprint output
+    claim_velocity:      Optional[Dict[str, int]] = None
+    duplicate_photos:    List[PhotoMatch] = []
+
+    # Stages dropped under load or on failure
+    skipped_stages:      List[StageSkip] = []
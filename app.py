@@ -1,6 +1,13 @@
 import streamlit as st
+import atexit
+import io
+import json
+import os
 import sys
+import time
 from pathlib import Path
+
+import pandas as pd
 from PIL import Image
 
 # ── Path fix (critical for Streamlit Cloud) ───────────────────────────────────
@@ -77,16 +84,276 @@ def load_all_models():
     from models.claim_nlp.embed import load_nlp_model
     from models.fraud_classifier.predict import load_fraud_model
     from models.fraud_classifier.shap_explain import load_explainer
+    from models.fraud_classifier.claim_history import load_claim_history
+    from models.damage_classifier.photo_index import load_photo_index, save_photo_index
+    from models.claim_nlp.text_index import load_text_index, save_text_index
 
     base = Path(__file__).resolve().parent
     load_damage(str(base / 'models/damage_classifier/best_model.pt'))
     load_nlp_model(str(base / 'models/claim_nlp/fraud_patterns.json'))
     load_fraud_model(str(base / 'models/fraud_classifier/xgb_fraud_model.pkl'))
     load_explainer(str(base / 'models/fraud_classifier/xgb_fraud_model.pkl'))
+
+    # Same claim history and indexes as the API, so velocity, duplicate
+    # photos and similar claims match what api/main.py returns
+    data_dir = base / os.environ.get('VERICLAIM_DATA_DIR', 'data')
+    load_claim_history(str(data_dir / 'claim_history.db'))
+    load_photo_index(str(data_dir / 'photo_index'))
+    load_text_index(str(data_dir / 'text_index'))
+    # No shutdown hook in Streamlit: write out what the periodic flushes missed
+    atexit.register(save_photo_index)
+    atexit.register(save_text_index)
     return True
 
 models_loaded = load_all_models()
 
+# ── Result cards ──────────────────────────────────────────────────────────────
+# Each renderer writes one card into an st.empty() slot so the results panel
+# can be filled in stage by stage while the pipeline is still running.
+def render_pending_card(slot, label):
+    slot.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">{label}</div>
+        <div class="metric-value" style="color:#1e3a5f; font-size:1.4rem;">···</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_fraud_card(slot, fraud_result):
+    prob      = fraud_result['fraud_probability']
+    risk      = fraud_result['risk_level']
+    prob_pct  = int(prob * 100)
+    bar_color = '#ff4444' if risk == 'HIGH' else '#ffaa00' if risk == 'MEDIUM' else '#00cc66'
+    slot.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Fraud Probability</div>
+        <div class="metric-value risk-{risk}">{prob_pct}%</div>
+        <div class="prob-bar-container">
+            <div class="prob-bar-fill" style="width:{prob_pct}%; background:{bar_color};"></div>
+        </div>
+        <div style="font-size:0.8rem; color:#4a7a9b;">
+            Risk Level: <span class="risk-{risk}" style="font-weight:bold;">{risk}</span>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_recommendation_card(slot, fraud_result):
+    slot.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Recommendation</div>
+        <div style="font-size:1rem; color:#c8d8e8; margin-top:0.3rem;">
+            {fraud_result['recommendation']}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_damage_card(slot, damage_result):
+    sev       = damage_result['severity']
+    sev_color = '#ff4444' if sev == 'severe' else '#ffaa00' if sev == 'moderate' else '#00cc66'
+    slot.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Damage Severity</div>
+        <div class="metric-value" style="color:{sev_color}; font-size:1.4rem;">{sev.upper()}</div>
+        <div style="font-size:0.75rem; color:#4a7a9b;">Confidence: {int(damage_result['confidence']*100)}%</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_nlp_card(slot, nlp_result):
+    nlp_pct   = int((nlp_result.get('anomaly_score', 0) or 0) * 100)
+    nlp_color = '#ff4444' if nlp_pct > 60 else '#ffaa00' if nlp_pct > 30 else '#00cc66'
+    slot.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">NLP Anomaly Score</div>
+        <div class="metric-value" style="color:{nlp_color}; font-size:1.4rem;">{nlp_pct}%</div>
+        <div style="font-size:0.75rem; color:#4a7a9b;">Description analysis</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_keywords(slot, keywords):
+    # Triggered keywords
+    if not keywords:
+        return
+    kw_html = ''.join([f'<span class="keyword-tag">⚠ {kw}</span>' for kw in keywords])
+    slot.markdown(
+        '<div class="section-label">Flagged Keywords</div>'
+        f'<div style="padding:0.5rem 0">{kw_html}</div>',
+        unsafe_allow_html=True
+    )
+
+
+def render_shap_factors(slot, shap_factors):
+    # SHAP factors
+    if not shap_factors:
+        return
+    shap_html = '<div class="section-label">Top Risk Factors</div><div class="metric-card">'
+    for factor in shap_factors:
+        impact     = factor['impact']
+        impact_cls = 'shap-positive' if impact > 0 else 'shap-negative'
+        arrow      = '▲' if impact > 0 else '▼'
+        shap_html += f"""
+        <div class="shap-row">
+            <div style="color:#c8d8e8;">{factor['feature']}</div>
+            <div class="{impact_cls}">{arrow} {abs(impact):.4f}</div>
+        </div>"""
+    shap_html += '</div>'
+    slot.markdown(shap_html, unsafe_allow_html=True)
+
+
+def render_status(slot, message, complete):
+    dot = '<span class="status-dot"></span>' if complete else ''
+    slot.markdown(f"""
+    <div style="margin-top:1rem; font-family:'Share Tech Mono',monospace;
+                font-size:0.7rem; color:#1e3a5f; text-align:right;">
+        {dot}
+        {message}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_stage(slots, stage, result):
+    if stage == 'nlp':
+        render_nlp_card(slots['nlp'], result)
+        render_keywords(slots['keywords'], result.get('triggered_keywords', []))
+    elif stage == 'damage':
+        render_damage_card(slots['damage'], result)
+    elif stage == 'fraud':
+        render_fraud_card(slots['fraud'], result)
+        render_recommendation_card(slots['recommendation'], result)
+    elif stage == 'explanation':
+        render_shap_factors(slots['shap'], result.get('top_factors', []))
+
+
+# ── Review queue (bulk triage) ────────────────────────────────────────────────
+QUEUE_PAGE_SIZES = [25, 50, 100, 250]
+QUEUE_SORT_COLS  = {
+    'Fraud probability': 'fraud_probability',
+    'Anomaly score':     'anomaly_score',
+    'Damage confidence': 'damage_confidence',
+    'Duplicate photos':  'duplicate_photos',
+    'Similar claims':    'similar_claims',
+    'Claim ID':          'claim_id',
+}
+IMAGE_COLUMNS = ('image', 'image_path', 'photo')
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def parse_claims_csv(csv_bytes: bytes):
+    """Claims CSV -> (claim dicts with ClaimInput defaults, row errors)."""
+    from api.schemas import ClaimInput
+
+    df = pd.read_csv(io.BytesIO(csv_bytes), dtype=str)
+    claims, errors = [], []
+    for i, record in enumerate(df.to_dict('records')):
+        record = {k: v for k, v in record.items() if isinstance(v, str) and v.strip()}
+        try:
+            claim = ClaimInput(**record).dict()
+        except Exception as e:
+            errors.append(f'Row {i + 1}: {e}')
+            continue
+        # File name of the claim's photo inside the zip, if given
+        claim['image'] = next((record[c] for c in IMAGE_COLUMNS if c in record), None)
+        claims.append(claim)
+    return claims, errors
+
+
+def upload_hash(*uploads):
+    # Hash each upload once per session; reruns reuse it by file_id
+    from models.review_queue import input_hash
+
+    hashes = st.session_state.setdefault('upload_hashes', {})
+    key    = tuple(u.file_id for u in uploads)
+    if key not in hashes:
+        hashes[key] = input_hash(*[u.getvalue() for u in uploads])
+    return hashes[key]
+
+
+def render_review_queue():
+    from models.review_queue import get_job, start_job
+
+    st.markdown('<div class="section-label">01 / Claims CSV + Damage Photos</div>', unsafe_allow_html=True)
+    st.caption(
+        'One claim per CSV row, using the API field names. Photos are matched by an '
+        '`image` column (file name inside the zip) or by `claim_id`.'
+    )
+    col_csv, col_zip, col_batch = st.columns([2, 2, 1])
+    csv_file   = col_csv.file_uploader('Claims CSV', type=['csv'])
+    zip_file   = col_zip.file_uploader('Photos (zip)', type=['zip'])
+    batch_size = col_batch.selectbox('Batch size', [8, 16, 32, 64], index=2)
+
+    if not (csv_file and zip_file):
+        st.info('Upload a claims CSV and a zip of damage photos to build the review queue.')
+        return
+
+    job_key = upload_hash(csv_file, zip_file)
+    job     = get_job(job_key)
+    claims, errors = parse_claims_csv(csv_file.getvalue())
+    for err in errors[:10]:
+        st.warning(err)
+
+    if job is None:
+        if not st.button(f'⬡  SCORE {len(claims)} CLAIMS', use_container_width=True):
+            return
+        job = start_job(job_key, claims, zip_file.getvalue(), batch_size)
+
+    st.markdown('<div class="section-label">02 / Review Queue</div>', unsafe_allow_html=True)
+    st.progress(job.progress, text=f'{job.done} / {job.total} claims scored')
+    if job.error:
+        st.error(f'Scoring stopped: {job.error}')
+
+    rows = job.results()
+    if rows:
+        df = pd.DataFrame(rows)
+
+        col_sort, col_dir, col_size, col_page = st.columns([2, 1, 1, 1])
+        sort_label = col_sort.selectbox('Sort by', list(QUEUE_SORT_COLS))
+        descending = col_dir.selectbox('Order', ['Descending', 'Ascending']) == 'Descending'
+        page_size  = col_size.selectbox('Rows per page', QUEUE_PAGE_SIZES)
+        n_pages    = max(1, -(-len(df) // page_size))
+        page       = col_page.number_input('Page', min_value=1, max_value=n_pages, value=1)
+
+        # Sort the whole queue, then show one page of it
+        sort_col = QUEUE_SORT_COLS[sort_label]
+        if sort_col in df.columns:
+            df = df.sort_values(sort_col, ascending=not descending, na_position='last')
+        start = (page - 1) * page_size
+        st.dataframe(
+            df.iloc[start:start + page_size],
+            use_container_width = True,
+            hide_index          = True,
+            column_config       = {
+                'fraud_probability': st.column_config.ProgressColumn(
+                    'Fraud probability', min_value=0.0, max_value=1.0, format='%.2f'
+                ),
+            }
+        )
+        st.caption(f'Page {page} of {n_pages} · {len(df)} claims')
+
+        if not job.running:
+            st.download_button(
+                'Download results (CSV)', df.to_csv(index=False).encode(),
+                file_name='vericlaim_review_queue.csv', mime='text/csv'
+            )
+
+    # Poll while the background job runs; scored rows come from the job,
+    # so a rerun only re-renders
+    if job.running:
+        time.sleep(1.0)
+        st.rerun()
+
+
+mode = st.radio(
+    'Mode', ['Single claim', 'Review queue'],
+    horizontal=True, label_visibility='collapsed'
+)
+if mode == 'Review queue':
+    render_review_queue()
+    st.stop()
+
+
 # ── Layout ────────────────────────────────────────────────────────────────────
 left_col, right_col = st.columns([1, 1], gap='large')
 
@@ -99,9 +366,12 @@ with left_col:
         type=['jpg', 'jpeg', 'png'],
         label_visibility='collapsed'
     )
+    pil_img = None
     if uploaded_file:
-        img = Image.open(uploaded_file)
-        st.image(img, use_column_width=True)
+        # Decoded once; the same image is shown and scored
+        image_bytes = uploaded_file.getvalue()
+        pil_img     = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        st.image(pil_img, use_column_width=True)
 
     st.markdown('<div class="scan-line"></div>', unsafe_allow_html=True)
     st.markdown('<div class="section-label">02 / Claim Details</div>', unsafe_allow_html=True)
@@ -134,10 +404,60 @@ with left_col:
     st.markdown('<br>', unsafe_allow_html=True)
     analyse_btn = st.button('⬡  ANALYSE CLAIM', use_container_width=True)
 
+    # Build claim dict with 31 XGBoost features
+    claim_dict = {
+        'Month':                'Jan',
+        'WeekOfMonth':          1,
+        'DayOfWeek':            'Monday',
+        'Make':                 make,
+        'AccidentArea':         accident_area,
+        'DayOfWeekClaimed':     'Monday',
+        'MonthClaimed':         'Jan',
+        'WeekOfMonthClaimed':   1,
+        'Sex':                  'Male',
+        'MaritalStatus':        'Single',
+        'Age':                  int(age),
+        'Fault':                fault,
+        'PolicyType':           f'{vehicle_category} - Liability',
+        'VehicleCategory':      vehicle_category,
+        'VehiclePrice':         'more than 69000',
+        'RepNumber':            1,
+        'Deductible':           int(deductible),
+        'DriverRating':         int(driver_rating),
+        'Days_Policy_Accident': 'more than 30',
+        'Days_Policy_Claim':    'more than 30',
+        'PastNumberOfClaims':   past_claims,
+        'AgeOfVehicle':         '3 years',
+        'AgeOfPolicyHolder':    '26 to 30',
+        'PoliceReportFiled':    police_report,
+        'WitnessPresent':       witness,
+        'AgentType':            agent_type,
+        'NumberOfSuppliments':  'none',
+        'AddressChange_Claim':  '1 year',
+        'NumberOfCars':         '1 vehicle',
+        'Year':                 2024,
+        'BasePolicy':           base_policy,
+    }
+
+# Results are memoized per input, so reruns (widget changes, page refreshes)
+# show the stored analysis instead of running the models again
+claim_results = st.session_state.setdefault('claim_results', {})
+claim_key     = None
+if pil_img is not None:
+    from models.review_queue import input_hash
+    claim_key = input_hash(
+        image_bytes,
+        json.dumps({'claim': claim_dict, 'description': description}, sort_keys=True).encode()
+    )
+cached_stages = claim_results.get(claim_key)
+show_results  = analyse_btn or (
+    cached_stages is not None and st.session_state.get('last_claim_key') == claim_key
+)
+
 # ══ RIGHT PANEL ═══════════════════════════════════════════════════════════════
 with right_col:
 
-    if not analyse_btn:
+    if not show_results:
         st.markdown("""
         <div style="height:500px; display:flex; flex-direction:column; align-items:center;
                     justify-content:center; border:1px dashed #1e3a5f; border-radius:4px;
@@ -152,162 +472,57 @@ with right_col:
         """, unsafe_allow_html=True)
 
     else:
-        if not uploaded_file:
+        if pil_img is None:
             st.error('Please upload a vehicle damage image before analysing.')
             st.stop()
 
-        with st.spinner('Analysing claim...'):
-            try:
-                from models.damage_classifier.predict import predict_damage
-                from models.claim_nlp.anomaly_score import score_text
-                from models.fraud_classifier.predict import predict_fraud
-                from models.fraud_classifier.shap_explain import explain
-
-                # Step 1 — Damage severity from image
-                pil_img       = Image.open(uploaded_file).convert('RGB')
-                damage_result = predict_damage(pil_img)
-
-                # Step 2 — NLP anomaly score
-                nlp_result = {'anomaly_score': 0.0, 'triggered_keywords': []}
-                if description:
-                    try:
-                        nlp_result = score_text(description)
-                    except Exception:
-                        pass
-
-                # Step 3 — Build claim dict with 31 XGBoost features
-                claim_dict = {
-                    'Month':                'Jan',
-                    'WeekOfMonth':          1,
-                    'DayOfWeek':            'Monday',
-                    'Make':                 make,
-                    'AccidentArea':         accident_area,
-                    'DayOfWeekClaimed':     'Monday',
-                    'MonthClaimed':         'Jan',
-                    'WeekOfMonthClaimed':   1,
-                    'Sex':                  'Male',
-                    'MaritalStatus':        'Single',
-                    'Age':                  int(age),
-                    'Fault':                fault,
-                    'PolicyType':           f'{vehicle_category} - Liability',
-                    'VehicleCategory':      vehicle_category,
-                    'VehiclePrice':         'more than 69000',
-                    'RepNumber':            1,
-                    'Deductible':           int(deductible),
-                    'DriverRating':         int(driver_rating),
-                    'Days_Policy_Accident': 'more than 30',
-                    'Days_Policy_Claim':    'more than 30',
-                    'PastNumberOfClaims':   past_claims,
-                    'AgeOfVehicle':         '3 years',
-                    'AgeOfPolicyHolder':    '26 to 30',
-                    'PoliceReportFiled':    police_report,
-                    'WitnessPresent':       witness,
-                    'AgentType':            agent_type,
-                    'NumberOfSuppliments':  'none',
-                    'AddressChange_Claim':  '1 year',
-                    'NumberOfCars':         '1 vehicle',
-                    'Year':                 2024,
-                    'BasePolicy':           base_policy,
-                }
-
-                # Step 4 — Fraud prediction
-                fraud_result = predict_fraud(claim_dict, damage_pred=damage_result)
-
-                # Step 5 — SHAP explanation
-                try:
-                    shap_result  = explain(claim_dict)
-                    shap_factors = shap_result.get('top_factors', [])
-                except Exception:
-                    shap_factors = []
-
-            except Exception as e:
-                st.error(f'Analysis failed: {e}')
-                st.stop()
+        from models.pipeline import run_pipeline
 
         # ── Results ──────────────────────────────────────────────────────────
-        prob      = fraud_result['fraud_probability']
-        risk      = fraud_result['risk_level']
-        prob_pct  = int(prob * 100)
-        bar_color = '#ff4444' if risk == 'HIGH' else '#ffaa00' if risk == 'MEDIUM' else '#00cc66'
-
+        # Every card gets a placeholder up front and is filled in as soon as
+        # its stage finishes, so fast stages show before SHAP completes.
         st.markdown('<div class="section-label">Analysis Results</div>', unsafe_allow_html=True)
 
-        # Fraud probability
-        st.markdown(f"""
-        <div class="metric-card">
-            <div class="metric-label">Fraud Probability</div>
-            <div class="metric-value risk-{risk}">{prob_pct}%</div>
-            <div class="prob-bar-container">
-                <div class="prob-bar-fill" style="width:{prob_pct}%; background:{bar_color};"></div>
-            </div>
-            <div style="font-size:0.8rem; color:#4a7a9b;">
-                Risk Level: <span class="risk-{risk}" style="font-weight:bold;">{risk}</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Recommendation
-        st.markdown(f"""
-        <div class="metric-card">
-            <div class="metric-label">Recommendation</div>
-            <div style="font-size:1rem; color:#c8d8e8; margin-top:0.3rem;">
-                {fraud_result['recommendation']}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Damage + NLP side by side
+        slots = {
+            'fraud':          st.empty(),
+            'recommendation': st.empty(),
+        }
         mc1, mc2 = st.columns(2)
-        with mc1:
-            sev       = damage_result['severity']
-            sev_color = '#ff4444' if sev == 'severe' else '#ffaa00' if sev == 'moderate' else '#00cc66'
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">Damage Severity</div>
-                <div class="metric-value" style="color:{sev_color}; font-size:1.4rem;">{sev.upper()}</div>
-                <div style="font-size:0.75rem; color:#4a7a9b;">Confidence: {int(damage_result['confidence']*100)}%</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with mc2:
-            nlp_pct   = int((nlp_result.get('anomaly_score', 0) or 0) * 100)
-            nlp_color = '#ff4444' if nlp_pct > 60 else '#ffaa00' if nlp_pct > 30 else '#00cc66'
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-label">NLP Anomaly Score</div>
-                <div class="metric-value" style="color:{nlp_color}; font-size:1.4rem;">{nlp_pct}%</div>
-                <div style="font-size:0.75rem; color:#4a7a9b;">Description analysis</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Triggered keywords
-        keywords = nlp_result.get('triggered_keywords', [])
-        if keywords:
-            st.markdown('<div class="section-label">Flagged Keywords</div>', unsafe_allow_html=True)
-            kw_html = ''.join([f'<span class="keyword-tag">⚠ {kw}</span>' for kw in keywords])
-            st.markdown(f'<div style="padding:0.5rem 0">{kw_html}</div>', unsafe_allow_html=True)
-
-        # SHAP factors
-        if shap_factors:
-            st.markdown('<div class="section-label">Top Risk Factors</div>', unsafe_allow_html=True)
-            shap_html = '<div class="metric-card">'
-            for factor in shap_factors:
-                impact     = factor['impact']
-                impact_cls = 'shap-positive' if impact > 0 else 'shap-negative'
-                arrow      = '▲' if impact > 0 else '▼'
-                shap_html += f'''
-                <div class="shap-row">
-                    <div style="color:#c8d8e8;">{factor['feature']}</div>
-                    <div class="{impact_cls}">{arrow} {abs(impact):.4f}</div>
-                </div>'''
-            shap_html += '</div>'
-            st.markdown(shap_html, unsafe_allow_html=True)
+        slots.update({
+            'damage':         mc1.empty(),
+            'nlp':            mc2.empty(),
+            'keywords':       st.empty(),
+            'shap':           st.empty(),
+        })
+        status_slot = st.empty()
+
+        if cached_stages is not None:
+            for stage, result in cached_stages:
+                render_stage(slots, stage, result)
+        else:
+            for key, label in [
+                ('fraud',          'Fraud Probability'),
+                ('recommendation', 'Recommendation'),
+                ('damage',         'Damage Severity'),
+                ('nlp',            'NLP Anomaly Score'),
+            ]:
+                render_pending_card(slots[key], label)
+            render_status(status_slot, 'ANALYSING CLAIM', complete=False)
+
+            stages = []
+            try:
+                for stage, result in run_pipeline(pil_img, claim_dict, description):
+                    render_stage(slots, stage, result)
+                    stages.append((stage, result))
+            except Exception as e:
+                status_slot.empty()
+                st.error(f'Analysis failed: {e}')
+                st.stop()
+
+            claim_results[claim_key] = stages
+            while len(claim_results) > 20:
+                claim_results.pop(next(iter(claim_results)))
+        st.session_state['last_claim_key'] = claim_key
 
         # Status footer
-        st.markdown("""
-        <div style="margin-top:1rem; font-family:'Share Tech Mono',monospace;
-                    font-size:0.7rem; color:#1e3a5f; text-align:right;">
-            <span class="status-dot"></span>
-            ANALYSIS COMPLETE · ALL MODULES ACTIVE
-        </div>
-        """, unsafe_allow_html=True)
+        render_status(status_slot, 'ANALYSIS COMPLETE · ALL MODULES ACTIVE', complete=True)
@@ -5,6 +5,7 @@ from models.claim_nlp.embed import (
     get_patterns,
     get_keywords
 )
+from models.claim_nlp.text_index import get_text_index
 
 KEYWORD_WEIGHTS = {
     'total loss':      0.40,
@@ -29,9 +30,12 @@ KEYWORD_WEIGHTS = {
 }
 
 
-def score_text(incident_text: str) -> dict:
+def score_text(incident_text: str, claim_id=None, semantic: bool = True) -> dict:
     """
     Score a free-text incident description for fraud signals.
+    claim_id, if given, is excluded from similar_claims (re-scoring).
+    semantic=False skips the sentence embedding (keyword-only scoring),
+    which the API uses as a cheap fallback under overload.
 
     Returns dict with:
         anomaly_score      : float 0.0 to 1.0 (higher = more suspicious)
@@ -39,6 +43,8 @@ def score_text(incident_text: str) -> dict:
         keyword_score      : float (weighted keyword matches)
         triggered_keywords : list of matched keywords
         top_fraud_pattern  : the closest matching known fraud pattern
+        similar_claims     : prior claims with near-duplicate descriptions,
+                             [{'claim_id', 'similarity'}] best first
     """
     if not incident_text or len(incident_text.strip()) < 3:
         return {
@@ -46,7 +52,8 @@ def score_text(incident_text: str) -> dict:
             'semantic_score':     0.0,
             'keyword_score':      0.0,
             'triggered_keywords': [],
-            'top_fraud_pattern':  None
+            'top_fraud_pattern':  None,
+            'similar_claims':     []
         }
 
     text_lower = incident_text.lower().strip()
@@ -55,7 +62,7 @@ def score_text(incident_text: str) -> dict:
     pattern_embeddings = get_pattern_embeddings()
     patterns           = get_patterns()
 
-    if pattern_embeddings is not None:
+    if semantic and pattern_embeddings is not None:
         text_emb  = embed_text(incident_text)
         sims      = np.dot(pattern_embeddings, text_emb)
         max_sim   = float(sims.max())
@@ -80,6 +87,13 @@ def score_text(incident_text: str) -> dict:
             keyword_score = min(1.0, keyword_score + 0.15)
             triggered.append(kw)
 
+    # Layer 3 — near-duplicate narratives from past claims (MinHash LSH)
+    text_index     = get_text_index()
+    similar_claims = (
+        text_index.query(incident_text, exclude_claim_id=claim_id)
+        if text_index is not None else []
+    )
+
     # Combine: semantic 60% + keyword 40%
     combined = min(1.0, (max_sim * 0.6) + (keyword_score * 0.4))
 
@@ -88,5 +102,6 @@ def score_text(incident_text: str) -> dict:
         'semantic_score':     round(max_sim,        4),
         'keyword_score':      round(keyword_score,  4),
         'triggered_keywords': triggered,
-        'top_fraud_pattern':  top_pattern
+        'top_fraud_pattern':  top_pattern,
+        'similar_claims':     similar_claims
     }
\ No newline at end of file
@@ -0,0 +1,335 @@
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from models.segment_store import SegmentStore, write_arrays
+
+NUM_PERM   = 128          # MinHash permutations per signature
+BANDS      = 32           # LSH bands; BANDS * ROWS must equal NUM_PERM
+ROWS       = NUM_PERM // BANDS
+SHINGLE_N  = 5            # character n-gram size
+
+MIN_JACCARD    = 0.5      # shingle Jaccard needed to report a match
+MAX_CANDIDATES = 200      # candidates re-ranked exactly per query
+MAX_BUCKET     = 1000     # band buckets larger than this are boilerplate; skipped
+ESTIMATE_SLACK = 0.15     # MinHash estimate may undershoot Jaccard by this much
+
+_PRIME      = np.uint64(4294967291)   # largest prime below 2^32
+_TOKEN_RE   = re.compile(r'[a-z0-9]+')
+
+_rng        = np.random.default_rng(1337)
+_PERM_A     = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_PERM_B     = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_BAND_MULT  = _rng.integers(1, 1 << 62, ROWS, dtype=np.uint64) | np.uint64(1)
+
+# Stored band keys carry their band number in the top bits, so all bands
+# of a segment sort into one array and a query probes it in one call
+_TAG_BITS   = np.uint64((BANDS - 1).bit_length())
+_TAG_SHIFT  = np.uint64(64) - _TAG_BITS
+_BAND_TAGS  = np.arange(BANDS, dtype=np.uint64) << _TAG_SHIFT
+
+_index = None
+
+
+def shingles(text: str) -> set:
+    """
+    Character n-gram shingles of the normalised description. Character
+    shingles tolerate the small word edits fraud rings make between reuses
+    far better than word n-grams on texts this short.
+    """
+    normalised = ' '.join(_TOKEN_RE.findall(str(text).lower()))
+    if len(normalised) < SHINGLE_N:
+        return {normalised} if normalised else set()
+    return {
+        normalised[i:i + SHINGLE_N]
+        for i in range(len(normalised) - SHINGLE_N + 1)
+    }
+
+
+def minhash(shingle_set: set) -> np.ndarray:
+    """NUM_PERM-value MinHash signature using (a*x + b) mod p permutations."""
+    if not shingle_set:
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    # crc32 is stable across processes, unlike hash()
+    x = np.fromiter(
+        (zlib.crc32(s.encode('utf-8')) for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set)
+    ) % _PRIME
+    # a, b, x < 2^32, so a*x + b cannot overflow uint64
+    hashed = (x[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _PRIME
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> np.ndarray:
+    """One 64-bit key per band, mixing that band's ROWS signature values."""
+    rows = signature.reshape(BANDS, ROWS).astype(np.uint64)
+    return (rows * _BAND_MULT[None, :]).sum(axis=1, dtype=np.uint64)
+
+
+def _tag_keys(keys: np.ndarray) -> np.ndarray:
+    """Band-tagged keys from band_keys() output; the first axis is the band."""
+    tags = _BAND_TAGS.reshape((BANDS,) + (1,) * (keys.ndim - 1))
+    return tags | (keys >> _TAG_BITS)
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Unsaved:
+    """Claims not yet in a segment, in small in-memory band tables."""
+
+    def __init__(self):
+        self.claim_ids  = []
+        self.texts      = []
+        self.signatures = []
+        self.keys       = []                # band-tagged, one (BANDS,) array per claim
+        self.table      = defaultdict(list)
+
+    def __len__(self):
+        return len(self.claim_ids)
+
+    def add(self, claim_id: str, text: str, signature: np.ndarray, keys: np.ndarray):
+        row = len(self.claim_ids)
+        self.claim_ids.append(claim_id)
+        self.texts.append(text)
+        self.signatures.append(signature)
+        self.keys.append(keys)
+        for key in keys.tolist():
+            self.table[key].append(row)
+
+    def buckets(self, keys: np.ndarray) -> list:
+        return [self.table[key] for key in keys.tolist() if key in self.table]
+
+    def signatures_for(self, rows) -> np.ndarray:
+        return np.stack([self.signatures[row] for row in rows])
+
+    def claim_id(self, row: int) -> str:
+        return self.claim_ids[row]
+
+    def text(self, row: int) -> str:
+        return self.texts[row]
+
+
+class _Segment:
+    """
+    One immutable, memory-mapped directory of indexed claims: the sorted
+    band-tagged keys of every band with their row ids, signatures, and
+    claim IDs and descriptions as UTF-8 blobs plus offsets.
+    """
+
+    FILES = ('band_keys', 'band_rows', 'signatures', 'text_blob', 'text_offsets',
+             'id_blob', 'id_offsets')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.FILES:
+            # Plain ndarray views of the maps: slicing a np.memmap is slower
+            setattr(self, name, np.asarray(np.load(os.path.join(path, name + '.npy'), mmap_mode='r')))
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def buckets(self, keys: np.ndarray) -> list:
+        lo = np.searchsorted(self.band_keys, keys, side='left').tolist()
+        hi = np.searchsorted(self.band_keys, keys, side='right').tolist()
+        return [self.band_rows[a:b] for a, b in zip(lo, hi) if a < b]
+
+    def signatures_for(self, rows) -> np.ndarray:
+        return self.signatures[np.asarray(rows)]
+
+    def claim_id(self, row: int) -> str:
+        return _blob_str(self.id_blob, self.id_offsets, row)
+
+    def text(self, row: int) -> str:
+        return _blob_str(self.text_blob, self.text_offsets, row)
+
+    def keys_by_row(self) -> np.ndarray:
+        # Undo the sort to get (BANDS, n) keys back in row order
+        keys = np.empty((BANDS, len(self)), dtype=np.uint64)
+        keys[(self.band_keys >> _TAG_SHIFT).astype(np.intp), self.band_rows] = self.band_keys
+        return keys
+
+    @staticmethod
+    def write(path: str, id_blob, id_offsets, text_blob, text_offsets,
+              signatures, keys) -> '_Segment':
+        """Write a segment; keys is (BANDS, n) band-tagged keys in row order."""
+        flat   = np.asarray(keys, dtype=np.uint64).reshape(-1)
+        order  = np.argsort(flat, kind='stable')
+        arrays = {
+            'band_keys':    flat[order],
+            'band_rows':    (order % max(keys.shape[1], 1)).astype(np.uint32),
+            'signatures':   np.asarray(signatures, dtype=np.uint32).reshape(-1, NUM_PERM),
+            'text_blob':    text_blob,
+            'text_offsets': text_offsets,
+            'id_blob':      id_blob,
+            'id_offsets':   id_offsets,
+        }
+        write_arrays(path, arrays)
+        return _Segment(path)
+
+
+def _encode_strings(strings) -> tuple:
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _blob_str(blob: np.ndarray, offsets: np.ndarray, row: int) -> str:
+    return bytes(blob[offsets[row]:offsets[row + 1]]).decode('utf-8')
+
+
+class TextIndex(SegmentStore):
+    """
+    MinHash LSH index over incident descriptions from past claims.
+
+    Candidates from colliding bands are filtered by their MinHash Jaccard
+    estimate, then re-ranked by exact shingle Jaccard.
+
+    On disk the index is a models.segment_store.SegmentStore: immutable
+    segments plus a manifest, flushed and merged in the background. Each
+    segment stores its bands as sorted key arrays with the matching row
+    ids, memory-mapped and probed by binary search, so opening an index
+    costs no rebuild. Claims added since the last flush live in small
+    in-memory band tables.
+    """
+    kind = 'Text index'
+
+    def __init__(self, path='data/text_index'):
+        super().__init__(path)
+
+    def _new_delta(self) -> _Unsaved:
+        return _Unsaved()
+
+    def _delta_len(self, delta: _Unsaved) -> int:
+        return len(delta)
+
+    def _combine(self, first: _Unsaved, second: _Unsaved) -> _Unsaved:
+        for row in range(len(second)):
+            first.add(second.claim_ids[row], second.texts[row],
+                      second.signatures[row], second.keys[row])
+        return first
+
+    def add(self, claim_id, text: str):
+        """Insert one description: a MinHash plus BANDS dict appends."""
+        signature = minhash(shingles(text))
+        keys      = _tag_keys(band_keys(signature))
+        with self._lock:
+            self._delta.add(str(claim_id), str(text), signature, keys)
+        self._maybe_flush()
+
+    def query(self, text: str, top_k: int = 5, min_jaccard: float = MIN_JACCARD,
+              exclude_claim_id=None) -> list:
+        """
+        Return up to top_k prior claims whose descriptions are near-duplicates
+        of text, as [{'claim_id', 'similarity'}] sorted by exact Jaccard.
+        """
+        query_shingles = shingles(text)
+        if not query_shingles:
+            return []
+        signature = minhash(query_shingles)
+        keys      = _tag_keys(band_keys(signature))
+
+        # Segments are immutable and probed without the lock. The unsaved
+        # tables change under add(), so their buckets are copied under it;
+        # their rows are only ever appended, so the copied row ids stay valid.
+        with self._lock:
+            segments = list(self._segments)
+            unsaved  = [self._pending, self._delta]
+            copied   = [[list(rows) for rows in src.buckets(keys)] for src in unsaved]
+        sources = segments + unsaved
+        probed  = [seg.buckets(keys) for seg in segments] + copied
+
+        # Count colliding bands per (source, row); more collisions = likelier match
+        found = []
+        for s, buckets in enumerate(probed):
+            buckets = [rows for rows in buckets if len(rows) <= MAX_BUCKET]
+            if buckets:
+                rows, hits = np.unique(np.concatenate(buckets), return_counts=True)
+                found.append((np.full(len(rows), s), rows, hits))
+        if not found:
+            return []
+        src, rows, hits = (np.concatenate(parts) for parts in zip(*found))
+        top = np.argsort(-hits, kind='stable')[:MAX_CANDIDATES]
+
+        # Cheap vectorised estimate first; exact Jaccard only for survivors
+        candidates = []
+        for s in np.unique(src[top]).tolist():
+            source    = sources[s]
+            picked    = rows[top][src[top] == s].tolist()
+            estimates = (source.signatures_for(picked) == signature).mean(axis=1)
+            candidates += [
+                (source.claim_id(row), source.text(row))
+                for row, estimate in zip(picked, estimates)
+                if estimate >= min_jaccard - ESTIMATE_SLACK
+            ]
+
+        matches = []
+        for claim_id, candidate_text in candidates:
+            if exclude_claim_id is not None and claim_id == str(exclude_claim_id):
+                continue
+            sim = jaccard(query_shingles, shingles(candidate_text))
+            if sim >= min_jaccard:
+                matches.append({'claim_id': claim_id, 'similarity': round(sim, 4)})
+
+        matches.sort(key=lambda m: -m['similarity'])
+        return matches[:top_k]
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def _open_segment(self, path: str) -> _Segment:
+        return _Segment(path)
+
+    def _write_segment(self, path: str, delta: _Unsaved) -> _Segment:
+        return _Segment.write(
+            path, *_encode_strings(delta.claim_ids), *_encode_strings(delta.texts),
+            np.stack(delta.signatures), np.stack(delta.keys, axis=1),
+        )
+
+    def _merge_segments(self, path: str, segments: list) -> _Segment:
+        def concat(blob_name, offsets_name):
+            blobs, offsets, base = [], [np.zeros(1, dtype=np.int64)], 0
+            for seg in segments:
+                blob, offs = getattr(seg, blob_name), getattr(seg, offsets_name)
+                blobs.append(np.asarray(blob))
+                offsets.append(np.asarray(offs[1:]) + base)
+                base += int(offs[-1])
+            return np.concatenate(blobs), np.concatenate(offsets)
+
+        return _Segment.write(
+            path, *concat('id_blob', 'id_offsets'), *concat('text_blob', 'text_offsets'),
+            np.concatenate([seg.signatures for seg in segments]),
+            np.concatenate([seg.keys_by_row() for seg in segments], axis=1),
+        )
+
+    @classmethod
+    def load(cls, path='data/text_index'):
+        return cls(path)._load_segments()
+
+
+def load_text_index(path='data/text_index'):
+    global _index
+    _index = TextIndex.load(path)
+    print(f'[NLP] Text index loaded from {path} ({len(_index)} descriptions)')
+
+
+def get_text_index():
+    return _index
+
+
+def save_text_index():
+    # Writes only the descriptions added since the last flush, if any
+    if _index is not None and _index.save():
+        print(f'[NLP] Text index saved to {_index.path} ({len(_index)} descriptions)')
+
+
+def index_claim_text(claim_id, text: str):
+    # No-op without a loaded index or a claim ID to report back later
+    if _index is not None and claim_id is not None and text:
+        _index.add(claim_id, text)
@@ -0,0 +1,22 @@
+import hashlib
+import os
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_current(converted, source, source_sha256: str = None) -> bool:
+    """
+    Whether a converted model file (.safetensors, .ubj) still matches the
+    original it was made from. It does if it is at least as new as the
+    original, or if the original's hash recorded at conversion still
+    matches (a checkout or copy can reset modification times).
+    """
+    if os.path.getmtime(converted) >= os.path.getmtime(source):
+        return True
+    return source_sha256 is not None and source_sha256 == file_sha256(source)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torchvision import transforms
+from PIL import Image
+
+from models.damage_classifier.model import CLASSES, CLASS_TO_IDX
+from models.damage_classifier.predict import IMAGE_SIZE, RESIZE, NORMALIZE
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+SHARD_SIZE = 2048     # images per memory-mapped shard
+
+# Same augmentations as the training notebook, minus the Resize, which the
+# cache has already applied. They run on uint8 CHW tensors.
+TRAIN_AUGMENT = transforms.Compose([
+    transforms.RandomHorizontalFlip(p=0.5),
+    transforms.RandomRotation(degrees=20),
+    transforms.ColorJitter(brightness=0.4, contrast=0.4, saturation=0.3, hue=0.1),
+    transforms.RandomGrayscale(p=0.05),
+])
+
+TO_FLOAT = transforms.Compose([
+    transforms.ConvertImageDtype(torch.float32),
+    NORMALIZE
+])
+
+
+def list_images(data_dir: str) -> list:
+    """(path, label) pairs from data_dir/<class>/ folders, in a stable order."""
+    samples = []
+    for cls in CLASSES:
+        cls_dir = os.path.join(data_dir, cls)
+        if not os.path.isdir(cls_dir):
+            print(f'  WARNING: {cls_dir} not found, skipping.')
+            continue
+        for fname in sorted(os.listdir(cls_dir)):
+            if fname.lower().endswith(IMAGE_EXTS):
+                samples.append((os.path.join(cls_dir, fname), CLASS_TO_IDX[cls]))
+    return samples
+
+
+def _fingerprint(samples: list, size: int) -> str:
+    # Changes whenever a file is added, removed, relabelled or rewritten
+    h = hashlib.sha1(str(size).encode())
+    for path, label in samples:
+        st = os.stat(path)
+        h.update(f'{path}|{label}|{st.st_size}|{st.st_mtime_ns}\n'.encode())
+    return h.hexdigest()
+
+
+def _load_resized(path: str) -> np.ndarray:
+    try:
+        img = Image.open(path).convert('RGB')
+    except Exception:
+        # Unreadable files become a grey image, as in the notebook
+        img = Image.new('RGB', (IMAGE_SIZE, IMAGE_SIZE), (128, 128, 128))
+    return np.asarray(RESIZE(img), dtype=np.uint8)
+
+
+def build_cache(data_dir: str, cache_dir: str, workers: int = None,
+                shard_size: int = SHARD_SIZE) -> dict:
+    """
+    Decode and resize every image under data_dir once, into uint8 shards of
+    shape (n, IMAGE_SIZE, IMAGE_SIZE, 3) in cache_dir. Returns the manifest.
+
+    The cache is reused as long as the file list, sizes and mtimes match;
+    the manifest is written last, so an interrupted build is redone.
+    """
+    samples     = list_images(data_dir)
+    if not samples:
+        raise ValueError(f'No images found under {data_dir}')
+    fingerprint = _fingerprint(samples, IMAGE_SIZE)
+
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('fingerprint') == fingerprint:
+            print(f'[DL] Using cached dataset in {cache_dir} ({manifest["count"]} images)')
+            return manifest
+        os.remove(manifest_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    paths  = [p for p, _ in samples]
+    labels = np.array([l for _, l in samples], dtype=np.int64)
+    shards = []
+
+    print(f'[DL] Caching {len(paths)} images at {IMAGE_SIZE}x{IMAGE_SIZE} into {cache_dir}...')
+    with Pool(workers or os.cpu_count()) as pool:
+        for start in range(0, len(paths), shard_size):
+            chunk = paths[start:start + shard_size]
+            name  = f'shard_{start // shard_size:05d}.npy'
+            out   = np.lib.format.open_memmap(
+                os.path.join(cache_dir, name), mode='w+', dtype=np.uint8,
+                shape=(len(chunk), IMAGE_SIZE, IMAGE_SIZE, 3)
+            )
+            for i, arr in enumerate(pool.imap(_load_resized, chunk, chunksize=16)):
+                out[i] = arr
+            out.flush()
+            del out
+            shards.append(name)
+            print(f'  {start + len(chunk):>8} / {len(paths)} images cached')
+
+    np.save(os.path.join(cache_dir, 'labels.npy'), labels)
+    manifest = {
+        'fingerprint': fingerprint,
+        'image_size':  IMAGE_SIZE,
+        'count':       len(paths),
+        'shard_size':  shard_size,
+        'shards':      shards,
+        'classes':     CLASSES,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class CachedDamageDataset(Dataset):
+    """
+    Images from a build_cache() directory as normalised float tensors.
+
+    Shards are memory-mapped lazily in each DataLoader worker (a memmap
+    pickled into a worker would be copied), so workers share the page cache
+    and an epoch costs no JPEG decoding. With augment=True, TRAIN_AUGMENT
+    runs on the uint8 arrays in the workers.
+    """
+
+    def __init__(self, cache_dir: str, indices=None, augment: bool = False):
+        with open(os.path.join(cache_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.cache_dir   = cache_dir
+        self.shard_size  = manifest['shard_size']
+        self.shard_paths = [os.path.join(cache_dir, s) for s in manifest['shards']]
+        self.labels      = np.load(os.path.join(cache_dir, 'labels.npy'))
+        self.indices     = np.arange(manifest['count']) if indices is None else np.asarray(indices)
+        self.augment     = augment
+        self._shards     = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shards'] = None
+        return state
+
+    def __getitem__(self, idx):
+        if self._shards is None:
+            self._shards = [np.load(p, mmap_mode='r') for p in self.shard_paths]
+        i   = int(self.indices[idx])
+        arr = self._shards[i // self.shard_size][i % self.shard_size]
+
+        # Copy out of the read-only map: augmentations may write in place
+        img = torch.from_numpy(np.array(arr)).permute(2, 0, 1)
+        if self.augment:
+            img = TRAIN_AUGMENT(img)
+        return TO_FLOAT(img), int(self.labels[i])
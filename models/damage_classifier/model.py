@@ -1,12 +1,63 @@
+import json
+import logging
+import mmap
+import os
+import struct
+
 import torch
 import torch.nn as nn
 import timm
 
+from models.converted_artifacts import file_sha256, is_current
 
 CLASSES = ['minor', 'moderate', 'severe']
 CLASS_TO_IDX = {c: i for i, c in enumerate(CLASSES)}
 IDX_TO_CLASS = {i: c for i, c in enumerate(CLASSES)}
 
+SAFETENSORS_DTYPES = {
+    'F64': torch.float64, 'F32': torch.float32, 'F16': torch.float16,
+    'BF16': torch.bfloat16, 'I64': torch.int64, 'I32': torch.int32,
+    'I16': torch.int16, 'I8': torch.int8, 'U8': torch.uint8, 'BOOL': torch.bool,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def safetensors_metadata(path) -> dict:
+    """The string metadata stored in a .safetensors header, without the tensors."""
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        return json.loads(f.read(header_len)).get('__metadata__', {})
+
+
+def load_safetensors_mmap(path) -> dict:
+    """
+    Tensors of a .safetensors file as views of a private memory map.
+
+    Nothing is copied on load: pages are read on first use and shared
+    through the page cache by every process serving the same file. The map
+    is copy-on-write, so an in-place update only copies the touched pages.
+    """
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    (header_len,) = struct.unpack('<Q', buf[:8])
+    header     = json.loads(buf[8:8 + header_len])
+    data_start = 8 + header_len
+
+    tensors = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        dtype       = SAFETENSORS_DTYPES[info['dtype']]
+        start, stop = info['data_offsets']
+        count       = (stop - start) // dtype.itemsize
+        flat = (
+            torch.frombuffer(buf, dtype=dtype, count=count, offset=data_start + start)
+            if count else torch.empty(0, dtype=dtype)
+        )
+        tensors[name] = flat.reshape(info['shape'])
+    return tensors
+
 
 class DamageClassifier(nn.Module):
     def __init__(self, num_classes=3, pretrained=False):
@@ -20,14 +71,55 @@ class DamageClassifier(nn.Module):
     def forward(self, x):
         return self.backbone(x)
 
-    def save(self, path):
-        torch.save(self.state_dict(), path)
+    def forward_with_embedding(self, x):
+        # Same as forward() in eval mode, but also returns the pooled
+        # backbone features that feed the classifier head
+        features = self.backbone.forward_features(x)
+        pooled   = self.backbone.forward_head(features, pre_logits=True)
+        return self.backbone.classifier(pooled), pooled
+
+    def save(self, path, source=None):
+        # .safetensors for mmap loading, anything else as a torch pickle.
+        # source: the checkpoint a .safetensors copy is made from, whose
+        # hash is recorded so the loader can tell when the copy is stale
+        if str(path).endswith('.safetensors'):
+            from safetensors.torch import save_file
+            metadata = {'source_sha256': file_sha256(source)} if source else None
+            save_file({k: v.contiguous() for k, v in self.state_dict().items()}, str(path),
+                      metadata=metadata)
+        else:
+            torch.save(self.state_dict(), path)
 
     @classmethod
     def load(cls, path, num_classes=3):
-        model = cls(num_classes=num_classes, pretrained=False)
-        model.load_state_dict(
-            torch.load(path, map_location='cpu')
-        )
+        if str(path).endswith('.safetensors'):
+            # Built on the meta device, so no weights are allocated or
+            # randomly initialised; assign=True then adopts the mapped
+            # tensors as the parameters
+            with torch.device('meta'):
+                model = cls(num_classes=num_classes, pretrained=False)
+            model.load_state_dict(load_safetensors_mmap(path), assign=True)
+        else:
+            model = cls(num_classes=num_classes, pretrained=False)
+            model.load_state_dict(
+                torch.load(path, map_location='cpu')
+            )
         model.eval()
-        return model
\ No newline at end of file
+        return model
+
+
+def resolve_weights_path(path) -> str:
+    """
+    Prefer a converted .safetensors next to a .pt checkpoint, unless the
+    checkpoint has changed since it was converted.
+    """
+    root, ext = os.path.splitext(str(path))
+    converted = root + '.safetensors'
+    if ext == '.pt' and os.path.exists(converted):
+        if not os.path.exists(path):
+            return converted
+        if is_current(converted, path, safetensors_metadata(converted).get('source_sha256')):
+            return converted
+        logger.warning('%s is older than %s and was not converted from it; loading %s. '
+                       'Re-run scripts/convert_model_artifacts.py.', converted, path, path)
+    return str(path)
\ No newline at end of file
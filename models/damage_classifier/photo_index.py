@@ -0,0 +1,357 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from models.segment_store import SegmentStore, write_arrays
+
+HASH_BITS    = 64
+CHUNK_BITS   = 16
+N_CHUNKS     = HASH_BITS // CHUNK_BITS
+CHUNK_MASK   = (1 << CHUNK_BITS) - 1
+MAX_CHUNK_RADIUS = 2                                     # probes per chunk: 1 + 16 + 120
+MAX_SUPPORTED_DISTANCE = N_CHUNKS * (MAX_CHUNK_RADIUS + 1) - 1
+
+LSH_TABLES   = 8     # random-hyperplane tables for the embedding ANN
+LSH_BITS     = 14    # hyperplanes (key bits) per table
+
+# Defaults for what counts as a near-duplicate photo
+MAX_HASH_DISTANCE = 6      # Hamming distance between 64-bit pHashes
+MIN_SIMILARITY    = 0.95   # cosine similarity between backbone embeddings
+
+_index = None
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def perceptual_hash(img: Image.Image) -> int:
+    """
+    64-bit DCT perceptual hash: grayscale 32x32, 2-D DCT, then one bit per
+    coefficient of the top-left 8x8 block above its median. Robust to
+    re-encoding, resizing and small colour edits.
+    """
+    gray = np.asarray(
+        img.convert('L').resize((32, 32), Image.LANCZOS), dtype=np.float64
+    )
+    dct  = _DCT_32 @ gray @ _DCT_32.T
+    low  = dct[:8, :8].reshape(-1)
+    bits = low > np.median(low[1:])  # skip DC when picking the threshold
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def _popcount64(x: np.ndarray) -> np.ndarray:
+    # SWAR popcount over a uint64 array
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int32)
+
+
+def _chunk_radius(max_distance: int) -> int:
+    if not 0 <= max_distance <= MAX_SUPPORTED_DISTANCE:
+        raise ValueError(
+            f'max_distance must be between 0 and {MAX_SUPPORTED_DISTANCE}, got {max_distance}'
+        )
+    return max_distance // N_CHUNKS
+
+
+def _chunk_probes(chunk: int, radius: int) -> np.ndarray:
+    probes = [chunk]
+    if radius >= 1:
+        probes += [chunk ^ (1 << b) for b in range(CHUNK_BITS)]
+    if radius >= 2:
+        probes += [
+            chunk ^ (1 << a) ^ (1 << b)
+            for a in range(CHUNK_BITS) for b in range(a + 1, CHUNK_BITS)
+        ]
+    return np.array(probes, dtype=np.uint16)
+
+
+def _lsh_keys(embeddings: np.ndarray, center: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """
+    (n, LSH_TABLES) uint16 keys, one LSH_BITS-bit signature per table.
+
+    Pooled CNN features are non-negative and sit in a narrow cone, so
+    hyperplanes through the origin would put nearly every photo on the same
+    side. Keys are taken after subtracting the segment's mean embedding.
+    """
+    flat    = planes.transpose(1, 0, 2).reshape(planes.shape[1], -1)
+    bits    = ((embeddings - center) @ flat).reshape(len(embeddings), LSH_TABLES, LSH_BITS) > 0
+    weights = (1 << np.arange(LSH_BITS)).astype(np.uint16)
+    return (bits * weights).sum(axis=2, dtype=np.uint16)
+
+
+def _bucket_rows(keys: np.ndarray, rows: np.ndarray, probes: np.ndarray) -> np.ndarray:
+    # Row ids of every bucket in probes, from keys sorted ascending
+    lo = np.searchsorted(keys, probes, side='left')
+    hi = np.searchsorted(keys, probes, side='right')
+    parts = [rows[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint32)
+
+
+def _encode_ids(claim_ids) -> tuple:
+    blobs   = [str(c).encode('utf-8') for c in claim_ids]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    return np.frombuffer(b''.join(blobs), dtype=np.uint8), offsets
+
+
+def _atomic_save(path: str, array: np.ndarray):
+    # Write then rename, so live memory maps of the old file stay valid
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+class _Segment:
+    """
+    One immutable, memory-mapped batch of indexed photos.
+
+    Each hash chunk table and LSH table is a sorted key array plus the
+    matching row ids, probed with binary search, so opening a segment does
+    no per-photo work.
+    """
+    FILES = ('hashes', 'embeddings', 'center', 'hash_keys', 'hash_rows',
+             'lsh_keys', 'lsh_rows', 'id_blob', 'id_offsets')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def claim_id(self, row: int) -> str:
+        start, stop = self.id_offsets[row], self.id_offsets[row + 1]
+        return bytes(self.id_blob[start:stop]).decode('utf-8')
+
+    @staticmethod
+    def write(path: str, id_blob, id_offsets, hashes, embeddings, planes) -> '_Segment':
+        """Build the bucket tables for a batch of rows and write them to path."""
+        hashes     = np.asarray(hashes, dtype=np.uint64)
+        embeddings = np.asarray(embeddings, dtype=np.float16)
+        n          = len(hashes)
+        center     = embeddings.astype(np.float32).mean(axis=0) if n else \
+            np.zeros(embeddings.shape[1], dtype=np.float32)
+
+        chunk_keys = np.stack([
+            ((hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            for c in range(N_CHUNKS)
+        ])
+        lsh_keys = np.empty((LSH_TABLES, n), dtype=np.uint16)
+        for start in range(0, n, 65536):
+            block = embeddings[start:start + 65536].astype(np.float32)
+            lsh_keys[:, start:start + 65536] = _lsh_keys(block, center, planes).T
+
+        arrays = {'hashes': hashes, 'embeddings': embeddings, 'center': center,
+                  'id_blob': np.asarray(id_blob, dtype=np.uint8),
+                  'id_offsets': np.asarray(id_offsets, dtype=np.int64)}
+        for prefix, keys in (('hash', chunk_keys), ('lsh', lsh_keys)):
+            order = np.argsort(keys, axis=1, kind='stable')
+            arrays[prefix + '_keys'] = np.take_along_axis(keys, order, axis=1)
+            arrays[prefix + '_rows'] = order.astype(np.uint32)
+
+        write_arrays(path, arrays)
+        return _Segment(path)
+
+    def candidates(self, phash, probes_by_chunk, embedding, planes) -> np.ndarray:
+        rows = []
+        if phash is not None:
+            for c in range(N_CHUNKS):
+                rows.append(_bucket_rows(self.hash_keys[c], self.hash_rows[c], probes_by_chunk[c]))
+        if embedding is not None:
+            keys = _lsh_keys(embedding[None, :], self.center, planes)[0]
+            for t in range(LSH_TABLES):
+                rows.append(_bucket_rows(self.lsh_keys[t], self.lsh_rows[t], keys[t:t + 1]))
+        return np.unique(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.uint32)
+
+
+class PhotoIndex(SegmentStore):
+    """
+    Near-duplicate index over damage photos from past claims.
+
+    pHashes are looked up with multi-index hashing: each 64-bit hash is split
+    into four 16-bit chunks, each with its own table. Two hashes within
+    Hamming distance r agree on some chunk to within r // 4 bits, so probing
+    each table at that radius finds every match while only touching a few
+    buckets. Embeddings use random-hyperplane LSH tables and are re-ranked
+    by exact cosine similarity.
+
+    On disk the index is a models.segment_store.SegmentStore: immutable
+    segments plus a manifest, flushed and merged in the background. Photos
+    added since the last flush are scanned exactly in memory.
+    """
+    kind = 'Photo index'
+
+    def __init__(self, path='data/photo_index', embedding_dim=1280, seed=0):
+        super().__init__(path)
+        self.embedding_dim = embedding_dim
+        self._planes       = np.random.default_rng(seed).standard_normal(
+            (LSH_TABLES, embedding_dim, LSH_BITS)
+        ).astype(np.float32)
+
+    # Rows not yet in a segment: a list of (claim_ids, hashes, embeddings) batches
+    def _new_delta(self) -> list:
+        return []
+
+    def _delta_len(self, delta: list) -> int:
+        return sum(len(batch[1]) for batch in delta)
+
+    def _combine(self, first: list, second: list) -> list:
+        return first + second
+
+    # ── Building ─────────────────────────────────────────────────────────────
+    def add_many(self, claim_ids, hashes, embeddings):
+        """Insert photos; embeddings are L2-normalised before storing."""
+        hashes     = np.asarray(hashes, dtype=np.uint64).reshape(-1)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(hashes), -1)
+        embeddings = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12)
+
+        with self._lock:
+            self._delta.append(([str(c) for c in claim_ids], hashes, embeddings.astype(np.float16)))
+        self._maybe_flush()
+
+    def add(self, claim_id, phash: int, embedding: np.ndarray):
+        self.add_many([claim_id], [phash], embedding[None, :])
+
+    # ── Querying ─────────────────────────────────────────────────────────────
+    def query(self, phash: int = None, embedding: np.ndarray = None,
+              max_distance: int = MAX_HASH_DISTANCE,
+              min_similarity: float = MIN_SIMILARITY,
+              top_k: int = 5, exclude_claim_id=None) -> list:
+        """
+        Return up to top_k prior photos that are near-duplicates by pHash
+        distance or embedding similarity, best matches first.
+        """
+        radius = _chunk_radius(max_distance)
+        emb    = None
+        if embedding is not None:
+            emb = np.asarray(embedding, dtype=np.float32).reshape(-1)
+            emb = emb / (np.linalg.norm(emb) + 1e-12)
+        probes = None
+        if phash is not None:
+            probes = [
+                _chunk_probes((phash >> (c * CHUNK_BITS)) & CHUNK_MASK, radius)
+                for c in range(N_CHUNKS)
+            ]
+
+        with self._lock:
+            segments = list(self._segments)
+            unsaved  = list(self._pending + self._delta)
+
+        found = []   # (claim_id getter, hashes, embeddings) per source
+        for seg in segments:
+            rows = seg.candidates(phash, probes, emb, self._planes)
+            if len(rows):
+                found.append((seg.claim_id, rows, seg.hashes[rows], seg.embeddings[rows]))
+        for ids, hashes, embs in unsaved:
+            # Unflushed rows are few, so they are compared exactly
+            found.append((ids.__getitem__, np.arange(len(ids)), hashes, embs))
+
+        matches = []
+        for claim_id_of, rows, hashes, embs in found:
+            dist = _popcount64(hashes ^ np.uint64(phash)) if phash is not None else None
+            sim  = embs.astype(np.float32) @ emb if emb is not None else None
+            hit  = np.zeros(len(rows), dtype=bool)
+            if dist is not None:
+                hit |= dist <= max_distance
+            if sim is not None:
+                hit |= sim >= min_similarity
+            for i in np.flatnonzero(hit):
+                claim_id = claim_id_of(int(rows[i]))
+                if exclude_claim_id is not None and claim_id == str(exclude_claim_id):
+                    continue
+                matches.append({
+                    'claim_id':      claim_id,
+                    'hash_distance': int(dist[i]) if dist is not None else None,
+                    'similarity':    round(float(sim[i]), 4) if sim is not None else None,
+                })
+
+        matches.sort(key=lambda m: (
+            m['hash_distance'] if m['hash_distance'] is not None else HASH_BITS,
+            -(m['similarity'] or 0.0)
+        ))
+        return matches[:top_k]
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def _open_segment(self, path: str) -> _Segment:
+        return _Segment(path)
+
+    def _prepare(self):
+        # Every segment's LSH keys depend on the planes, so they are shared
+        if not os.path.exists(os.path.join(self.path, 'planes.npy')):
+            _atomic_save(os.path.join(self.path, 'planes.npy'), self._planes)
+
+    def _write_segment(self, path: str, delta: list) -> _Segment:
+        ids = [c for ids, _, _ in delta for c in ids]
+        return _Segment.write(
+            path, *_encode_ids(ids),
+            np.concatenate([h for _, h, _ in delta]),
+            np.concatenate([e for _, _, e in delta]),
+            self._planes,
+        )
+
+    def _merge_segments(self, path: str, segments: list) -> _Segment:
+        blobs, offsets, base = [], [np.zeros(1, dtype=np.int64)], 0
+        for seg in segments:
+            blobs.append(np.asarray(seg.id_blob))
+            offsets.append(np.asarray(seg.id_offsets[1:]) + base)
+            base += int(seg.id_offsets[-1])
+        return _Segment.write(
+            path, np.concatenate(blobs), np.concatenate(offsets),
+            np.concatenate([seg.hashes for seg in segments]),
+            np.concatenate([seg.embeddings for seg in segments]),
+            self._planes,
+        )
+
+    @classmethod
+    def load(cls, path='data/photo_index', embedding_dim=1280):
+        index  = cls(path, embedding_dim=embedding_dim)
+        planes = os.path.join(path, 'planes.npy')
+        if os.path.exists(planes):
+            # Replaced atomically, so it is safe to read without the lock
+            index._planes       = np.load(planes)
+            index.embedding_dim = index._planes.shape[1]
+        return index._load_segments()
+
+
+def load_photo_index(path='data/photo_index'):
+    global _index
+    _index = PhotoIndex.load(path)
+    print(f'[DUP] Photo index loaded from {path} ({len(_index)} photos)')
+
+
+def get_photo_index():
+    return _index
+
+
+def save_photo_index():
+    # Writes only the photos added since the last flush, if any
+    if _index is not None and _index.save():
+        print(f'[DUP] Photo index saved to {_index.path} ({len(_index)} photos)')
+
+
+def match_and_index(img: Image.Image, embedding: np.ndarray, claim_id=None) -> list:
+    """
+    Query the loaded index for near-duplicates of a claim photo, then add
+    the photo under claim_id. Returns [] if no index is loaded.
+    """
+    if _index is None:
+        return []
+    phash   = perceptual_hash(img)
+    matches = _index.query(phash, embedding, exclude_claim_id=claim_id)
+    if claim_id is not None and embedding is not None:
+        _index.add(claim_id, phash, embedding)
+    return matches
@@ -1,12 +1,21 @@
+import numpy as np
 import torch
 from torchvision import transforms
 from PIL import Image
-from models.damage_classifier.model import DamageClassifier, CLASSES, IDX_TO_CLASS
+from models.damage_classifier.model import (
+    DamageClassifier, CLASSES, IDX_TO_CLASS, resolve_weights_path
+)
+
+IMAGE_SIZE = 224
+
+# Split out so the training cache resizes exactly like inference does
+RESIZE    = transforms.Resize((IMAGE_SIZE, IMAGE_SIZE))
+NORMALIZE = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
 
 VAL_TRANSFORMS = transforms.Compose([
-    transforms.Resize((224, 224)),
+    RESIZE,
     transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    NORMALIZE
 ])
 
 _model = None
@@ -14,15 +23,18 @@ _model = None
 
 def load_model(path='models/damage_classifier/best_model.pt'):
     global _model
+    # A converted best_model.safetensors is used over best_model.pt if present
+    path   = resolve_weights_path(path)
     _model = DamageClassifier.load(path)
     _model.eval()
     print(f'[DL] Damage classifier loaded from {path}')
 
 
-def predict_damage(image_input):
+def predict_damage(image_input, return_embedding=False):
     """
     image_input: file path string OR PIL.Image object
     Returns dict with severity, severity_idx, confidence, all_probs
+    (plus the pooled backbone embedding if return_embedding is set)
     """
     if _model is None:
         raise RuntimeError(
@@ -37,13 +49,69 @@ def predict_damage(image_input):
     tensor = VAL_TRANSFORMS(img).unsqueeze(0)
 
     with torch.no_grad():
-        logits = _model(tensor)
+        logits, pooled = _model.forward_with_embedding(tensor)
         probs  = torch.softmax(logits, dim=1)[0]
-        pred   = probs.argmax().item()
 
+    result = _damage_result(probs)
+    if return_embedding:
+        result['embedding'] = pooled[0].numpy()
+    return result
+
+
+def _damage_result(probs) -> dict:
+    pred = probs.argmax().item()
     return {
         'severity':     IDX_TO_CLASS[pred],
         'severity_idx': pred,
         'confidence':   round(probs[pred].item(), 4),
         'all_probs':    {c: round(probs[i].item(), 4) for i, c in enumerate(CLASSES)}
-    }
\ No newline at end of file
+    }
+
+
+def predict_damage_batch(images, batch_size=32, return_embedding=False) -> list:
+    """
+    predict_damage() for a list of PIL images, run batch_size at a time.
+    Returns one result dict per image, in order.
+    """
+    if _model is None:
+        raise RuntimeError(
+            'Model not loaded. Call load_model() before predict_damage_batch().'
+        )
+
+    results = []
+    with torch.no_grad():
+        for start in range(0, len(images), batch_size):
+            batch = torch.stack([
+                VAL_TRANSFORMS(img.convert('RGB'))
+                for img in images[start:start + batch_size]
+            ])
+            logits, pooled = _model.forward_with_embedding(batch)
+            probs = torch.softmax(logits, dim=1)
+            for i in range(len(batch)):
+                result = _damage_result(probs[i])
+                if return_embedding:
+                    result['embedding'] = pooled[i].numpy()
+                results.append(result)
+    return results
+
+
+def embed_images(images, batch_size=32):
+    """
+    Pooled backbone embeddings for a list of PIL images, batched.
+    Returns a float32 array of shape (len(images), embedding_dim).
+    """
+    if _model is None:
+        raise RuntimeError(
+            'Model not loaded. Call load_model() before embed_images().'
+        )
+
+    out = []
+    with torch.no_grad():
+        for start in range(0, len(images), batch_size):
+            batch = torch.stack([
+                VAL_TRANSFORMS(img.convert('RGB'))
+                for img in images[start:start + batch_size]
+            ])
+            _, pooled = _model.forward_with_embedding(batch)
+            out.append(pooled.numpy())
+    return np.concatenate(out).astype(np.float32)
@@ -0,0 +1,327 @@
+import logging
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from models.fraud_classifier.predict import FEATURE_COLS, STRING_COLS, encode_claim
+
+# Model outputs in [0, 1], binned linearly; numeric features, binned on a
+# log scale so the same fixed bins fit ages, deductibles and years alike;
+# categorical features, one bin per category by a stable hash of the raw
+# value (the model itself sees every category as 0, see encode_claim)
+SCORE_METRICS = ['fraud_probability', 'anomaly_score', 'damage_confidence']
+METRICS       = SCORE_METRICS + FEATURE_COLS
+
+N_BINS     = 256
+UNIT_BINS  = 100      # score bins of width 0.01
+LOG_STEPS  = 8        # feature bins per doubling (about 9% wide)
+PSI_GROUPS = 10       # reference-quantile groups PSI is computed over
+
+# Conventional PSI bands
+PSI_MODERATE    = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# State is saved in the background this often, so a crash loses at most
+# this much of the window
+SAVE_SECONDS = 300
+
+_IS_SCORE    = np.array([m in SCORE_METRICS for m in METRICS])
+_IS_CATEGORY = np.array([m in STRING_COLS for m in METRICS])
+_ROWS        = np.arange(len(METRICS))
+_CATEGORY_SLOTS = [(i, col) for i, col in enumerate(FEATURE_COLS) if col in STRING_COLS]
+
+logger   = logging.getLogger(__name__)
+_monitor = None
+
+
+def category_bin(value) -> float:
+    """Fixed bin of a categorical value; crc32 is stable across processes."""
+    if value is None or value == '':
+        return np.nan
+    return float(zlib.crc32(str(value).encode('utf-8')) % N_BINS)
+
+
+def encode_features(claim_dict: dict, out: np.ndarray) -> np.ndarray:
+    """
+    Feature values as monitored, in FEATURE_COLS order: numeric features as
+    the model sees them, categorical ones as their category_bin().
+    """
+    encode_claim(claim_dict, out=out)
+    for i, col in _CATEGORY_SLOTS:
+        out[i] = category_bin(claim_dict.get(col))
+    return out
+
+
+def bin_values(values: np.ndarray):
+    """Fixed bin index per metric value; NaN (not measured) is masked out."""
+    valid  = ~np.isnan(values)
+    safe   = np.where(valid, values, 0.0)
+    unit   = np.clip(safe, 0.0, 1.0) * UNIT_BINS
+    logged = np.sign(safe) * np.log2(1.0 + np.abs(safe)) * LOG_STEPS + N_BINS / 2
+    idx    = np.where(_IS_SCORE, np.minimum(unit, UNIT_BINS - 1), np.where(_IS_CATEGORY, safe, logged))
+    return np.clip(idx, 0, N_BINS - 1).astype(np.int64), valid
+
+
+def psi(reference: np.ndarray, current: np.ndarray, groups: int = PSI_GROUPS, eps: float = 1e-4):
+    """
+    Population stability index between two fine-bin histograms. Fine bins
+    are merged into `groups` quantile groups of the reference first, so
+    sparse bins do not inflate the index.
+    """
+    ref_total, cur_total = reference.sum(), current.sum()
+    if not ref_total or not cur_total:
+        return None
+    cdf   = np.cumsum(reference) / ref_total
+    group = np.minimum((np.concatenate([[0.0], cdf[:-1]]) * groups).astype(int), groups - 1)
+    ref_p = np.bincount(group, weights=reference, minlength=groups) / ref_total
+    cur_p = np.bincount(group, weights=current,   minlength=groups) / cur_total
+    ref_p, cur_p = np.maximum(ref_p, eps), np.maximum(cur_p, eps)
+    return float(np.sum((cur_p - ref_p) * np.log(cur_p / ref_p)))
+
+
+def _status(value) -> str:
+    if value is None:
+        return 'insufficient_data'
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+def _moments(n, total, total_sq):
+    if not n:
+        return None, None
+    mean = total / n
+    return round(float(mean), 4), round(float(np.sqrt(max(total_sq / n - mean * mean, 0.0))), 4)
+
+
+def build_reference(values: np.ndarray) -> dict:
+    """
+    Reference profile from an (n, len(METRICS)) array of observations, in
+    the sparse JSON-friendly form stored under the model artifact's
+    'monitoring_reference' key. Metrics with no observations are omitted;
+    categorical metrics have no mean or std.
+    """
+    profile = {}
+    for m, name in enumerate(METRICS):
+        col = values[:, m]
+        col = col[~np.isnan(col)]
+        if not len(col):
+            continue
+        full        = np.full((len(col), len(METRICS)), np.nan)
+        full[:, m]  = col
+        idx, _      = bin_values(full)
+        bins, counts = np.unique(idx[:, m], return_counts=True)
+        numeric      = not _IS_CATEGORY[m]
+        profile[name] = {
+            'bins':   bins.tolist(),
+            'counts': counts.tolist(),
+            'mean':   float(col.mean()) if numeric else None,
+            'std':    float(col.std()) if numeric else None,
+        }
+    return profile
+
+
+class DriftMonitor:
+    """
+    Fixed-memory streaming histograms of model outputs and claim features.
+
+    Counts live in a ring of n_buckets time buckets of bucket_seconds each
+    (24 x 1h by default); the current window is the sum of the live
+    buckets. observe() bins one vector of len(METRICS) values and bumps one
+    count per metric, so its cost is the same at any traffic volume.
+    Nothing about individual requests is kept.
+
+    Drift is measured against the reference profile stored with the fraud
+    model by scripts/recalibrate_fraud_thresholds.py. Without one, the
+    first baseline_size observations are frozen as the baseline.
+
+    With a path, observe() also saves the state to it in a background
+    thread every save_seconds.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, n_buckets: int = 24,
+                 baseline_size: int = 1000, reference: dict = None,
+                 path: str = None, save_seconds: float = SAVE_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets      = n_buckets
+        self.baseline_size  = baseline_size
+        self.path           = path
+        self.save_seconds   = save_seconds
+        self._lock          = threading.Lock()
+        self._last_save     = time.monotonic()
+        self._saving        = False
+
+        n = len(METRICS)
+        self._counts   = np.zeros((n_buckets, n, N_BINS), dtype=np.int64)
+        self._sums     = np.zeros((n_buckets, n), dtype=np.float64)
+        self._sumsq    = np.zeros((n_buckets, n), dtype=np.float64)
+        self._epochs   = np.full(n_buckets, -1, dtype=np.int64)
+        self._lifetime = np.zeros((n, N_BINS), dtype=np.int64)
+        self._baseline = np.zeros((n, N_BINS), dtype=np.int64)
+        self._baseline_seen = 0
+        self.set_reference(reference)
+
+    def set_reference(self, reference: dict = None):
+        n = len(METRICS)
+        self._ref_counts = np.zeros((n, N_BINS), dtype=np.int64)
+        self._ref_stats  = {}
+        for m, name in enumerate(METRICS):
+            entry = (reference or {}).get(name)
+            if entry:
+                self._ref_counts[m, entry['bins']] = entry['counts']
+                if entry.get('mean') is not None:
+                    self._ref_stats[name] = (entry['mean'], entry['std'])
+        self.reference_source = 'model artifact' if reference else 'baseline'
+
+    def observe(self, values, now: float = None):
+        values     = np.asarray(values, dtype=np.float64)
+        idx, valid = bin_values(values)
+        rows, bins = _ROWS[valid], idx[valid]
+        vals       = values[valid]
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        slot  = epoch % self.n_buckets
+
+        with self._lock:
+            if self._epochs[slot] != epoch:
+                # Bucket last used a full ring ago: recycle it
+                self._counts[slot] = 0
+                self._sums[slot]   = 0.0
+                self._sumsq[slot]  = 0.0
+                self._epochs[slot] = epoch
+            self._counts[slot, rows, bins] += 1
+            self._sums[slot, rows]         += vals
+            self._sumsq[slot, rows]        += vals * vals
+            self._lifetime[rows, bins]     += 1
+            if self._baseline_seen < self.baseline_size:
+                self._baseline[rows, bins] += 1
+                self._baseline_seen        += 1
+        self._maybe_save()
+
+    def _maybe_save(self):
+        if self.path is None or self._saving or time.monotonic() - self._last_save < self.save_seconds:
+            return
+        self._saving = True
+        threading.Thread(target=self._background_save, daemon=True).start()
+
+    def _background_save(self):
+        try:
+            self.save(self.path)
+        except Exception:
+            logger.exception('Drift monitor save to %s failed', self.path)
+        finally:
+            self._last_save = time.monotonic()
+            self._saving    = False
+
+    def snapshot(self, now: float = None) -> dict:
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            live     = (self._epochs > epoch - self.n_buckets) & (self._epochs <= epoch)
+            window   = self._counts[live].sum(axis=0)
+            sums     = self._sums[live].sum(axis=0)
+            sumsq    = self._sumsq[live].sum(axis=0)
+            baseline = self._baseline.copy()
+            baseline_ready = self._baseline_seen >= self.baseline_size
+            lifetime_n     = int(self._lifetime[0].sum())  # fraud_probability is always observed
+
+        metrics, alerts = {}, []
+        for m, name in enumerate(METRICS):
+            from_artifact = self._ref_counts[m].any()
+            if from_artifact:
+                reference, ref_stats = self._ref_counts[m], self._ref_stats.get(name)
+            elif baseline_ready:
+                reference, ref_stats = baseline[m], None
+            else:
+                reference, ref_stats = None, None
+
+            n     = int(window[m].sum())
+            value = psi(reference, window[m]) if reference is not None else None
+            # Category bins are hashes, so only their PSI means anything
+            mean, std = _moments(n, sums[m], sumsq[m]) if not _IS_CATEGORY[m] else (None, None)
+            metrics[name] = {
+                'psi':            round(value, 4) if value is not None else None,
+                'status':         _status(value),
+                'window_count':   n,
+                'window_mean':    mean,
+                'window_std':     std,
+                'reference_mean': round(ref_stats[0], 4) if ref_stats else None,
+                'reference_std':  round(ref_stats[1], 4) if ref_stats else None,
+            }
+            if value is not None and value >= PSI_MODERATE:
+                alerts.append(name)
+
+        alerts.sort(key=lambda name: -metrics[name]['psi'])
+        return {
+            'window_hours':     round(self.n_buckets * self.bucket_seconds / 3600, 2),
+            'observed_total':   lifetime_n,
+            'reference_source': self.reference_source if self._ref_counts.any() or baseline_ready
+                                else f'baseline warming up ({min(self._baseline_seen, self.baseline_size)}/{self.baseline_size})',
+            'alerts':           alerts,
+            'metrics':          metrics,
+        }
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            # Copy under the lock, write outside it, so observe() never waits on disk
+            state = dict(
+                counts=self._counts.copy(), sums=self._sums.copy(), sumsq=self._sumsq.copy(),
+                epochs=self._epochs.copy(), lifetime=self._lifetime.copy(),
+                baseline=self._baseline.copy(), baseline_seen=self._baseline_seen,
+            )
+        tmp = f'{path}.{threading.get_ident()}.tmp.npz'
+        np.savez(tmp, metrics=np.array(METRICS), **state)
+        os.replace(tmp, path)
+
+    def restore(self, path: str) -> bool:
+        """Load saved counts; False if missing or saved with other metrics or sizes."""
+        if not os.path.exists(path):
+            return False
+        state = np.load(path)
+        if list(state['metrics']) != METRICS or state['counts'].shape != self._counts.shape:
+            logger.warning('Ignoring drift monitor state in %s: saved with other metrics or sizes', path)
+            return False
+        with self._lock:
+            self._counts   = state['counts']
+            self._sums     = state['sums']
+            self._sumsq    = state['sumsq']
+            self._epochs   = state['epochs']
+            self._lifetime = state['lifetime']
+            self._baseline = state['baseline']
+            self._baseline_seen = int(state['baseline_seen'])
+        return True
+
+
+def load_drift_monitor(path='data/drift_monitor.npz', reference: dict = None, **kwargs):
+    global _monitor
+    _monitor = DriftMonitor(reference=reference, path=path, **kwargs)
+    restored = _monitor.restore(path)
+    print(f'[MON] Drift monitor ready (reference: {_monitor.reference_source}'
+          f'{", state restored from " + path if restored else ""})')
+
+
+def get_drift_monitor():
+    return _monitor
+
+
+def save_drift_monitor():
+    if _monitor is not None:
+        _monitor.save(_monitor.path)
+
+
+def observe_prediction(claim_dict: dict, fraud_probability: float,
+                       anomaly_score=None, damage_confidence=None):
+    """Record one scored claim; a no-op without a loaded monitor."""
+    if _monitor is None:
+        return
+    values = np.empty(len(METRICS), dtype=np.float64)
+    values[0] = fraud_probability
+    values[1] = np.nan if anomaly_score is None else anomaly_score
+    values[2] = np.nan if damage_confidence is None else damage_confidence
+    encode_features(claim_dict, values[len(SCORE_METRICS):])
+    _monitor.observe(values)
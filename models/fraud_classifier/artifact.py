@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+
+import joblib
+
+from models.converted_artifacts import file_sha256, is_current
+
+# Native XGBoost formats, tried in this order next to a .pkl artifact
+NATIVE_EXTS = ('.ubj', '.json')
+
+_cache = {}
+
+logger = logging.getLogger(__name__)
+
+
+def meta_path(model_path: str) -> str:
+    # xgb_fraud_model.ubj -> xgb_fraud_model.meta.json
+    return os.path.splitext(model_path)[0] + '.meta.json'
+
+
+def _native_is_current(native: str, pkl: str) -> bool:
+    with open(meta_path(native)) as f:
+        recorded = json.load(f).get('source_sha256')
+    return is_current(native, pkl, recorded)
+
+
+def resolve_artifact_path(path: str) -> str:
+    """
+    Prefer a converted native booster + metadata next to a .pkl if present,
+    unless the .pkl has changed since it was converted.
+    """
+    root, ext = os.path.splitext(path)
+    if ext == '.pkl':
+        for native in NATIVE_EXTS:
+            if not (os.path.exists(root + native) and os.path.exists(root + '.meta.json')):
+                continue
+            if not os.path.exists(path) or _native_is_current(root + native, path):
+                return root + native
+            logger.warning('%s is older than %s and was not converted from it; loading %s. '
+                           'Re-run scripts/convert_model_artifacts.py.', root + native, path, path)
+            break
+    return path
+
+
+def _ensure_n_classes(model):
+    # Classifiers unpickled across XGBoost versions, and boosters saved from
+    # them, can lack n_classes_, which predict_proba needs. The booster's
+    # own config has it: num_class is 0 for binary objectives.
+    if getattr(model, 'n_classes_', None) is None:
+        config = json.loads(model.get_booster().save_config())
+        model.n_classes_ = max(int(config['learner']['learner_model_param']['num_class']), 2)
+    return model
+
+
+def load_artifact(path='models/fraud_classifier/xgb_fraud_model.pkl', resolve=True):
+    """
+    Load the fraud model artifact as {'model': XGBClassifier, 'feature_cols',
+    ...}. Returns (resolved_path, artifact).
+
+    Native .ubj / .json boosters are parsed by XGBoost itself, with the other
+    keys read from the .meta.json next to them, so nothing is unpickled.
+    Artifacts are cached per path, so the predictor and the SHAP explainer
+    share one loaded model. resolve=False loads path as given.
+    """
+    if resolve:
+        path = resolve_artifact_path(path)
+    if path not in _cache:
+        if path.endswith(NATIVE_EXTS):
+            import xgboost as xgb
+            with open(meta_path(path)) as f:
+                meta = json.load(f)
+            meta.pop('source_sha256', None)
+            model = xgb.XGBClassifier()
+            model.load_model(path)
+            _cache[path] = {**meta, 'model': _ensure_n_classes(model)}
+        else:
+            _cache[path] = joblib.load(path)
+    return path, _cache[path]
+
+
+def save_native(artifact: dict, path: str, source: str = None):
+    """
+    Write artifact['model'] in XGBoost's native format (by path extension,
+    .ubj or .json) and the remaining keys to <name>.meta.json. With source,
+    the .pkl the artifact was read from, its hash is recorded there too, so
+    the loader can tell when the conversion is stale.
+    """
+    if not path.endswith(NATIVE_EXTS):
+        raise ValueError(f'Native model path must end with one of {NATIVE_EXTS}: {path}')
+    meta = {k: v for k, v in artifact.items() if k not in ('model', 'source_sha256')}
+    if source:
+        meta['source_sha256'] = file_sha256(source)
+    try:
+        meta_json = json.dumps(meta, indent=2)
+    except TypeError as e:
+        raise ValueError(f'Artifact metadata is not JSON-serialisable: {e}')
+
+    _ensure_n_classes(artifact['model']).save_model(path)
+    with open(meta_path(path), 'w') as f:
+        f.write(meta_json)
+
+
+def update_artifact(path: str, fields: dict) -> list:
+    """
+    Merge fields (JSON-serialisable) into the artifact at path and into any
+    converted native copy next to it, so every format the loaders might
+    pick up stays in sync. Returns the files written.
+    """
+    root, _ = os.path.splitext(path)
+    written = []
+    natives = [root + native for native in NATIVE_EXTS if os.path.exists(root + native)]
+    # Only a conversion that matched the old .pkl is re-stamped for the new one
+    current = bool(natives) and os.path.exists(root + '.meta.json') and (
+        not os.path.exists(root + '.pkl') or _native_is_current(natives[0], root + '.pkl')
+    )
+    if os.path.exists(root + '.pkl'):
+        artifact = joblib.load(root + '.pkl')
+        artifact.update(fields)
+        tmp = root + '.pkl.tmp'
+        joblib.dump(artifact, tmp)
+        os.replace(tmp, root + '.pkl')
+        written.append(root + '.pkl')
+    if natives and os.path.exists(root + '.meta.json'):
+        with open(root + '.meta.json') as f:
+            meta = json.load(f)
+        meta.update(fields)
+        if current and os.path.exists(root + '.pkl'):
+            meta['source_sha256'] = file_sha256(root + '.pkl')
+        tmp = root + '.meta.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, root + '.meta.json')
+        written.append(root + '.meta.json')
+
+    # Drop cached copies so the next load_artifact sees the new fields
+    for cached in [p for p in _cache if os.path.splitext(p)[0] == root]:
+        del _cache[cached]
+    return written
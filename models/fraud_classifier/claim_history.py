@@ -0,0 +1,300 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from collections import deque
+
+# Sliding windows (in days) for the velocity features
+WINDOWS = (7, 30, 90)
+HORIZON = max(WINDOWS)    # days of history kept in memory per key
+
+# Key type -> claim field holding the key value
+KEY_FIELDS = {
+    'policy':   'policy_number',
+    'vehicle':  'vehicle_id',
+    'workshop': 'workshop_id',
+}
+
+VELOCITY_FEATURES = [
+    f'{key_type}_claims_{w}d' for key_type in KEY_FIELDS for w in WINDOWS
+]
+
+logger = logging.getLogger(__name__)
+_store = None
+
+
+def _is_missing(value) -> bool:
+    # None, empty string or NaN (from pandas rows)
+    return value is None or value == '' or value != value
+
+
+def parse_day(value) -> int:
+    """Convert a date, datetime or ISO date string to a day ordinal."""
+    if isinstance(value, datetime.datetime):
+        return value.date().toordinal()
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    return datetime.date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _to_day(value) -> int:
+    # Missing or unparseable dates count as today rather than failing the claim
+    today = datetime.date.today().toordinal()
+    if _is_missing(value):
+        return today
+    try:
+        return parse_day(value)
+    except (TypeError, ValueError):
+        logger.warning('Unparseable incident_date %r, using today', value)
+        return today
+
+
+class _WindowCounter:
+    """
+    Per-key claim counts over the sliding windows.
+
+    Keeps a day-sorted deque of [day, count] buckets covering the longest
+    window. Recording appends to the newest bucket (late arrivals walk back
+    to theirs) and expires buckets older than the longest window before the
+    newest recorded day, capped at today so a future-dated claim cannot
+    expire real history. Lookups only read the buckets, so querying any
+    date leaves the history intact. Every day up to `floor` was expired.
+    """
+    __slots__ = ('buckets', 'floor')
+
+    def __init__(self):
+        self.buckets = deque()
+        self.floor   = None
+
+    def add(self, day: int, today: int, n: int = 1):
+        dq = self.buckets
+        if not dq or dq[-1][0] < day:
+            dq.append([day, n])
+        elif dq[-1][0] == day:
+            dq[-1][1] += n
+        else:
+            # Late arrival: walk back to its bucket (at most HORIZON entries)
+            for i in range(len(dq) - 1, -1, -1):
+                if dq[i][0] == day:
+                    dq[i][1] += n
+                    break
+                if dq[i][0] < day:
+                    dq.insert(i + 1, [day, n])
+                    break
+            else:
+                dq.appendleft([day, n])
+
+        cutoff = min(dq[-1][0], today) - HORIZON
+        if dq[0][0] <= cutoff:
+            while dq and dq[0][0] <= cutoff:
+                dq.popleft()
+            self.floor = cutoff if self.floor is None else max(self.floor, cutoff)
+
+    def counts(self, day: int) -> dict:
+        out = {w: 0 for w in WINDOWS}
+        for d, n in self.buckets:
+            if d > day:
+                break
+            for w in WINDOWS:
+                if d > day - w:
+                    out[w] += n
+        return out
+
+
+# Identity of a claim recorded without a claim_id
+_ANON_KEY = (
+    "COALESCE(policy_number, ''), COALESCE(vehicle_id, ''), "
+    "COALESCE(workshop_id, ''), claim_day"
+)
+
+
+class ClaimHistoryStore:
+    """
+    Append-only SQLite log of claims with in-memory sliding-window counters.
+
+    The SQLite table is the durable record; on open, only claims from the
+    last HORIZON days before today (and any dated later) are replayed into
+    the counters. Lookups for recent dates never touch SQLite, so their cost
+    does not grow with history size. A lookup whose windows reach back past
+    what the counters hold (point-in-time features for old claims) is
+    answered from SQLite instead.
+
+    Inserts are idempotent: a claim_id is recorded once, and a claim
+    without one is recorded once per policy, vehicle, workshop and day, so
+    re-scoring or retrying a claim does not inflate its velocity.
+    """
+
+    def __init__(self, path='data/claim_history.db'):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock     = threading.Lock()
+        self._counters = {}
+        self._floor    = None   # days up to here were not replayed
+        self._conn     = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS claims ('
+            '  claim_id      TEXT UNIQUE,'
+            '  policy_number TEXT,'
+            '  vehicle_id    TEXT,'
+            '  workshop_id   TEXT,'
+            '  claim_day     INTEGER NOT NULL'
+            ')'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_claims_day ON claims (claim_day)'
+        )
+        for field in KEY_FIELDS.values():
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_claims_{field} ON claims ({field}, claim_day)'
+            )
+        # claim_id is UNIQUE, but NULLs never collide: dedupe those on their
+        # keys and day. Stores written before this index may hold repeats.
+        self._conn.execute(
+            'DELETE FROM claims WHERE claim_id IS NULL AND rowid NOT IN ('
+            '  SELECT MIN(rowid) FROM claims WHERE claim_id IS NULL'
+            '  GROUP BY ' + _ANON_KEY + ')'
+        )
+        self._conn.execute(
+            'CREATE UNIQUE INDEX IF NOT EXISTS idx_claims_anon '
+            'ON claims (' + _ANON_KEY + ') WHERE claim_id IS NULL'
+        )
+        self._conn.commit()
+        self._replay()
+
+    def _replay(self):
+        # Anchor on today: a single future-dated claim must not push the
+        # real window out of the replay
+        today = datetime.date.today().toordinal()
+        if self._conn.execute(
+            'SELECT 1 FROM claims WHERE claim_day <= ? LIMIT 1', (today - HORIZON,)
+        ).fetchone():
+            self._floor = today - HORIZON
+        rows = self._conn.execute(
+            'SELECT policy_number, vehicle_id, workshop_id, claim_day FROM claims '
+            'WHERE claim_day > ? ORDER BY claim_day',
+            (today - HORIZON,)
+        )
+        for policy, vehicle, workshop, day in rows:
+            self._count(day, {'policy': policy, 'vehicle': vehicle, 'workshop': workshop}, today)
+
+    def _count(self, day: int, keys: dict, today: int):
+        for key_type, key_value in keys.items():
+            if _is_missing(key_value):
+                continue
+            counter = self._counters.get((key_type, key_value))
+            if counter is None:
+                counter = self._counters[(key_type, key_value)] = _WindowCounter()
+            counter.add(day, today)
+
+    def _counts_from_db(self, key_type: str, key_value: str, day: int) -> dict:
+        field = KEY_FIELDS[key_type]
+        rows  = self._conn.execute(
+            f'SELECT claim_day FROM claims WHERE {field} = ? AND claim_day > ? AND claim_day <= ?',
+            (key_value, day - HORIZON, day)
+        )
+        out = {w: 0 for w in WINDOWS}
+        for (d,) in rows:
+            for w in WINDOWS:
+                if d > day - w:
+                    out[w] += 1
+        return out
+
+    @staticmethod
+    def _keys(claim: dict) -> dict:
+        return {
+            key_type: (None if _is_missing(claim.get(field)) else str(claim[field]))
+            for key_type, field in KEY_FIELDS.items()
+        }
+
+    def _recorded_day(self, claim: dict, keys: dict):
+        # Day the claim itself was recorded on, or None if it is not stored
+        if not _is_missing(claim.get('claim_id')):
+            row = self._conn.execute(
+                'SELECT claim_day FROM claims WHERE claim_id = ?', (claim['claim_id'],)
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                'SELECT claim_day FROM claims WHERE claim_id IS NULL AND '
+                "COALESCE(policy_number, '') = ? AND COALESCE(vehicle_id, '') = ? AND "
+                "COALESCE(workshop_id, '') = ? AND claim_day = ?",
+                (keys['policy'] or '', keys['vehicle'] or '', keys['workshop'] or '',
+                 _to_day(claim.get('incident_date')))
+            ).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, claim: dict, as_of=None, exclude_self: bool = False) -> dict:
+        """
+        Return prior claim counts per key and window as of a date.
+
+        The API looks a claim up before recording it. For a claim that is
+        already in the store (training rows over a backfilled history),
+        exclude_self=True leaves its own record out so the counts match.
+        """
+        day  = _to_day(as_of if as_of is not None else claim.get('incident_date'))
+        keys = self._keys(claim)
+
+        features = {name: 0 for name in VELOCITY_FEATURES}
+        with self._lock:
+            own_day = self._recorded_day(claim, keys) if exclude_self else None
+            for key_type, key_value in keys.items():
+                if key_value is None:
+                    continue
+                counter = self._counters.get((key_type, key_value))
+                floors  = [f for f in (self._floor, counter and counter.floor) if f is not None]
+                if floors and day - HORIZON < max(floors):
+                    counts = self._counts_from_db(key_type, key_value, day)
+                elif counter is not None:
+                    counts = counter.counts(day)
+                else:
+                    continue
+                for w, n in counts.items():
+                    if own_day is not None and day - w < own_day <= day:
+                        n -= 1
+                    features[f'{key_type}_claims_{w}d'] = n
+        return features
+
+    def record(self, claim: dict) -> bool:
+        """Append a claim. Returns False if it was already recorded."""
+        return self.record_many([claim]) == 1
+
+    def record_many(self, claims) -> int:
+        """Append claims in one transaction. Returns the number inserted."""
+        inserted = 0
+        today    = datetime.date.today().toordinal()
+        with self._lock:
+            for claim in claims:
+                keys = self._keys(claim)
+                if not any(keys.values()):
+                    continue  # nothing to count against
+                day  = _to_day(claim.get('incident_date'))
+                cur  = self._conn.execute(
+                    'INSERT OR IGNORE INTO claims '
+                    '(claim_id, policy_number, vehicle_id, workshop_id, claim_day) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (claim.get('claim_id'), keys['policy'], keys['vehicle'],
+                     keys['workshop'], day)
+                )
+                if cur.rowcount:
+                    self._count(day, keys, today)
+                    inserted += 1
+            self._conn.commit()
+        return inserted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_claim_history(path='data/claim_history.db'):
+    global _store
+    _store = ClaimHistoryStore(path)
+    print(f'[HIST] Claim history loaded from {path} '
+          f'({len(_store._counters)} active keys)')
+
+
+def get_claim_history():
+    return _store
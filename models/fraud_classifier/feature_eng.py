@@ -33,7 +33,11 @@ def get_hour_bin(hour) -> int:
     return 2       # day
 
 
-def engineer_features(df: pd.DataFrame, damage_preds: list = None) -> pd.DataFrame:
+def engineer_features(
+    df: pd.DataFrame,
+    damage_preds: list = None,
+    history=None
+) -> pd.DataFrame:
     df = df.copy()
 
     if 'incident_city' in df.columns:
@@ -58,6 +62,18 @@ def engineer_features(df: pd.DataFrame, damage_preds: list = None) -> pd.DataFra
             df['total_claim_amount'] / (df['vehicle_claim'] + 1)
         ).clip(0, 10)
 
+    # Claim velocity per policy / vehicle / workshop from the history store.
+    # Rows are usually already recorded there; leave each row's own record
+    # out, as the API looks a claim up before recording it.
+    if history is not None:
+        velocity = [
+            history.lookup(row, as_of=row.get('incident_date'), exclude_self=True)
+            for row in df.to_dict('records')
+        ]
+        velocity_df = pd.DataFrame(velocity, index=df.index)
+        for col in velocity_df.columns:
+            df[col] = velocity_df[col]
+
     # Fuse DL damage prediction as a feature
     if damage_preds is not None:
         df['damage_severity_idx'] = [p['severity_idx'] for p in damage_preds]
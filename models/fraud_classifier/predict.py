@@ -1,8 +1,19 @@
-import joblib
+import threading
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 
+from models.fraud_classifier.artifact import load_artifact
+
 _artifact = None
+_booster  = None
+_iteration_range = (0, 0)
+_row_buffers     = threading.local()
+
+# Decision cutoffs on fraud_probability. Overridden by the artifact's
+# 'thresholds' key, written by scripts/recalibrate_fraud_thresholds.py
+DEFAULT_THRESHOLDS = {'medium': 0.4, 'flag': 0.5, 'high': 0.7}
+_thresholds        = dict(DEFAULT_THRESHOLDS)
 
 LABEL_ENCODERS = {}
 
@@ -27,16 +38,77 @@ STRING_COLS = [
 ]
 
 
+_STRING_COL_SET = set(STRING_COLS)
+
+
 def load_fraud_model(path='models/fraud_classifier/xgb_fraud_model.pkl'):
-    global _artifact
-    _artifact = joblib.load(path)
-    print(f'[XGB] Fraud model loaded from {path}')
+    global _artifact, _booster, _iteration_range, _thresholds
+    # Loads a converted .ubj / .json booster next to the .pkl if present
+    path, _artifact = load_artifact(path)
+    _thresholds     = {**DEFAULT_THRESHOLDS, **_artifact.get('thresholds', {})}
 
+    # Keep a handle on the raw booster for the low-overhead path
+    model    = _artifact['model']
+    _booster = model.get_booster() if hasattr(model, 'get_booster') else None
+    _iteration_range = _get_iteration_range(model)
+    print(f'[XGB] Fraud model loaded from {path} (thresholds {_thresholds})')
 
-def predict_fraud(claim_dict: dict, damage_pred: dict = None) -> dict:
-    if _artifact is None:
-        raise RuntimeError('Model not loaded. Call load_fraud_model() first.')
 
+def get_thresholds() -> dict:
+    return dict(_thresholds)
+
+
+def get_monitoring_reference():
+    """Reference score/feature histograms saved with the artifact, if any."""
+    return _artifact.get('monitoring_reference') if _artifact is not None else None
+
+
+def _get_iteration_range(model) -> tuple:
+    # Mirror the sklearn wrapper: predict_proba stops at best_iteration
+    # when the model was trained with early stopping
+    try:
+        return (0, int(model.best_iteration) + 1)
+    except (AttributeError, TypeError):
+        return (0, 0)
+
+
+def encode_claim(claim_dict: dict, out: np.ndarray = None) -> np.ndarray:
+    """
+    Encode a claim into a float32 row in FEATURE_COLS order.
+
+    Matches the pandas path exactly: that path fits a fresh LabelEncoder on
+    a single row, so every string column encodes to 0, and every numeric
+    column is cast to int.
+    """
+    if out is None:
+        out = np.empty(len(FEATURE_COLS), dtype=np.float32)
+    for i, col in enumerate(FEATURE_COLS):
+        if col in _STRING_COL_SET:
+            out[i] = 0
+        else:
+            out[i] = int(claim_dict.get(col, 0))
+    return out
+
+
+def _row_buffer() -> np.ndarray:
+    # One preallocated (1, n_features) row per thread; the API runs
+    # inference from Starlette's threadpool
+    buf = getattr(_row_buffers, 'row', None)
+    if buf is None:
+        buf = _row_buffers.row = np.zeros((1, len(FEATURE_COLS)), dtype=np.float32)
+    return buf
+
+
+def predict_proba_fast(claim_dict: dict) -> float:
+    """Score a single claim with the booster's in-place prediction."""
+    row = _row_buffer()
+    encode_claim(claim_dict, out=row[0])
+    pred = _booster.inplace_predict(row, iteration_range=_iteration_range)
+    return float(np.asarray(pred).reshape(-1)[0])
+
+
+def predict_proba_pandas(claim_dict: dict) -> float:
+    """Reference path through a one-row DataFrame and predict_proba."""
     model = _artifact['model']
 
     # Build row with only the 31 expected feature columns
@@ -54,12 +126,32 @@ def predict_fraud(claim_dict: dict, damage_pred: dict = None) -> dict:
     # Force everything to int
     df = df.astype(int)
 
-    fraud_prob = float(model.predict_proba(df)[0][1])
+    return float(model.predict_proba(df)[0][1])
+
 
-    if fraud_prob >= 0.7:
+def predict_fraud_batch_proba(claim_dicts: list) -> np.ndarray:
+    """Score many claims with one in-place prediction over the encoded batch."""
+    if _artifact is None:
+        raise RuntimeError('Model not loaded. Call load_fraud_model() first.')
+    if _booster is None:
+        raise RuntimeError(
+            'Fraud model has no XGBoost booster; score claims one at a time '
+            'with predict_proba_pandas().'
+        )
+
+    X = np.empty((len(claim_dicts), len(FEATURE_COLS)), dtype=np.float32)
+    for i, claim_dict in enumerate(claim_dicts):
+        encode_claim(claim_dict, out=X[i])
+    pred = _booster.inplace_predict(X, iteration_range=_iteration_range)
+    return np.asarray(pred, dtype=np.float32).reshape(-1)
+
+
+def fraud_decision(fraud_prob: float) -> dict:
+    """Map a fraud probability to the flag, risk level and recommendation."""
+    if fraud_prob >= _thresholds['high']:
         risk = 'HIGH'
         recommendation = 'Flag for manual investigation immediately.'
-    elif fraud_prob >= 0.4:
+    elif fraud_prob >= _thresholds['medium']:
         risk = 'MEDIUM'
         recommendation = 'Assign to senior adjuster for review.'
     else:
@@ -68,7 +160,26 @@ def predict_fraud(claim_dict: dict, damage_pred: dict = None) -> dict:
 
     return {
         'fraud_probability': round(fraud_prob, 4),
-        'fraud_flag':        fraud_prob >= 0.5,
+        'fraud_flag':        fraud_prob >= _thresholds['flag'],
         'risk_level':        risk,
         'recommendation':    recommendation
-    }
\ No newline at end of file
+    }
+
+
+def predict_fraud(claim_dict: dict, damage_pred: dict = None) -> dict:
+    if _artifact is None:
+        raise RuntimeError('Model not loaded. Call load_fraud_model() first.')
+
+    if _booster is not None:
+        fraud_prob = predict_proba_fast(claim_dict)
+    else:
+        fraud_prob = predict_proba_pandas(claim_dict)
+
+    return fraud_decision(fraud_prob)
+
+
+def predict_fraud_batch(claim_dicts: list) -> list:
+    """predict_fraud() for many claims, scored in one batch."""
+    if _booster is None:
+        return [predict_fraud(claim_dict) for claim_dict in claim_dicts]
+    return [fraud_decision(float(p)) for p in predict_fraud_batch_proba(claim_dicts)]
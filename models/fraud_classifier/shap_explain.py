@@ -1,8 +1,9 @@
 import shap
-import joblib
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 
+from models.fraud_classifier.artifact import load_artifact
+
 _explainer    = None
 _feature_cols = None
 
@@ -18,7 +19,8 @@ STRING_COLS = [
 
 def load_explainer(path='models/fraud_classifier/xgb_fraud_model.pkl'):
     global _explainer, _feature_cols
-    artifact      = joblib.load(path)
+    # Shares the artifact already loaded by load_fraud_model()
+    _, artifact   = load_artifact(path)
     _explainer    = shap.TreeExplainer(artifact['model'])
     _feature_cols = artifact['feature_cols']
     print('[SHAP] Explainer loaded')
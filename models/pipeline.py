@@ -0,0 +1,150 @@
+import logging
+
+from models.damage_classifier.predict import predict_damage
+from models.damage_classifier.photo_index import match_and_index
+from models.claim_nlp.anomaly_score import score_text
+from models.claim_nlp.text_index import index_claim_text
+from models.fraud_classifier.predict import predict_fraud
+from models.fraud_classifier.shap_explain import explain
+from models.fraud_classifier.claim_history import get_claim_history
+
+# Order in which stage results become available. Velocity and NLP go first
+# because they only need the claim form; SHAP goes last as the slowest.
+STAGES = ['velocity', 'nlp', 'damage', 'photo', 'fraud', 'explanation']
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NLP_RESULT = {
+    'anomaly_score':      0.0,
+    'triggered_keywords': [],
+    'top_fraud_pattern':  None,
+    'similar_claims':     []
+}
+
+
+def nlp_stage(incident_description, claim_id=None, semantic=True, index=True) -> dict:
+    """Score the description, then add it to the text index. Raises on failure."""
+    if not incident_description:
+        return dict(DEFAULT_NLP_RESULT)
+    result = score_text(incident_description, claim_id=claim_id, semantic=semantic)
+
+    # Index after scoring so a claim never matches itself. A failed insert
+    # only costs future matches, so the score is still returned.
+    if index:
+        try:
+            index_claim_text(claim_id, incident_description)
+        except Exception:
+            logger.warning('Indexing claim %s description failed', claim_id, exc_info=True)
+    return result
+
+
+def run_nlp(incident_description, claim_id=None) -> dict:
+    try:
+        return nlp_stage(incident_description, claim_id)
+    except Exception:
+        # NLP failure is non-fatal, use defaults
+        logger.warning('NLP stage failed', exc_info=True)
+        return dict(DEFAULT_NLP_RESULT)
+
+
+def velocity_stage(claim_dict: dict):
+    """Prior claim counts; None if no store is loaded. Raises on failure."""
+    history = get_claim_history()
+    if history is None:
+        return None
+    return history.lookup(claim_dict)
+
+
+def run_velocity(claim_dict: dict):
+    # As velocity_stage, but a failed lookup is logged and returns None
+    try:
+        return velocity_stage(claim_dict)
+    except Exception:
+        logger.warning('Velocity stage failed', exc_info=True)
+        return None
+
+
+def record_claim(claim_dict: dict):
+    """
+    Add a scored claim to the history store. Called only once the fraud
+    stage has succeeded, so failed or retried requests are not counted.
+    """
+    history = get_claim_history()
+    if history is None:
+        return
+    try:
+        history.record(claim_dict)
+    except Exception:
+        logger.warning('Recording claim history failed', exc_info=True)
+
+
+def run_photo_match(pil_img, embedding, claim_id=None) -> list:
+    # Near-duplicate photos from past claims; [] if no index is loaded
+    try:
+        return match_and_index(pil_img, embedding, claim_id)
+    except Exception:
+        logger.warning('Photo fingerprint stage failed', exc_info=True)
+        return []
+
+
+def run_explanation(claim_dict: dict) -> dict:
+    try:
+        return explain(claim_dict)
+    except Exception:
+        logger.warning('SHAP stage failed', exc_info=True)
+        return {'top_factors': []}
+
+
+def run_pipeline(pil_img, claim_dict: dict, incident_description=None):
+    """
+    Run the claim stages in order, yielding (stage, result) as soon as
+    each one is computed so callers can render or stream partial results.
+
+    Damage and fraud errors propagate to the caller; NLP and SHAP failures
+    fall back to empty results.
+    """
+    # Step 0 — Claim history: velocity per policy / vehicle / workshop
+    yield 'velocity', run_velocity(claim_dict)
+
+    # Step 1 — NLP: anomaly score from incident description
+    yield 'nlp', run_nlp(incident_description, claim_dict.get('claim_id'))
+
+    # Step 2 — DL: damage severity from image
+    damage_result = predict_damage(pil_img, return_embedding=True)
+    embedding     = damage_result.pop('embedding')
+    yield 'damage', damage_result
+
+    # Step 2b — Photo fingerprint: near-duplicates across past claims
+    yield 'photo', run_photo_match(pil_img, embedding, claim_dict.get('claim_id'))
+
+    # Step 3 — XGBoost: fraud probability
+    fraud_result = predict_fraud(claim_dict, damage_pred=damage_result)
+    record_claim(claim_dict)
+    yield 'fraud', fraud_result
+
+    # Step 4 — SHAP explanation
+    yield 'explanation', run_explanation(claim_dict)
+
+
+def build_summary(results: dict) -> dict:
+    """Flatten per-stage results into the FraudPredictionResponse shape."""
+    fraud_result  = results['fraud']
+    damage_result = results['damage']
+    nlp_result    = results.get('nlp', DEFAULT_NLP_RESULT)
+    explanation   = results.get('explanation', {'top_factors': []})
+
+    return {
+        'fraud_probability':  fraud_result['fraud_probability'],
+        'fraud_flag':         fraud_result['fraud_flag'],
+        'risk_level':         fraud_result['risk_level'],
+        'recommendation':     fraud_result['recommendation'],
+        'damage_severity':    damage_result['severity'],
+        'damage_confidence':  damage_result['confidence'],
+        'anomaly_score':      nlp_result.get('anomaly_score'),
+        'triggered_keywords': nlp_result.get('triggered_keywords', []),
+        'top_shap_factors':   explanation.get('top_factors', []),
+        'claim_velocity':     results.get('velocity'),
+        'duplicate_photos':   results.get('photo', []),
+        'similar_claims':     nlp_result.get('similar_claims', []),
+        'skipped_stages':     results.get('skipped', [])
+    }
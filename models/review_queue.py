@@ -0,0 +1,240 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from PIL import Image
+
+from models.damage_classifier.predict import predict_damage_batch
+from models.fraud_classifier.predict import predict_fraud_batch
+from models.pipeline import run_velocity, run_nlp, run_photo_match, record_claim
+
+IMAGE_EXTS      = ('.jpg', '.jpeg', '.png')
+MAX_CACHED_ROWS = 100_000    # scored rows kept for reuse across jobs and reruns
+MAX_JOBS        = 8          # finished jobs (and their zips) kept in memory
+
+logger = logging.getLogger(__name__)
+
+# Shared by every job: row hash -> scored row, least recently used first
+_row_cache      = OrderedDict()
+_row_cache_lock = threading.Lock()
+
+# Job key (hash of the uploaded files) -> ReviewJob
+_jobs      = {}
+_jobs_lock = threading.Lock()
+
+
+def input_hash(*blobs: bytes) -> str:
+    h = hashlib.sha256()
+    for blob in blobs:
+        h.update(hashlib.sha256(blob).digest())
+    return h.hexdigest()
+
+
+def _row_key(claim: dict, image_bytes: bytes) -> str:
+    claim_json = json.dumps(claim, sort_keys=True, default=str).encode()
+    return input_hash(claim_json, image_bytes or b'')
+
+
+def _cached_row(key: str):
+    with _row_cache_lock:
+        row = _row_cache.get(key)
+        if row is not None:
+            _row_cache.move_to_end(key)
+        return row
+
+
+def _cache_row(key: str, row: dict):
+    with _row_cache_lock:
+        _row_cache[key] = row
+        while len(_row_cache) > MAX_CACHED_ROWS:
+            _row_cache.popitem(last=False)
+
+
+class ReviewJob:
+    """
+    Scores a list of claims against photos from a zip in a background thread.
+
+    Claims are processed batch_size at a time: photos are decoded once, the
+    damage model and fraud model each run once per batch, then NLP, photo
+    matching and velocity run per claim. Finished rows land in self.rows in
+    input order as each batch completes, so a UI can poll results() while
+    the job runs. Rows already scored for the same claim and photo bytes are
+    reused from the shared cache instead of recomputed. A claim that fails
+    gets an error row; the rest of the job carries on. The zip is dropped
+    once the job finishes.
+    """
+
+    def __init__(self, claims: list, zip_bytes: bytes, batch_size: int = 32):
+        self.claims     = claims
+        self.batch_size = batch_size
+        self.rows       = [None] * len(claims)
+        self.done       = 0
+        self.error      = None
+
+        self._zip     = zipfile.ZipFile(io.BytesIO(zip_bytes))
+        self._members = {}
+        for name in self._zip.namelist():
+            base = os.path.basename(name)
+            if base.lower().endswith(IMAGE_EXTS) and not base.startswith('.'):
+                # Match on the file name or its stem, case-insensitively
+                self._members.setdefault(base.lower(), name)
+                self._members.setdefault(os.path.splitext(base)[0].lower(), name)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def total(self) -> int:
+        return len(self.claims)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def results(self) -> list:
+        """Rows scored so far, in input order."""
+        return [row for row in self.rows if row is not None]
+
+    def _image_bytes(self, claim: dict):
+        # Explicit image column first, then a file named after the claim ID
+        for ref in (claim.get('image'), claim.get('claim_id')):
+            if not ref:
+                continue
+            member = self._members.get(os.path.basename(str(ref)).lower())
+            if member is not None:
+                return self._zip.read(member)
+        return None
+
+    def _run(self):
+        try:
+            for start in range(0, self.total, self.batch_size):
+                stop = min(start + self.batch_size, self.total)
+                self._score_batch(range(start, stop))
+                self.done = stop
+        except Exception as e:
+            logger.exception('Review queue job failed')
+            self.error = str(e)
+        finally:
+            # Finished jobs stay cached for reruns; their photos are not needed
+            self._zip, self._members = None, {}
+
+    def _score_batch(self, indices):
+        pending = []
+        for i in indices:
+            claim = self.claims[i]
+            try:
+                data = self._image_bytes(claim)
+            except Exception as e:
+                self.rows[i] = _error_row(claim, i, f'unreadable zip entry: {e}')
+                continue
+            if data is None:
+                self.rows[i] = _error_row(claim, i, 'image not found in zip')
+                continue
+            key    = _row_key(claim, data)
+            cached = _cached_row(key)
+            if cached is not None:
+                self.rows[i] = cached
+                continue
+            try:
+                img = Image.open(io.BytesIO(data)).convert('RGB')
+            except Exception as e:
+                self.rows[i] = _error_row(claim, i, f'unreadable image: {e}')
+                continue
+            pending.append((i, key, claim, img))
+
+        if not pending:
+            return
+
+        try:
+            predictions = self._predict(pending)
+        except Exception:
+            # One bad claim sinks a batched call: score the batch claim by
+            # claim so only the bad ones fail
+            logger.warning('Batch scoring failed; retrying claim by claim', exc_info=True)
+            predictions = []
+            for item in pending:
+                try:
+                    predictions += self._predict([item])
+                except Exception as e:
+                    predictions.append(e)
+
+        for (i, key, claim, img), predicted in zip(pending, predictions):
+            try:
+                if isinstance(predicted, Exception):
+                    raise predicted
+                row = self._score_row(i, claim, img, *predicted)
+            except Exception as e:
+                logger.warning('Review queue row %d failed', i + 1, exc_info=True)
+                self.rows[i] = _error_row(claim, i, f'scoring failed: {e}')
+                continue
+            _cache_row(key, row)
+            self.rows[i] = row
+
+    def _predict(self, pending) -> list:
+        # One damage-model and one fraud-model call for the whole list
+        damage_results = predict_damage_batch(
+            [img for _, _, _, img in pending], batch_size=self.batch_size,
+            return_embedding=True
+        )
+        fraud_results = predict_fraud_batch([claim for _, _, claim, _ in pending])
+        return list(zip(damage_results, fraud_results))
+
+    def _score_row(self, i: int, claim: dict, img, damage: dict, fraud: dict) -> dict:
+        embedding = damage.pop('embedding')
+        claim_id  = claim.get('claim_id')
+        velocity  = run_velocity(claim)
+        nlp       = run_nlp(claim.get('incident_description'), claim_id)
+        photos    = run_photo_match(img, embedding, claim_id)
+        record_claim(claim)
+
+        return {
+            'claim_id':          claim_id or f'row {i + 1}',
+            'fraud_probability': fraud['fraud_probability'],
+            'risk_level':        fraud['risk_level'],
+            'fraud_flag':        fraud['fraud_flag'],
+            'damage_severity':   damage['severity'],
+            'damage_confidence': damage['confidence'],
+            'anomaly_score':     nlp.get('anomaly_score'),
+            'keywords':          ', '.join(nlp.get('triggered_keywords', [])),
+            'similar_claims':    len(nlp.get('similar_claims', [])),
+            'duplicate_photos':  len(photos),
+            'prior_claims_90d':  max(
+                (v for k, v in (velocity or {}).items() if k.endswith('_90d')), default=None
+            ),
+            'recommendation':    fraud['recommendation'],
+            'error':             None,
+        }
+
+
+def _error_row(claim: dict, i: int, message: str) -> dict:
+    return {'claim_id': claim.get('claim_id') or f'row {i + 1}', 'error': message}
+
+
+def get_job(key: str):
+    return _jobs.get(key)
+
+
+def start_job(key: str, claims: list, zip_bytes: bytes, batch_size: int = 32) -> ReviewJob:
+    """
+    Start scoring under key (see input_hash), or return the job already
+    running or finished for the same inputs.
+    """
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None:
+            finished = [k for k, j in _jobs.items() if not j.running]
+            for old in finished[:max(0, len(_jobs) - MAX_JOBS + 1)]:
+                del _jobs[old]
+            job = _jobs[key] = ReviewJob(claims, zip_bytes, batch_size).start()
+        return job
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+# New rows are flushed to a segment after this many rows or seconds
+FLUSH_ROWS    = 1024
+FLUSH_SECONDS = 60
+
+# Merge the smallest MERGE_FACTOR segments once there are more than MAX_SEGMENTS
+MAX_SEGMENTS  = 16
+MERGE_FACTOR  = 8
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every worker process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f   = None
+
+    def __enter__(self):
+        self._f = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+
+
+def segment_name() -> str:
+    # Unique across workers sharing a directory
+    return f'seg-{time.time_ns():x}-{os.getpid()}'
+
+
+def write_arrays(path: str, arrays: dict):
+    """Write a segment's arrays under a temporary name, then rename into place."""
+    tmp = path + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + '.npy'), array)
+    os.replace(tmp, path)
+
+
+class SegmentStore:
+    """
+    Directory of immutable segments listed in manifest.json, plus the rows
+    added since the last flush, kept in memory.
+
+    Unflushed rows are written out as a new segment every FLUSH_ROWS rows
+    or FLUSH_SECONDS, in a background thread, so a crash loses at most that
+    much. Once there are more than MAX_SEGMENTS, the MERGE_FACTOR smallest
+    are merged into one. Workers sharing a directory update the manifest
+    under a file lock, and each flush also opens the segments other workers
+    have written, so no worker's rows overwrite another's.
+
+    Subclasses keep the hashing and scoring and provide:
+
+        _new_delta()                an empty in-memory batch
+        _delta_len(delta)           rows in a batch
+        _combine(first, second)     one batch holding both, first's rows first
+        _open_segment(path)         open a segment directory
+        _write_segment(path, delta) write a batch as a segment, return it opened
+        _merge_segments(path, segs) write segs as one segment, return it opened
+    """
+    kind = 'Index'    # used in log messages
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._lock       = threading.Lock()    # segments and unflushed rows
+        self._save_lock  = threading.Lock()    # one flush at a time
+        self._segments   = []
+        self._delta      = self._new_delta()
+        self._pending    = self._new_delta()   # being written by a flush
+        self._last_flush = time.monotonic()
+        self._flushing   = False
+
+    def __len__(self):
+        return sum(len(s) for s in self._segments) + \
+            self._delta_len(self._pending) + self._delta_len(self._delta)
+
+    # ── Flushing ─────────────────────────────────────────────────────────────
+    def _maybe_flush(self):
+        if not self.path or self._flushing:
+            return
+        unsaved = self._delta_len(self._delta)
+        due     = unsaved >= FLUSH_ROWS or (
+            unsaved and time.monotonic() - self._last_flush >= FLUSH_SECONDS
+        )
+        if due:
+            self._flushing = True
+            threading.Thread(target=self._background_save, daemon=True).start()
+
+    def _background_save(self):
+        try:
+            self.save()
+        except Exception:
+            # Rows stay in memory and are retried on the next flush
+            logger.exception('%s flush to %s failed', self.kind, self.path)
+        finally:
+            self._flushing = False
+
+    def _prepare(self):
+        """Called under the file lock before a flush writes its segment."""
+
+    def save(self) -> int:
+        """
+        Write rows added since the last save as a new segment, merge small
+        segments and pick up other workers' segments. A no-op when nothing
+        was added. Returns the number of rows written.
+        """
+        with self._save_lock:
+            with self._lock:
+                batch, self._delta = self._delta, self._new_delta()
+                self._pending      = batch
+            self._last_flush = time.monotonic()
+            n = self._delta_len(batch)
+            if not n:
+                return 0
+
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                with self._file_lock():
+                    self._prepare()
+                    name = segment_name()
+                    self._write_segment(os.path.join(self.path, name), batch)
+                    names = self._read_manifest() + [name]
+                    self._write_manifest(names)
+                    self._sync_segments(names, flushed=True)
+                    self._compact()
+            except Exception:
+                # Keep unwritten rows queryable and retry them on the next save
+                with self._lock:
+                    if self._delta_len(self._pending):
+                        self._delta   = self._combine(self._pending, self._delta)
+                        self._pending = self._new_delta()
+                raise
+            return n
+
+    def _compact(self):
+        # Caller holds the file lock
+        if len(self._segments) <= MAX_SEGMENTS:
+            return
+        merge = sorted(self._segments, key=len)[:MERGE_FACTOR]
+        name  = segment_name()
+        self._merge_segments(os.path.join(self.path, name), merge)
+
+        merged = {seg.name for seg in merge}
+        names  = [s.name for s in self._segments if s.name not in merged] + [name]
+        self._write_manifest(names)
+        self._sync_segments(names)
+        for seg in merge:
+            # Open memory maps elsewhere stay valid after the unlink
+            shutil.rmtree(seg.path, ignore_errors=True)
+
+    # ── Manifest ─────────────────────────────────────────────────────────────
+    def _file_lock(self):
+        return FileLock(os.path.join(self.path, '.lock'))
+
+    def _read_manifest(self) -> list:
+        try:
+            with open(os.path.join(self.path, 'manifest.json')) as f:
+                return json.load(f)['segments']
+        except FileNotFoundError:
+            return []
+
+    def _write_manifest(self, names: list):
+        tmp = os.path.join(self.path, 'manifest.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'segments': names}, f)
+        os.replace(tmp, os.path.join(self.path, 'manifest.json'))
+
+    def _sync_segments(self, names: list, flushed: bool = False):
+        # Open segments other workers added; drop ones merged away. flushed:
+        # the pending rows are now in a segment, so stop scanning them too.
+        opened   = {s.name: s for s in self._segments}
+        segments = [
+            opened.get(name) or self._open_segment(os.path.join(self.path, name)) for name in names
+        ]
+        with self._lock:
+            self._segments = segments
+            if flushed:
+                self._pending = self._new_delta()
+
+    def _load_segments(self):
+        """Open the segments listed in the manifest, if the directory exists."""
+        if os.path.isdir(self.path):
+            with self._file_lock():
+                self._sync_segments(self._read_manifest())
+        return self
+
@@ -0,0 +1,117 @@
+"""
+Compare training data throughput: the notebook's JPEG loader vs the cache.
+
+    python scripts/bench_damage_loader.py data/organized --workers 2 4 8
+    python scripts/bench_damage_loader.py data/organized --train-step
+
+The baseline is the loader from notebooks/train_damage_classifier.ipynb:
+every item is opened with PIL, decoded, resized and augmented. The cached
+loader reads the memory-mapped uint8 shards built by build_cache() and only
+augments. Both feed the same batch size and worker count; images/s is
+measured over --batches batches after one warm-up batch. With --train-step
+each batch also runs a forward/backward pass of DamageClassifier, so the
+numbers are end-to-end training throughput on this machine.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+from torchvision import transforms
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.damage_classifier.model import DamageClassifier  # noqa: E402
+from models.damage_classifier.predict import RESIZE, NORMALIZE  # noqa: E402
+from models.damage_classifier.dataset import (  # noqa: E402
+    TRAIN_AUGMENT, list_images, build_cache, CachedDamageDataset
+)
+
+# TRAIN_TRANSFORMS from the notebook, applied to a freshly decoded PIL image
+NOTEBOOK_TRANSFORMS = transforms.Compose([
+    RESIZE,
+    *TRAIN_AUGMENT.transforms,
+    transforms.ToTensor(),
+    NORMALIZE
+])
+
+
+class JpegDamageDataset(Dataset):
+    """The notebook's CarDamageDataset: decode + transform on every access."""
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        path, label = self.samples[idx]
+        try:
+            img = Image.open(path).convert('RGB')
+        except Exception:
+            img = Image.new('RGB', (224, 224), (128, 128, 128))
+        return NOTEBOOK_TRANSFORMS(img), label
+
+
+def measure(dataset, batch: int, workers: int, batches: int, model=None) -> float:
+    loader = DataLoader(dataset, batch_size=batch, shuffle=True, num_workers=workers)
+    if model is not None:
+        optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+        criterion = torch.nn.CrossEntropyLoss()
+
+    it = iter(loader)
+    next(it)  # warm-up: worker start-up and first shard / file reads
+    n  = 0
+    t0 = time.perf_counter()
+    for _ in range(batches):
+        try:
+            imgs, labels = next(it)
+        except StopIteration:
+            it = iter(loader)
+            imgs, labels = next(it)
+        if model is not None:
+            optimizer.zero_grad()
+            criterion(model(imgs), labels).backward()
+            optimizer.step()
+        n += len(labels)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('data_dir')
+    parser.add_argument('--cache-dir',  default='data/damage_cache')
+    parser.add_argument('--batch',      type=int, default=16)
+    parser.add_argument('--batches',    type=int, default=50)
+    parser.add_argument('--workers',    type=int, nargs='+', default=[2])
+    parser.add_argument('--train-step', action='store_true',
+                        help='include a DamageClassifier forward/backward per batch')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    build_cache(args.data_dir, args.cache_dir, workers=os.cpu_count())
+    print(f'Cache build/check: {time.perf_counter() - t0:.1f}s (one-off)\n')
+
+    jpeg_ds   = JpegDamageDataset(list_images(args.data_dir))
+    cached_ds = CachedDamageDataset(args.cache_dir, augment=True)
+    model     = None
+    if args.train_step:
+        model = DamageClassifier(num_classes=3, pretrained=False)
+        model.train()
+
+    print(f'{"workers":>8} {"notebook img/s":>15} {"cached img/s":>13} {"speed-up":>9}')
+    for workers in args.workers:
+        base   = measure(jpeg_ds,   args.batch, workers, args.batches, model)
+        cached = measure(cached_ds, args.batch, workers, args.batches, model)
+        print(f'{workers:>8} {base:>15,.1f} {cached:>13,.1f} {cached / base:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Parity check and latency comparison for the fraud model inference paths.
+
+    python scripts/bench_fraud_inference.py --n 2000
+
+Compares, on the same synthetic claims:
+    pandas   : one-row DataFrame + LabelEncoder + predict_proba (reference)
+    fast     : preallocated NumPy row + booster.inplace_predict
+    sklearn  : predict_proba over the whole batch as one DataFrame
+    batch    : booster.inplace_predict over the whole encoded batch
+and exits non-zero if any path disagrees with the reference. Batch
+throughput is reported for both whole-batch paths, so the batch scorer is
+measured against the sklearn wrapper it would otherwise go through.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.fraud_classifier import predict  # noqa: E402
+from models.fraud_classifier.predict import (  # noqa: E402
+    FEATURE_COLS,
+    STRING_COLS,
+    load_fraud_model,
+    predict_proba_fast,
+    predict_proba_pandas,
+    predict_fraud_batch_proba,
+    encode_claim,
+)
+
+NUMERIC_RANGES = {
+    'WeekOfMonth':        (1, 5),
+    'WeekOfMonthClaimed': (1, 5),
+    'Age':                (16, 80),
+    'RepNumber':          (1, 16),
+    'Deductible':         (300, 700),
+    'DriverRating':       (1, 4),
+    'Year':               (1994, 2024),
+}
+
+
+def synthetic_claims(n: int, seed: int = 42) -> list:
+    rng    = random.Random(seed)
+    claims = []
+    for _ in range(n):
+        claim = {}
+        for col in FEATURE_COLS:
+            if col in STRING_COLS:
+                claim[col] = rng.choice(['a', 'b', 'c'])
+            else:
+                lo, hi = NUMERIC_RANGES.get(col, (0, 10))
+                claim[col] = rng.randint(lo, hi)
+        claims.append(claim)
+    return claims
+
+
+def sklearn_batch_proba(claims) -> np.ndarray:
+    """Whole-batch predict_proba through the sklearn wrapper, same encoding."""
+    import pandas as pd
+    X = np.stack([encode_claim(c) for c in claims]).astype(int)
+    return predict._artifact['model'].predict_proba(pd.DataFrame(X, columns=FEATURE_COLS))[:, 1]
+
+
+def time_batch(fn, claims, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0   = time.perf_counter()
+        fn(claims)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def time_per_call(fn, claims) -> np.ndarray:
+    timings = np.empty(len(claims))
+    for i, claim in enumerate(claims):
+        t0 = time.perf_counter()
+        fn(claim)
+        timings[i] = time.perf_counter() - t0
+    return timings * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default='models/fraud_classifier/xgb_fraud_model.pkl')
+    parser.add_argument('--n',     type=int,   default=1000, help='number of synthetic claims')
+    parser.add_argument('--atol',  type=float, default=1e-5, help='max allowed probability difference')
+    args = parser.parse_args()
+
+    load_fraud_model(args.model)
+    claims = synthetic_claims(args.n)
+
+    ref     = np.array([predict_proba_pandas(c) for c in claims])
+    fast    = np.array([predict_proba_fast(c)   for c in claims])
+    sklearn = sklearn_batch_proba(claims)
+    batch   = predict_fraud_batch_proba(claims)
+
+    print(f'{"path":8s} {"max |diff|":>12s}')
+    ok = True
+    for name, probs in [('fast', fast), ('sklearn', sklearn), ('batch', batch)]:
+        diff = float(np.abs(probs - ref).max())
+        ok   = ok and diff <= args.atol
+        print(f'{name:8s} {diff:12.2e}')
+
+    print()
+    print(f'{"path":8s} {"p50 us":>10s} {"p99 us":>10s} {"claims/s":>12s}')
+    for name, fn in [('pandas', predict_proba_pandas), ('fast', predict_proba_fast)]:
+        us = time_per_call(fn, claims)
+        print(f'{name:8s} {np.percentile(us, 50):10.1f} {np.percentile(us, 99):10.1f} '
+              f'{1e6 / us.mean():12.0f}')
+
+    for name, fn in [('sklearn', sklearn_batch_proba), ('batch', predict_fraud_batch_proba)]:
+        elapsed = time_batch(fn, claims)
+        print(f'{name:8s} {"-":>10s} {"-":>10s} {len(claims) / elapsed:12.0f}'
+              f'   ({elapsed * 1000:.1f} ms per {len(claims)})')
+
+    if not ok:
+        print(f'\nFAIL: a fast path differs from the reference by more than {args.atol}')
+        sys.exit(1)
+    print('\nParity OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Measure load time and resident memory for each model artifact format.
+
+    python scripts/convert_model_artifacts.py     # create the fast formats first
+    python scripts/bench_model_load.py --repeat 3
+    python scripts/bench_model_load.py --damage /tmp/arts/best_model --fraud /tmp/arts/xgb_fraud_model
+
+Each measurement runs in a fresh interpreter. Libraries are imported before
+the clock starts, so the numbers cover only loading the artifact. RSS is
+read from /proc/self/status (Linux) and split into anonymous memory, which
+is private to the process, and file-backed memory, which is shared through
+the page cache by every worker that maps the same file. For the damage
+model, RSS is also reported after one forward pass, because memory-mapped
+weights are only paged in when they are first used.
+
+Fraud rows cover the pickle loaded twice (once by predict, once by SHAP, as
+before artifact sharing), the pickle loaded once and shared, and each native
+booster format found next to it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+DAMAGE_ROOT = 'models/damage_classifier/best_model'
+FRAUD_ROOT  = 'models/fraud_classifier/xgb_fraud_model'
+
+
+def rss_mb() -> dict:
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def _delta(after: dict, before: dict) -> dict:
+    return {k: round(after[k] - before[k], 1) for k in after}
+
+
+def worker(kind: str, path: str):
+    """Runs in the child process; prints one JSON result line."""
+    if kind == 'damage':
+        import torch
+        from models.damage_classifier.model import DamageClassifier
+        before = rss_mb()
+        t0     = time.perf_counter()
+        model  = DamageClassifier.load(path)
+        secs   = time.perf_counter() - t0
+        loaded = rss_mb()
+        with torch.no_grad():
+            model(torch.zeros(1, 3, 224, 224))
+        result = {'after_forward': _delta(rss_mb(), before)}
+    else:
+        import joblib
+        import xgboost  # noqa: F401
+        import shap
+        from models.fraud_classifier.artifact import load_artifact
+        before = rss_mb()
+        t0     = time.perf_counter()
+        if kind == 'fraud-twice':
+            # Previous behaviour: predict and SHAP each unpickled the file
+            models = [joblib.load(path)['model'], joblib.load(path)['model']]
+        else:
+            # What load_fraud_model + load_explainer do, minus the preference
+            # for a converted file, so each format is measured as named
+            models = [load_artifact(path, resolve=False)[1]['model'] for _ in range(2)]
+        explainer = shap.TreeExplainer(models[1])  # noqa: F841
+        secs   = time.perf_counter() - t0
+        loaded = rss_mb()
+        result = {}
+    result.update({'seconds': secs, 'after_load': _delta(loaded, before)})
+    print(json.dumps(result))
+
+
+def run(kind: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, '--worker', kind, path],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--damage', default=DAMAGE_ROOT, help='damage weights path without extension')
+    parser.add_argument('--fraud',  default=FRAUD_ROOT,  help='fraud artifact path without extension')
+    parser.add_argument('--worker', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    cases = [
+        ('damage',      args.damage + '.pt'),
+        ('damage',      args.damage + '.safetensors'),
+        ('fraud-twice', args.fraud + '.pkl'),
+        ('fraud',       args.fraud + '.pkl'),
+        ('fraud',       args.fraud + '.ubj'),
+        ('fraud',       args.fraud + '.json'),
+    ]
+    print(f'{"artifact":<46} {"load ms":>8} {"RSS MB":>7} {"anon":>6} {"file":>6} {"RSS fwd":>8}')
+    for kind, path in cases:
+        if not os.path.exists(BASE_DIR / path):
+            continue
+        runs  = [run(kind, path) for _ in range(args.repeat)]
+        ms    = statistics.median(r['seconds'] for r in runs) * 1000
+        last  = runs[-1]['after_load']
+        fwd   = runs[-1].get('after_forward', {}).get('VmRSS')
+        label = path + (' (x2)' if kind == 'fraud-twice' else '')
+        print(f'{label:<46} {ms:>8.1f} {last["VmRSS"]:>7.1f} {last["RssAnon"]:>6.1f} '
+              f'{last["RssFile"]:>6.1f} {fwd if fwd is not None else "-":>8}')
+
+
+if __name__ == '__main__':
+    main()
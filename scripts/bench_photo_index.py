@@ -0,0 +1,135 @@
+"""
+Query latency of the photo near-duplicate index against index size.
+
+    python scripts/bench_photo_index.py --sizes 10000 100000 1000000
+    python scripts/bench_photo_index.py --embeddings real_embeddings.npy
+
+Builds on-disk indexes of random pHashes and embeddings, then times queries
+for planted near-duplicates and for unrelated photos. For each size it
+reports p50 / p99 latency, recall, and the mean number of candidates
+re-ranked per query, which is what LSH bucket sizes cost.
+
+Synthetic embeddings mimic pooled EfficientNet features. They are
+non-negative (post-ReLU/SiLU averages around a shared positive mean), so
+random photos have cosine similarity around 0.8, not 0. Pass
+--embeddings with an (n, dim) .npy of real backbone embeddings, e.g.
+from models.damage_classifier.predict.embed_images, to sample from those
+instead.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.damage_classifier.photo_index import (  # noqa: E402
+    CHUNK_BITS, CHUNK_MASK, MAX_HASH_DISTANCE, N_CHUNKS, PhotoIndex, _chunk_probes,
+)
+
+
+def random_hashes(rng, n: int) -> np.ndarray:
+    high = rng.integers(0, 2**32, n, dtype=np.uint64) << np.uint64(32)
+    return high | rng.integers(0, 2**32, n, dtype=np.uint64)
+
+
+def flip_bits(rng, h: int, n_bits: int) -> int:
+    for b in rng.choice(64, size=n_bits, replace=False):
+        h ^= 1 << int(b)
+    return h
+
+
+def candidate_count(index: PhotoIndex, phash: int, emb: np.ndarray) -> int:
+    # Rows the query would re-rank across all segments
+    emb    = emb / (np.linalg.norm(emb) + 1e-12)
+    probes = [_chunk_probes((phash >> (c * CHUNK_BITS)) & CHUNK_MASK, MAX_HASH_DISTANCE // N_CHUNKS)
+              for c in range(N_CHUNKS)]
+    return sum(len(seg.candidates(phash, probes, emb, index._planes)) for seg in index._segments)
+
+
+def pooled_like(rng, n: int, dim: int) -> np.ndarray:
+    # Shared positive mean plus per-photo variation, clipped at zero
+    mean = np.abs(rng.standard_normal(dim)).astype(np.float32)
+    out  = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 65536):
+        stop = min(start + 65536, n)
+        out[start:stop] = np.maximum(
+            mean + 0.6 * rng.standard_normal((stop - start, dim)).astype(np.float32), 0
+        )
+    return out
+
+
+def sample_real(rng, real: np.ndarray, n: int) -> np.ndarray:
+    # Resample real embeddings, jittered so repeats are not exact duplicates
+    picks = real[rng.integers(0, len(real), n)].astype(np.float32)
+    return np.maximum(picks + 0.05 * picks.std() * rng.standard_normal(picks.shape), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes',   type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--dim',     type=int, default=1280, help='embedding dimension')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--embeddings', help='.npy of real (n, dim) backbone embeddings')
+    args = parser.parse_args()
+
+    rng  = np.random.default_rng(0)
+    real = np.load(args.embeddings) if args.embeddings else None
+    dim  = real.shape[1] if real is not None else args.dim
+    print(f'{"size":>10s} {"build s":>9s} {"load ms":>8s} {"p50 ms":>8s} {"p99 ms":>8s} '
+          f'{"recall":>7s} {"cands":>7s} {"miss p50 ms":>12s} {"miss cands":>11s}')
+
+    for size in args.sizes:
+        hashes     = random_hashes(rng, size)
+        embeddings = sample_real(rng, real, size) if real is not None else pooled_like(rng, size, dim)
+        tmp        = tempfile.TemporaryDirectory()
+
+        index = PhotoIndex(path=tmp.name, embedding_dim=dim)
+        t0 = time.perf_counter()
+        for start in range(0, size, 50_000):
+            stop = start + 50_000
+            index.add_many(range(start, min(stop, size)), hashes[start:stop], embeddings[start:stop])
+        index.save()
+        build = time.perf_counter() - t0
+
+        # Reopen from disk: what API startup pays
+        t0    = time.perf_counter()
+        index = PhotoIndex.load(tmp.name)
+        load  = (time.perf_counter() - t0) * 1e3
+
+        # Planted near-duplicates: a few flipped hash bits, a noisy embedding
+        targets = rng.integers(0, size, args.queries)
+        hits, latencies, cands = 0, [], []
+        for t in targets:
+            phash = flip_bits(rng, int(hashes[t]), int(rng.integers(0, 7)))
+            emb   = embeddings[t] * (1 + 0.02 * rng.standard_normal(dim)).astype(np.float32)
+            t0 = time.perf_counter()
+            matches = index.query(phash, emb)
+            latencies.append(time.perf_counter() - t0)
+            hits += any(m['claim_id'] == str(t) for m in matches)
+            cands.append(candidate_count(index, phash, emb))
+
+        # Unrelated photos: should return nothing, and quickly
+        fresh = pooled_like(np.random.default_rng(1), args.queries, dim) if real is None \
+            else sample_real(rng, real, args.queries)
+        misses, miss_cands = [], []
+        for h, emb in zip(random_hashes(rng, args.queries), fresh):
+            t0 = time.perf_counter()
+            index.query(int(h), emb)
+            misses.append(time.perf_counter() - t0)
+            miss_cands.append(candidate_count(index, int(h), emb))
+
+        ms = np.array(latencies) * 1e3
+        print(f'{size:>10,} {build:9.1f} {load:8.1f} {np.percentile(ms, 50):8.2f} '
+              f'{np.percentile(ms, 99):8.2f} {hits / args.queries:7.2%} {np.mean(cands):7.0f} '
+              f'{np.percentile(np.array(misses) * 1e3, 50):12.2f} {np.mean(miss_cands):11.0f}')
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Throughput benchmark for the incident-description MinHash LSH index.
+
+    python scripts/bench_text_index.py --sizes 10000 100000
+
+Generates synthetic narratives from the fraud patterns, times inserts,
+save + memory-mapped reload, and queries for lightly edited copies of
+indexed narratives, reporting throughput and recall at each size.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.claim_nlp.text_index import TextIndex  # noqa: E402
+
+FILLER = (
+    'the car was parked near my house when it happened while i was driving '
+    'home from work on the main road and another vehicle hit the rear side '
+    'door bumper windshield engine we called the insurer next morning after '
+    'checking the damage with a local mechanic who said repairs are needed'
+).split()
+
+# Place names, plate numbers and the like that make real narratives distinct
+_vocab_rng = random.Random(1)
+VOCAB = [
+    ''.join(_vocab_rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(_vocab_rng.randint(4, 9)))
+    for _ in range(5000)
+]
+
+
+def synthetic_narrative(rng: random.Random, patterns: list) -> str:
+    words = rng.sample(FILLER, rng.randint(6, 12)) + rng.sample(VOCAB, rng.randint(4, 8))
+    rng.shuffle(words)
+    return rng.choice(patterns) + ' ' + ' '.join(words)
+
+
+def edit(rng: random.Random, text: str, n_edits: int = 2) -> str:
+    # Drop or swap a couple of words, like a reused narrative
+    words = text.split()
+    for _ in range(n_edits):
+        i = rng.randrange(len(words))
+        if rng.random() < 0.5 and len(words) > 5:
+            del words[i]
+        else:
+            words[i] = rng.choice(FILLER)
+    return ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes',    type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries',  type=int, default=500)
+    parser.add_argument('--patterns', default='models/claim_nlp/fraud_patterns.json')
+    args = parser.parse_args()
+
+    with open(args.patterns) as f:
+        patterns = json.load(f)['high_risk_patterns']
+    rng = random.Random(0)
+
+    print(f'{"size":>10s} {"insert/s":>10s} {"save s":>8s} {"load ms":>8s} '
+          f'{"query/s":>9s} {"p99 ms":>8s} {"recall":>7s}')
+
+    for size in args.sizes:
+        texts = [synthetic_narrative(rng, patterns) for _ in range(size)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = TextIndex(tmp)
+            t0 = time.perf_counter()
+            for i, text in enumerate(texts):
+                index.add(i, text)
+            insert_rate = size / (time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            index.save()
+            save_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            index = TextIndex.load(tmp)
+            load_ms = (time.perf_counter() - t0) * 1e3
+
+            targets   = [rng.randrange(size) for _ in range(args.queries)]
+            latencies = []
+            hits      = 0
+            for t in targets:
+                query = edit(rng, texts[t])
+                t0 = time.perf_counter()
+                matches = index.query(query, top_k=20)
+                latencies.append(time.perf_counter() - t0)
+                hits += any(m['claim_id'] == str(t) for m in matches)
+
+        latencies = np.array(latencies)
+        print(f'{size:>10,} {insert_rate:10,.0f} {save_s:8.2f} {load_ms:8.1f} '
+              f'{len(latencies) / latencies.sum():9,.0f} '
+              f'{np.percentile(latencies, 99) * 1e3:8.2f} {hits / args.queries:7.2%}')
+
+
+if __name__ == '__main__':
+    main()
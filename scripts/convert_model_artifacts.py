@@ -0,0 +1,101 @@
+"""
+Convert model artifacts to their fast-loading formats.
+
+    python scripts/convert_model_artifacts.py
+    python scripts/convert_model_artifacts.py --damage models/damage_classifier/best_model.pt \
+        --fraud models/fraud_classifier/xgb_fraud_model.pkl --fraud-format json
+
+The damage classifier's torch pickle becomes best_model.safetensors, which
+DamageClassifier.load memory-maps. The fraud artifact's XGBClassifier is
+written in XGBoost's native UBJSON (or JSON) format, and its other keys
+(feature_cols) go to xgb_fraud_model.meta.json. Each converted file is
+reloaded and checked against the original before the script reports success.
+The loaders pick up the converted files automatically when they sit next to
+the originals, as long as the originals have not changed since. Each
+converted file records a hash of its original for that check. Delete them
+to fall back to the pickles.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+DAMAGE_PATH = 'models/damage_classifier/best_model.pt'
+FRAUD_PATH  = 'models/fraud_classifier/xgb_fraud_model.pkl'
+
+
+def convert_damage(path: str) -> str:
+    import torch
+    from models.damage_classifier.model import DamageClassifier
+
+    out   = os.path.splitext(path)[0] + '.safetensors'
+    model = DamageClassifier.load(path)
+    model.save(out, source=path)
+
+    original  = model.state_dict()
+    converted = DamageClassifier.load(out).state_dict()
+    if original.keys() != converted.keys() or not all(
+        torch.equal(original[k], converted[k]) for k in original
+    ):
+        sys.exit(f'Conversion check failed: {out} does not match {path}')
+    print(f'[DL]  {path} -> {out} ({len(original)} tensors, identical)')
+    return out
+
+
+def convert_fraud(path: str, fmt: str) -> str:
+    import joblib
+    import pandas as pd
+    from models.fraud_classifier.artifact import save_native, meta_path
+    import xgboost as xgb
+
+    out      = os.path.splitext(path)[0] + '.' + fmt
+    artifact = joblib.load(path)
+    save_native(artifact, out, source=path)
+
+    converted = xgb.XGBClassifier()
+    converted.load_model(out)
+
+    # Label-encoded categoricals and small integers, like real claim rows
+    rng  = np.random.default_rng(0)
+    cols = artifact['feature_cols']
+    X    = pd.DataFrame(rng.integers(0, 40, size=(2000, len(cols))), columns=cols)
+    a    = artifact['model'].predict_proba(X)[:, 1]
+    b    = converted.predict_proba(X)[:, 1]
+    max_diff = float(np.abs(a - b).max())
+    if max_diff > 1e-6:
+        sys.exit(f'Conversion check failed: {out} differs from {path} by {max_diff:.2e}')
+    print(f'[XGB] {path} -> {out} + {meta_path(out)} (max |diff| {max_diff:.1e} on 2000 rows)')
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--damage',       default=DAMAGE_PATH)
+    parser.add_argument('--fraud',        default=FRAUD_PATH)
+    parser.add_argument('--fraud-format', choices=['ubj', 'json'], default='ubj')
+    args = parser.parse_args()
+
+    converted = 0
+    if os.path.exists(args.damage):
+        convert_damage(args.damage)
+        converted += 1
+    else:
+        print(f'[DL]  {args.damage} not found, skipping')
+    if os.path.exists(args.fraud):
+        convert_fraud(args.fraud, args.fraud_format)
+        converted += 1
+    else:
+        print(f'[XGB] {args.fraud} not found, skipping')
+
+    if not converted:
+        sys.exit('Nothing to convert.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Bulk-index historical incident descriptions for near-duplicate detection.
+
+    python scripts/index_claim_texts.py claims.csv --index data/text_index
+
+The CSV needs claim_id and incident_description columns (override with
+--claim-id-col / --text-col). New descriptions are appended to the index
+and written out as new memory-mapped segments as they accumulate.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.claim_nlp.text_index import TextIndex  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('csv')
+    parser.add_argument('--index',        default='data/text_index')
+    parser.add_argument('--claim-id-col', default='claim_id')
+    parser.add_argument('--text-col',     default='incident_description')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, dtype=str).dropna(subset=[args.claim_id_col, args.text_col])
+    index = TextIndex.load(args.index)
+    print(f'Indexing {len(df):,} descriptions into {args.index} '
+          f'({len(index):,} already indexed)')
+
+    t0 = time.perf_counter()
+    for claim_id, text in zip(df[args.claim_id_col], df[args.text_col]):
+        index.add(claim_id, text)
+    elapsed = time.perf_counter() - t0
+
+    index.save()
+    print(f'Done in {elapsed:.1f}s ({len(df) / max(elapsed, 1e-9):,.0f} descriptions/s). '
+          f'Index now holds {len(index):,} descriptions.')
+
+
+if __name__ == '__main__':
+    main()
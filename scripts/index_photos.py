@@ -0,0 +1,81 @@
+"""
+Bulk-index historical damage photos for near-duplicate detection.
+
+    python scripts/index_photos.py photos/ --index data/photo_index
+    python scripts/index_photos.py photos.csv --index data/photo_index
+
+The source is either a directory of images, where each file name (without
+extension) is the claim ID, or a CSV with claim_id and image_path columns.
+Photos are fingerprinted in batches with the damage classifier backbone and
+appended to the existing index.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.damage_classifier.predict import load_model, embed_images  # noqa: E402
+from models.damage_classifier.photo_index import PhotoIndex, perceptual_hash  # noqa: E402
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def list_photos(source: str) -> list:
+    path = Path(source)
+    if path.is_dir():
+        return [
+            (p.stem, str(p)) for p in sorted(path.rglob('*'))
+            if p.suffix.lower() in IMAGE_EXTS
+        ]
+    df = pd.read_csv(path, dtype=str)
+    return list(zip(df['claim_id'], df['image_path']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='image directory or claim_id,image_path CSV')
+    parser.add_argument('--index',      default='data/photo_index')
+    parser.add_argument('--model',      default='models/damage_classifier/best_model.pt')
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    load_model(args.model)
+    index  = PhotoIndex.load(args.index)
+    photos = list_photos(args.source)
+    print(f'Indexing {len(photos):,} photos into {args.index} '
+          f'({len(index):,} already indexed)')
+
+    t0, done, skipped = time.perf_counter(), 0, 0
+    for start in range(0, len(photos), args.batch_size):
+        claim_ids, images = [], []
+        for claim_id, image_path in photos[start:start + args.batch_size]:
+            try:
+                images.append(Image.open(image_path).convert('RGB'))
+                claim_ids.append(claim_id)
+            except Exception as e:
+                print(f'  skipping {image_path}: {e}')
+                skipped += 1
+        if not images:
+            continue
+
+        hashes     = [perceptual_hash(img) for img in images]
+        embeddings = embed_images(images, batch_size=args.batch_size)
+        index.add_many(claim_ids, hashes, embeddings)
+        done += len(images)
+
+        rate = done / (time.perf_counter() - t0)
+        print(f'  {done:>10,} / {len(photos):,} photos ({rate:,.1f} photos/s)')
+
+    index.save()
+    print(f'Done. Index now holds {len(index):,} photos ({skipped} skipped).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+"""
+Load-test the VeriClaim API and report its throughput / latency curve.
+
+    # In-process: loads the bundled models and drives api.main:app over ASGI
+    python scripts/load_test.py --concurrency 1 2 4 8 --duration 20 --out head.json
+
+    # Against a local uvicorn that this script starts (and measures)
+    python scripts/load_test.py --spawn --port 8001 --out spawned.json
+
+    # Against an already running server; pass its PID for CPU / RSS figures
+    python scripts/load_test.py --url http://127.0.0.1:8000 --pid 12345
+
+    # Side-by-side comparison of two earlier runs (e.g. two commits)
+    python scripts/load_test.py --compare base.json head.json
+
+Each step holds a fixed number of concurrent clients for --duration seconds,
+each sending synthetic claims with realistic-size JPEG photos in a closed
+loop. Per step it reports requests/s, latency percentiles, error rate, and
+server CPU utilisation and resident memory. Needs httpx; works offline.
+
+In-process and --spawn runs point VERICLAIM_DATA_DIR at a temporary
+directory (or --data-dir), so the synthetic LOAD-* claims never reach the
+real claim history, photo / text indexes or drift counts in data/.
+In-process, the server shares a process with the load generator, so its
+CPU and RSS figures include the generator; use --spawn to measure the
+server alone.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import httpx  # noqa: E402
+
+CATEGORICAL = {
+    'Make':              ['Honda', 'Toyota', 'Ford', 'Chevrolet', 'BMW', 'Mercedes', 'Nissan'],
+    'AccidentArea':      ['Urban', 'Rural'],
+    'Fault':             ['Policy Holder', 'Third Party'],
+    'VehicleCategory':   ['Sport', 'Sedan', 'Utility'],
+    'PoliceReportFiled': ['No', 'Yes'],
+    'WitnessPresent':    ['No', 'Yes'],
+    'AgentType':         ['External', 'Internal'],
+    'BasePolicy':        ['Liability', 'Collision', 'All Perils'],
+    'PastNumberOfClaims': ['none', '1', '2 to 4', 'more than 4'],
+}
+
+BENIGN_DESCRIPTIONS = [
+    'Rear ended at a traffic signal during evening rush hour, police report filed',
+    'Side mirror and door scraped by a bus while parked outside the office',
+    'Minor collision while reversing out of a mall parking lot',
+    'Front bumper damaged after braking hard behind a truck on the highway',
+]
+
+# Typical phone photo sizes uploaded by adjusters
+IMAGE_SIZES = [(1600, 1200), (1280, 960), (2048, 1536)]
+
+
+# ── Synthetic workload ────────────────────────────────────────────────────────
+def synthetic_images(n: int, seed: int = 0) -> list:
+    """JPEG bytes with enough texture to compress like real photos (~200-600KB)."""
+    rng    = np.random.default_rng(seed)
+    images = []
+    for i in range(n):
+        w, h  = IMAGE_SIZES[i % len(IMAGE_SIZES)]
+        small = (rng.random((h // 16, w // 16, 3)) * 255).astype(np.uint8)
+        img   = Image.fromarray(small).resize((w, h), Image.BICUBIC)
+        noise = (rng.normal(0, 12, (h, w, 3))).astype(np.int16)
+        img   = Image.fromarray(
+            np.clip(np.asarray(img, dtype=np.int16) + noise, 0, 255).astype(np.uint8)
+        ).filter(ImageFilter.SMOOTH)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=85)
+        images.append(buf.getvalue())
+    return images
+
+
+def synthetic_claim(rng: random.Random, patterns: list, seq: int) -> dict:
+    claim = {col: rng.choice(values) for col, values in CATEGORICAL.items()}
+    claim.update({
+        'Age':                  rng.randint(18, 75),
+        'Deductible':           rng.choice([300, 400, 500, 700]),
+        'DriverRating':         rng.randint(1, 4),
+        'claim_id':             f'LOAD-{os.getpid()}-{seq}',
+        'policy_number':        f'POL-{rng.randint(1, 5000)}',
+        'vehicle_id':           f'VEH-{rng.randint(1, 8000)}',
+        'workshop_id':          f'WS-{rng.randint(1, 200)}',
+        'incident_description': rng.choice(patterns + BENIGN_DESCRIPTIONS),
+    })
+    claim['PolicyType'] = f"{claim['VehicleCategory']} - {claim['BasePolicy']}"
+    return claim
+
+
+# ── Process metrics ───────────────────────────────────────────────────────────
+def process_cpu_seconds(pid: int = None) -> float:
+    if pid is None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def process_rss_mb(pid: int = None) -> float:
+    with open(f'/proc/{pid or "self"}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+# ── Load generation ───────────────────────────────────────────────────────────
+async def run_step(client, endpoint, concurrency, duration, images, patterns, pid, seq,
+                   track_process=True):
+    latencies, errors = [], 0
+    status_counts     = {}
+    deadline          = time.perf_counter() + duration
+
+    async def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(worker_id * 7919 + concurrency)
+        while time.perf_counter() < deadline:
+            seq[0] += 1
+            claim = synthetic_claim(rng, patterns, seq[0])
+            files = {'image': ('claim.jpg', rng.choice(images), 'image/jpeg')}
+            data  = {'claim_data': json.dumps(claim)}
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(endpoint, files=files, data=data)
+                await resp.aread()
+                status = resp.status_code
+            except Exception:
+                status = 'exception'
+            latencies.append(time.perf_counter() - t0)
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if status != 200:
+                errors += 1
+
+    cpu0  = process_cpu_seconds(pid) if track_process else float('nan')
+    wall0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall  = time.perf_counter() - wall0
+    cpu   = (process_cpu_seconds(pid) if track_process else float('nan')) - cpu0
+
+    ms = np.array(latencies) * 1e3 if latencies else np.array([float('nan')])
+    return {
+        'concurrency':  concurrency,
+        'requests':     len(latencies),
+        'rps':          len(latencies) / wall,
+        'p50_ms':       float(np.percentile(ms, 50)),
+        'p90_ms':       float(np.percentile(ms, 90)),
+        'p99_ms':       float(np.percentile(ms, 99)),
+        'max_ms':       float(ms.max()),
+        'error_rate':   errors / max(len(latencies), 1),
+        'status_counts': {str(k): v for k, v in status_counts.items()},
+        'cpu_percent':  100.0 * cpu / wall,
+        'rss_mb':       process_rss_mb(pid) if track_process else float('nan'),
+    }
+
+
+async def run_load(args, images, patterns, pid):
+    timeout = httpx.Timeout(args.timeout)
+    steps   = []
+    seq     = [0]
+    # Without a PID, a remote server's CPU / RSS cannot be measured
+    track   = pid is not None or not args.url
+
+    if args.url:
+        client_cm = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+        app_cm    = None
+    else:
+        from api.main import app
+        client_cm = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url='http://loadtest', timeout=timeout
+        )
+        # ASGITransport does not run the lifespan, so load models here
+        app_cm = app.router.lifespan_context(app)
+
+    if app_cm is not None:
+        await app_cm.__aenter__()
+    try:
+        async with client_cm as client:
+            # Warm-up so first-request costs do not land in step one
+            await run_step(client, args.endpoint, 1, args.warmup, images, patterns, pid, seq, track)
+            for concurrency in args.concurrency:
+                step = await run_step(
+                    client, args.endpoint, concurrency, args.duration,
+                    images, patterns, pid, seq, track
+                )
+                steps.append(step)
+                print(format_row(step), flush=True)
+    finally:
+        if app_cm is not None:
+            await app_cm.__aexit__(None, None, None)
+    return steps
+
+
+def spawn_server(port: int, cwd: str, data_dir: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port)],
+        cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, 'VERICLAIM_DATA_DIR': data_dir}
+    )
+    url = f'http://127.0.0.1:{port}/health'
+    for _ in range(600):
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError(f'uvicorn exited with code {proc.returncode}')
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError('uvicorn did not become healthy within 5 minutes')
+
+
+# ── Reporting ─────────────────────────────────────────────────────────────────
+HEADER = (f'{"conc":>5s} {"reqs":>7s} {"rps":>8s} {"p50 ms":>8s} {"p90 ms":>8s} '
+          f'{"p99 ms":>8s} {"err %":>6s} {"cpu %":>7s} {"rss MB":>8s}')
+
+
+def format_row(step: dict) -> str:
+    return (f'{step["concurrency"]:>5d} {step["requests"]:>7d} {step["rps"]:>8.2f} '
+            f'{step["p50_ms"]:>8.1f} {step["p90_ms"]:>8.1f} {step["p99_ms"]:>8.1f} '
+            f'{100 * step["error_rate"]:>6.1f} {step["cpu_percent"]:>7.1f} '
+            f'{step["rss_mb"]:>8.1f}')
+
+
+def compare(path_a: str, path_b: str):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    print(f'A: {a["label"]}  ({path_a})')
+    print(f'B: {b["label"]}  ({path_b})')
+    print()
+    print(f'{"conc":>5s} | {"rps A":>8s} {"rps B":>8s} {"Δ%":>7s} | '
+          f'{"p99 A":>8s} {"p99 B":>8s} {"Δ%":>7s} | {"err A":>6s} {"err B":>6s} | '
+          f'{"rss A":>7s} {"rss B":>7s}')
+
+    steps_b = {s['concurrency']: s for s in b['steps']}
+    for sa in a['steps']:
+        sb = steps_b.get(sa['concurrency'])
+        if sb is None:
+            continue
+        d_rps = 100 * (sb['rps'] - sa['rps']) / sa['rps'] if sa['rps'] else float('nan')
+        d_p99 = 100 * (sb['p99_ms'] - sa['p99_ms']) / sa['p99_ms'] if sa['p99_ms'] else float('nan')
+        print(f'{sa["concurrency"]:>5d} | {sa["rps"]:>8.2f} {sb["rps"]:>8.2f} {d_rps:>+7.1f} | '
+              f'{sa["p99_ms"]:>8.1f} {sb["p99_ms"]:>8.1f} {d_p99:>+7.1f} | '
+              f'{100 * sa["error_rate"]:>6.1f} {100 * sb["error_rate"]:>6.1f} | '
+              f'{sa["rss_mb"]:>7.0f} {sb["rss_mb"]:>7.0f}')
+
+
+def git_revision(cwd: str) -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd, text=True
+        ).strip()
+    except Exception:
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration',    type=float, default=20.0, help='seconds per step')
+    parser.add_argument('--warmup',      type=float, default=5.0,  help='warm-up seconds')
+    parser.add_argument('--endpoint',    default='/api/v1/predict/fraud')
+    parser.add_argument('--timeout',     type=float, default=60.0, help='per-request timeout')
+    parser.add_argument('--images',      type=int,   default=8,    help='distinct synthetic photos')
+    parser.add_argument('--url',         help='target a running server instead of in-process')
+    parser.add_argument('--pid',         type=int,   help='server PID for CPU / RSS (with --url)')
+    parser.add_argument('--spawn',       action='store_true', help='start a local uvicorn')
+    parser.add_argument('--port',        type=int,   default=8001, help='port for --spawn')
+    parser.add_argument('--app-dir',     default=str(BASE_DIR),
+                        help='checkout to serve with --spawn (compare commits)')
+    parser.add_argument('--data-dir',
+                        help='claim history / index directory for the server under test '
+                             '(default: a temporary directory, removed afterwards)')
+    parser.add_argument('--label',       help='name for this run in comparisons')
+    parser.add_argument('--out',         help='write results JSON here')
+    parser.add_argument('--compare',     nargs=2, metavar=('A.json', 'B.json'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with open(BASE_DIR / 'models/claim_nlp/fraud_patterns.json') as f:
+        patterns = json.load(f)['high_risk_patterns']
+    images = synthetic_images(args.images)
+    print(f'Synthetic photos: {len(images)} '
+          f'(avg {sum(map(len, images)) / len(images) / 1024:.0f} KB)')
+
+    # Keep synthetic claims out of the real history and indexes
+    tmp_data = None
+    if not args.url:
+        if args.data_dir is None:
+            tmp_data      = tempfile.TemporaryDirectory(prefix='vericlaim-load-')
+            args.data_dir = tmp_data.name
+        args.data_dir = os.path.abspath(args.data_dir)
+
+    proc, pid = None, args.pid
+    if args.spawn:
+        proc     = spawn_server(args.port, args.app_dir, args.data_dir)
+        pid      = proc.pid
+        args.url = f'http://127.0.0.1:{args.port}'
+        scope    = 'server'
+    elif not args.url:
+        os.environ['VERICLAIM_DATA_DIR'] = args.data_dir
+        os.chdir(BASE_DIR)  # lifespan loads models by relative path
+        scope    = 'server + load generator (in-process)'
+    else:
+        scope    = 'server' if pid is not None else 'not measured'
+
+    mode = args.url or 'in-process'
+    print(f'Target: {mode} {args.endpoint}')
+    if args.data_dir:
+        print(f'Server data dir: {args.data_dir}')
+    else:
+        print('Server data dir: the running server\'s own (synthetic claims are recorded there)')
+    print(f'CPU / RSS: {scope}')
+    print(HEADER)
+    try:
+        steps = asyncio.run(run_load(args, images, patterns, pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmp_data is not None:
+            tmp_data.cleanup()
+
+    app_dir = args.app_dir if args.spawn else str(BASE_DIR)
+    result = {
+        'label':     args.label or f'{git_revision(app_dir)} ({mode})',
+        'revision':  git_revision(app_dir),
+        'target':    mode,
+        'cpu_rss':   scope,
+        'endpoint':  args.endpoint,
+        'duration':  args.duration,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'steps':     steps,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'\nResults written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Tune the fraud decision thresholds from labeled feedback and store them in the model artifact.
+
+    python scripts/recalibrate_fraud_thresholds.py data/feedback.csv --dry-run
+    python scripts/recalibrate_fraud_thresholds.py data/feedback.csv \
+        --label-col FraudFound_P --high-precision 0.8 --medium-recall 0.9
+
+The feedback CSV has one row per settled claim. It uses the ClaimInput
+columns, with missing columns taking the API defaults, plus a 0/1 label
+column. If it has a fraud_probability column, those logged scores are used.
+Otherwise each row is rescored with the current model. Optional
+anomaly_score and damage_confidence columns are used for the drift
+reference.
+
+Thresholds are chosen on the score distribution:
+
+    flag    the cutoff with the best F1, or with --flag-precision, the
+            lowest cutoff that reaches that precision
+    high    the lowest cutoff whose precision reaches --high-precision
+    medium  the highest cutoff that still catches --medium-recall of fraud
+
+They are kept in order (medium <= flag <= high). They are written to the
+artifact's 'thresholds' key, in the .pkl and in any converted
+.meta.json next to it. The same rows are also saved as the artifact's
+'monitoring_reference', which is the baseline that models/drift_monitor.py
+measures live PSI against. Restart the API to pick up the changes.
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+FRAUD_PATH = 'models/fraud_classifier/xgb_fraud_model.pkl'
+TRUE       = {'1', '1.0', 'true', 'yes', 'y', 'fraud'}
+
+
+def sweep(scores: np.ndarray, labels: np.ndarray):
+    """Precision, recall and flag rate for "score >= t" at every distinct score t."""
+    order = np.argsort(-scores, kind='stable')
+    s, y  = scores[order], labels[order]
+    tp, fp = np.cumsum(y), np.cumsum(1 - y)
+    last   = np.r_[np.nonzero(np.diff(s))[0], len(s) - 1]   # end of each run of ties
+    tp, fp = tp[last], fp[last]
+    return {
+        'threshold': s[last],
+        'tp':        tp,
+        'precision': tp / (tp + fp),
+        'recall':    tp / max(y.sum(), 1),
+        'flag_rate': (tp + fp) / len(s),
+    }
+
+
+def choose_thresholds(curve: dict, current: dict, args) -> dict:
+    thr, precision, recall = curve['threshold'], curve['precision'], curve['recall']
+
+    if args.flag_precision is not None:
+        ok   = np.nonzero(precision >= args.flag_precision)[0]
+        flag = thr[ok[-1]] if len(ok) else current['flag']
+    else:
+        f1   = 2 * precision * recall / np.maximum(precision + recall, 1e-12)
+        flag = thr[int(np.argmax(f1))]
+
+    # Require some support so a couple of top-scored frauds do not set HIGH
+    ok   = np.nonzero((precision >= args.high_precision) & (curve['tp'] >= args.min_support))[0]
+    high = thr[ok[-1]] if len(ok) else max(flag, current['high'])
+
+    ok     = np.nonzero(recall >= args.medium_recall)[0]
+    medium = thr[ok[0]] if len(ok) else current['medium']
+
+    return {
+        'medium': round(float(min(medium, flag)), 4),
+        'flag':   round(float(flag), 4),
+        'high':   round(float(max(high, flag)), 4),
+    }
+
+
+def at_threshold(scores, labels, t) -> str:
+    flagged = scores >= t
+    tp      = int((flagged & (labels == 1)).sum())
+    prec    = tp / flagged.sum() if flagged.any() else float('nan')
+    rec     = tp / labels.sum() if labels.any() else float('nan')
+    return f'precision {prec:6.3f}  recall {rec:6.3f}  flagged {flagged.mean():6.1%}'
+
+
+def calibration_error(scores, labels, bins: int = 10) -> float:
+    """Expected calibration error over equal-width score bins."""
+    idx = np.minimum((scores * bins).astype(int), bins - 1)
+    ece = 0.0
+    for b in range(bins):
+        mask = idx == b
+        if mask.any():
+            ece += mask.mean() * abs(scores[mask].mean() - labels[mask].mean())
+    return float(ece)
+
+
+def load_feedback(path: str, label_col: str):
+    from api.schemas import ClaimInput
+
+    df = pd.read_csv(path, dtype=str)
+    if label_col not in df.columns:
+        sys.exit(f'Label column {label_col!r} not in {path}')
+
+    claims, labels, extras = [], [], []
+    for i, record in enumerate(df.to_dict('records')):
+        record = {k: v for k, v in record.items() if isinstance(v, str) and v.strip()}
+        if label_col not in record:
+            continue
+        try:
+            claims.append(ClaimInput(**record).dict())
+        except Exception as e:
+            print(f'Skipping row {i + 1}: {e}')
+            continue
+        labels.append(1 if record[label_col].strip().lower() in TRUE else 0)
+        extras.append({
+            k: float(record[k]) for k in ('fraud_probability', 'anomaly_score', 'damage_confidence')
+            if k in record
+        })
+    return claims, np.array(labels, dtype=np.int64), extras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('feedback')
+    parser.add_argument('--model',          default=FRAUD_PATH)
+    parser.add_argument('--label-col',      default='FraudFound_P')
+    parser.add_argument('--high-precision', type=float, default=0.8)
+    parser.add_argument('--medium-recall',  type=float, default=0.9)
+    parser.add_argument('--flag-precision', type=float, default=None)
+    parser.add_argument('--min-support',    type=int,   default=10)
+    parser.add_argument('--no-reference',   action='store_true',
+                        help='Write thresholds only; keep the stored drift reference')
+    parser.add_argument('--dry-run',        action='store_true')
+    args = parser.parse_args()
+
+    from models.fraud_classifier import predict
+    from models.fraud_classifier.artifact import update_artifact
+    from models.drift_monitor import METRICS, SCORE_METRICS, build_reference, encode_features
+
+    claims, labels, extras = load_feedback(args.feedback, args.label_col)
+    if not labels.any() or labels.all():
+        sys.exit('Feedback needs both fraud and non-fraud labels.')
+
+    predict.load_fraud_model(args.model)
+    current = predict.get_thresholds()
+    logged  = [e.get('fraud_probability') for e in extras]
+    if all(p is not None for p in logged):
+        print('Using fraud_probability from the feedback file')
+        scores = np.array(logged, dtype=np.float64)
+    elif predict._booster is not None:
+        scores = predict.predict_fraud_batch_proba(claims).astype(np.float64)
+    else:
+        scores = np.array([predict.predict_proba_pandas(c) for c in claims])
+
+    curve = sweep(scores, labels)
+    new   = choose_thresholds(curve, current, args)
+    ece   = calibration_error(scores, labels)
+    brier = float(np.mean((scores - labels) ** 2))
+
+    print(f'\n{len(labels)} claims, {labels.mean():.1%} fraud, '
+          f'Brier {brier:.4f}, ECE {ece:.4f}\n')
+    print(f'{"cutoff":<8} {"current":>8} {"new":>8}   at new cutoff')
+    for name in ('medium', 'flag', 'high'):
+        print(f'{name:<8} {current[name]:>8.4f} {new[name]:>8.4f}   '
+              f'{at_threshold(scores, labels, new[name])}')
+
+    fields = {
+        'thresholds':  new,
+        'calibration': {
+            'source':     str(args.feedback),
+            'n':          int(len(labels)),
+            'fraud_rate': round(float(labels.mean()), 4),
+            'brier':      round(brier, 4),
+            'ece':        round(ece, 4),
+            'updated':    datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+    }
+    if not args.no_reference:
+        values = np.full((len(claims), len(METRICS)), np.nan)
+        values[:, 0] = scores
+        for i, (claim, extra) in enumerate(zip(claims, extras)):
+            for m, name in enumerate(SCORE_METRICS[1:], start=1):
+                values[i, m] = extra.get(name, np.nan)
+            encode_features(claim, values[i, len(SCORE_METRICS):])
+        fields['monitoring_reference'] = build_reference(values)
+
+    if args.dry_run:
+        print('\nDry run, artifact not modified.')
+        return
+    for path in update_artifact(args.model, fields):
+        print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
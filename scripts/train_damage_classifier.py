@@ -0,0 +1,222 @@
+"""
+Train the damage classifier from a cached, memory-mapped copy of the dataset.
+
+    python scripts/train_damage_classifier.py data/organized \
+        --cache-dir data/damage_cache --out models/damage_classifier/best_model.pt
+    python scripts/train_damage_classifier.py data/organized --resume
+
+data/organized holds minor/ moderate/ severe/ image folders, as produced by
+notebooks/train_damage_classifier.ipynb (Cell 5). Images are decoded and
+resized once into uint8 shards; every epoch then reads those shards and only
+runs the augmentations, in --workers loader processes. Schedule, freezing
+and early stopping follow the notebook. After every epoch the model (saved
+through DamageClassifier.save) and optimizer state go to --checkpoint-dir,
+and --resume continues from there. If a converted .safetensors copy sits
+next to --out, it is rewritten with each new best model, since that is
+the copy the API loads.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch.optim import AdamW
+from torch.optim.lr_scheduler import CosineAnnealingLR
+from torch.utils.data import DataLoader, random_split
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from models.damage_classifier.model import DamageClassifier  # noqa: E402
+from models.damage_classifier.dataset import build_cache, CachedDamageDataset  # noqa: E402
+
+WARMUP_EPOCHS = 2    # head-only epochs before the last 3 blocks are unfrozen
+
+
+def set_trainable(model, unfrozen: bool):
+    for p in model.backbone.parameters():
+        p.requires_grad = False
+    for p in model.backbone.classifier.parameters():
+        p.requires_grad = True
+    if unfrozen:
+        for p in model.backbone.blocks[-3:].parameters():
+            p.requires_grad = True
+
+
+def make_optimizer(model, lr: float, epochs: int, unfrozen: bool):
+    params    = [p for p in model.parameters() if p.requires_grad]
+    optimizer = AdamW(params, lr=lr / 5 if unfrozen else lr, weight_decay=0.01)
+    scheduler = CosineAnnealingLR(
+        optimizer, T_max=epochs - WARMUP_EPOCHS if unfrozen else epochs
+    )
+    return optimizer, scheduler
+
+
+def save_checkpoint(ckpt_dir: str, model, state: dict):
+    # Model and state are each written to a temp file and renamed, so an
+    # interrupted save leaves the previous checkpoint intact
+    os.makedirs(ckpt_dir, exist_ok=True)
+    model_path = os.path.join(ckpt_dir, 'last_model.pt')
+    state_path = os.path.join(ckpt_dir, 'last_state.pt')
+    model.save(model_path + '.tmp')
+    torch.save(state, state_path + '.tmp')
+    os.replace(model_path + '.tmp', model_path)
+    os.replace(state_path + '.tmp', state_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('data_dir')
+    parser.add_argument('--cache-dir',      default='data/damage_cache')
+    parser.add_argument('--checkpoint-dir', default='data/damage_checkpoints')
+    parser.add_argument('--out',            default='models/damage_classifier/best_model.pt')
+    parser.add_argument('--epochs',   type=int,   default=20)
+    parser.add_argument('--batch',    type=int,   default=16)
+    parser.add_argument('--lr',       type=float, default=3e-4)
+    parser.add_argument('--patience', type=int,   default=7)
+    parser.add_argument('--workers',  type=int,   default=min(8, os.cpu_count() or 1))
+    parser.add_argument('--resume',   action='store_true',
+                        help='continue from the last checkpoint in --checkpoint-dir')
+    args = parser.parse_args()
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    # A converted copy next to --out is what the API loads; it is rewritten
+    # with every new best model
+    converted = os.path.splitext(args.out)[0] + '.safetensors'
+    if args.out.endswith('.pt') and os.path.exists(converted):
+        print(f'{converted} exists and will be updated along with {args.out}')
+    else:
+        converted = None
+
+    t0 = time.perf_counter()
+    manifest = build_cache(args.data_dir, args.cache_dir, workers=args.workers)
+    print(f'Cache ready in {time.perf_counter() - t0:.1f}s')
+
+    # Same 80/20 split and seed as the notebook
+    n_val   = max(1, int(manifest['count'] * 0.2))
+    n_train = manifest['count'] - n_val
+    train_idx, val_idx = random_split(
+        range(manifest['count']), [n_train, n_val],
+        generator=torch.Generator().manual_seed(42)
+    )
+    train_ds = CachedDamageDataset(args.cache_dir, list(train_idx), augment=True)
+    val_ds   = CachedDamageDataset(args.cache_dir, list(val_idx))
+
+    loader_kwargs = dict(
+        batch_size         = args.batch,
+        num_workers        = args.workers,
+        pin_memory         = device == 'cuda',
+        persistent_workers = args.workers > 0,
+    )
+    train_loader = DataLoader(train_ds, shuffle=True, drop_last=False, **loader_kwargs)
+    val_loader   = DataLoader(val_ds,   shuffle=False, **loader_kwargs)
+    print(f'Train : {n_train} images')
+    print(f'Val   : {n_val} images')
+
+    state = {
+        'epoch':            0,
+        'best_val_acc':     0.0,
+        'patience_counter': 0,
+        'unfrozen':         False,
+    }
+    state_path = os.path.join(args.checkpoint_dir, 'last_state.pt')
+    model_path = os.path.join(args.checkpoint_dir, 'last_model.pt')
+
+    if args.resume and os.path.exists(state_path):
+        saved = torch.load(state_path, map_location='cpu')
+        model = DamageClassifier.load(model_path).to(device)
+        set_trainable(model, saved['unfrozen'])
+        optimizer, scheduler = make_optimizer(model, args.lr, args.epochs, saved['unfrozen'])
+        optimizer.load_state_dict(saved['optimizer'])
+        scheduler.load_state_dict(saved['scheduler'])
+        torch.set_rng_state(saved['rng_state'])
+        state.update({k: saved[k] for k in state})
+        print(f'Resumed from {args.checkpoint_dir} at epoch {state["epoch"] + 1}')
+    else:
+        model = DamageClassifier(num_classes=3, pretrained=True).to(device)
+        set_trainable(model, False)
+        optimizer, scheduler = make_optimizer(model, args.lr, args.epochs, False)
+
+    if state['patience_counter'] >= args.patience:
+        print(f'Checkpoint already stopped early at epoch {state["epoch"]}; nothing to resume.')
+        return
+
+    criterion = torch.nn.CrossEntropyLoss(label_smoothing=0.1)
+
+    print(f'Device : {device}')
+    print('-' * 72)
+    for epoch in range(state['epoch'], args.epochs):
+        # After the warmup epochs unfreeze last 3 blocks for fine-tuning
+        if epoch == WARMUP_EPOCHS and not state['unfrozen']:
+            set_trainable(model, True)
+            optimizer, scheduler = make_optimizer(model, args.lr, args.epochs, True)
+            state['unfrozen'] = True
+            print('  Unfroze last 3 backbone blocks for fine-tuning')
+
+        # Train
+        model.train()
+        correct, total = 0, 0
+        t_epoch = time.perf_counter()
+        for imgs, labels in train_loader:
+            imgs   = imgs.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
+            optimizer.zero_grad()
+            logits = model(imgs)
+            loss   = criterion(logits, labels)
+            loss.backward()
+            optimizer.step()
+            # Accuracy from the training forward pass; the notebook ran a
+            # second forward per batch just for this
+            correct += (logits.argmax(1) == labels).sum().item()
+            total   += labels.size(0)
+        train_secs = time.perf_counter() - t_epoch
+
+        # Validate
+        model.eval()
+        val_correct, val_total = 0, 0
+        with torch.no_grad():
+            for imgs, labels in val_loader:
+                imgs, labels = imgs.to(device), labels.to(device)
+                val_correct += (model(imgs).argmax(1) == labels).sum().item()
+                val_total   += labels.size(0)
+
+        train_acc = correct / total
+        val_acc   = val_correct / val_total
+        scheduler.step()
+
+        print(f'Epoch {epoch+1:02d}/{args.epochs} | Train: {train_acc:.3f} | '
+              f'Val: {val_acc:.3f} | {total / train_secs:,.0f} img/s')
+
+        stop = False
+        if val_acc > state['best_val_acc']:
+            state['best_val_acc']     = val_acc
+            state['patience_counter'] = 0
+            model.save(args.out)
+            if converted:
+                # The loader prefers this copy, so keep it in step
+                model.save(converted, source=args.out)
+        else:
+            state['patience_counter'] += 1
+            stop = state['patience_counter'] >= args.patience
+
+        state['epoch'] = epoch + 1
+        save_checkpoint(args.checkpoint_dir, model, {
+            **state,
+            'optimizer': optimizer.state_dict(),
+            'scheduler': scheduler.state_dict(),
+            'rng_state': torch.get_rng_state(),
+        })
+        if stop:
+            print('Early stopping triggered.')
+            break
+
+    print('-' * 72)
+    print(f'Training complete. Best val_acc: {state["best_val_acc"]:.3f} -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
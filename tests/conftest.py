@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pytest
+
+from models.fraud_classifier.predict import FEATURE_COLS, STRING_COLS
+
+NUMERIC_RANGES = {
+    'WeekOfMonth':        (1, 5),
+    'WeekOfMonthClaimed': (1, 5),
+    'Age':                (16, 80),
+    'RepNumber':          (1, 16),
+    'Deductible':         (300, 700),
+    'DriverRating':       (1, 4),
+    'Year':               (1994, 2024),
+}
+
+
+def make_claims(n: int, seed: int = 0) -> list:
+    rng    = random.Random(seed)
+    claims = []
+    for _ in range(n):
+        claim = {}
+        for col in FEATURE_COLS:
+            if col in STRING_COLS:
+                claim[col] = rng.choice(['a', 'b', 'c'])
+            else:
+                lo, hi = NUMERIC_RANGES.get(col, (0, 10))
+                claim[col] = rng.randint(lo, hi)
+        claims.append(claim)
+    return claims
+
+
+@pytest.fixture(scope='session')
+def fraud_artifact_path(tmp_path_factory):
+    """A small XGBoost fraud model saved in the repo's .pkl artifact layout."""
+    joblib = pytest.importorskip('joblib')
+    pd     = pytest.importorskip('pandas')
+    xgb    = pytest.importorskip('xgboost')
+
+    rng = np.random.default_rng(0)
+    X   = pd.DataFrame(
+        {col: rng.integers(*NUMERIC_RANGES.get(col, (0, 10)), size=2000) for col in FEATURE_COLS}
+    )
+    y   = ((X['Age'] < 30) & (X['Deductible'] > 450) | (rng.random(2000) < 0.05)).astype(int)
+
+    model = xgb.XGBClassifier(n_estimators=30, max_depth=4, learning_rate=0.3)
+    model.fit(X, y)
+    path = tmp_path_factory.mktemp('fraud') / 'xgb_fraud_model.pkl'
+    joblib.dump({'model': model, 'feature_cols': FEATURE_COLS}, path)
+    return str(path)
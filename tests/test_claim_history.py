@@ -0,0 +1,136 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from models.fraud_classifier.claim_history import ClaimHistoryStore, _WindowCounter, parse_day
+
+
+def day(iso: str) -> int:
+    return parse_day(iso)
+
+
+def claim(claim_id, date, policy='P1', **keys):
+    return {'claim_id': claim_id, 'policy_number': policy, 'incident_date': date, **keys}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ClaimHistoryStore(str(tmp_path / 'history.db'))
+    yield s
+    s.close()
+
+
+def test_lookups_do_not_consume_history(store):
+    for i, date in enumerate(['2026-06-01', '2026-06-03', '2026-06-05']):
+        store.record(claim(f'C{i}', date))
+
+    before = store.lookup({'policy_number': 'P1'}, as_of='2026-06-05')
+    store.lookup({'policy_number': 'P1'}, as_of='2026-06-20')
+    after  = store.lookup({'policy_number': 'P1'}, as_of='2026-06-05')
+
+    assert before['policy_claims_7d'] == 3
+    assert after == before
+
+
+def test_out_of_order_lookups_and_records(store):
+    # Rows arrive unsorted, as engineer_features(history=...) sees them
+    for i, date in enumerate(['2026-06-05', '2026-06-01', '2026-05-01', '2026-06-03']):
+        store.record(claim(f'C{i}', date))
+
+    assert store.lookup({'policy_number': 'P1'}, as_of='2026-06-04')['policy_claims_7d'] == 2
+    assert store.lookup({'policy_number': 'P1'}, as_of='2026-06-30')['policy_claims_30d'] == 3
+    assert store.lookup({'policy_number': 'P1'}, as_of='2026-05-02')['policy_claims_7d'] == 1
+    assert store.lookup({'policy_number': 'P1'}, as_of='2026-06-05')['policy_claims_90d'] == 4
+
+
+def test_counter_expiry_follows_newest_day_capped_at_today():
+    today   = day('2026-06-30')
+    counter = _WindowCounter()
+    counter.add(day('2026-01-01'), today)
+    counter.add(day('2026-06-01'), today)
+    assert counter.floor == day('2026-06-01') - 90
+    assert counter.counts(day('2026-06-01')) == {7: 1, 30: 1, 90: 1}
+
+    # A claim dated far past today does not expire the June claim
+    counter.add(day('2027-12-31'), today)
+    assert counter.counts(day('2026-06-05'))[7] == 1
+    assert counter.counts(day('2027-12-31'))[7] == 1
+
+
+def test_record_is_idempotent(store):
+    assert store.record(claim('C1', '2026-06-01'))
+    assert not store.record(claim('C1', '2026-06-01'))
+
+    # Without a claim_id, the same keys and day count once
+    anonymous = claim(None, '2026-06-02')
+    assert store.record(anonymous)
+    assert not store.record(dict(anonymous))
+    assert store.record(claim(None, '2026-06-03'))
+
+    assert store.lookup({'policy_number': 'P1'}, as_of='2026-06-03')['policy_claims_7d'] == 3
+
+
+def test_replay_anchors_on_today(tmp_path):
+    path  = str(tmp_path / 'history.db')
+    today = datetime.date.today()
+    store = ClaimHistoryStore(path)
+    store.record(claim('recent', (today - datetime.timedelta(days=3)).isoformat()))
+    store.record(claim('future', (today + datetime.timedelta(days=400)).isoformat()))
+    store.close()
+
+    reopened = ClaimHistoryStore(path)
+    counts   = reopened.lookup({'policy_number': 'P1'}, as_of=today.isoformat())
+    reopened.close()
+    assert counts['policy_claims_7d'] == 1
+
+
+def test_existing_anonymous_duplicates_are_collapsed(tmp_path):
+    path = str(tmp_path / 'history.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE claims (claim_id TEXT UNIQUE, policy_number TEXT, '
+        'vehicle_id TEXT, workshop_id TEXT, claim_day INTEGER NOT NULL)'
+    )
+    today = datetime.date.today().toordinal()
+    conn.executemany('INSERT INTO claims VALUES (NULL, ?, NULL, NULL, ?)', [('P1', today)] * 3)
+    conn.commit()
+    conn.close()
+
+    store = ClaimHistoryStore(path)
+    assert store.lookup({'policy_number': 'P1'})['policy_claims_7d'] == 1
+    store.close()
+
+
+def test_unparseable_date_counts_as_today(store):
+    store.record(claim('C1', '19/10/2026'))
+    assert store.lookup({'policy_number': 'P1'})['policy_claims_7d'] == 1
+
+
+def test_claim_input_rejects_bad_dates():
+    from api.schemas import ClaimInput
+
+    assert ClaimInput(incident_date='2026-01-31').incident_date == '2026-01-31'
+    with pytest.raises(ValueError):
+        ClaimInput(incident_date='19/10/2026')
+    with pytest.raises(ValueError):
+        ClaimInput(incident_date=(datetime.date.today() + datetime.timedelta(days=1)).isoformat())
+
+
+@pytest.mark.parametrize('claim_id', ['C3', None])
+def test_training_features_match_serving(store, claim_id):
+    import pandas as pd
+    from models.fraud_classifier.feature_eng import engineer_features
+
+    for i, date in enumerate(['2026-05-20', '2026-06-01', '2026-06-04']):
+        store.record(claim(f'C{i}', date, vehicle_id='V1'))
+    target = claim(claim_id, '2026-06-05', vehicle_id='V1', workshop_id='W1')
+
+    # Serving: looked up before it is recorded
+    served = store.lookup(target)
+    store.record(target)
+
+    # Training: the history already holds the row
+    trained = engineer_features(pd.DataFrame([target]), history=store)
+    assert served['policy_claims_7d'] == 2 and served['workshop_claims_7d'] == 0
+    assert trained[list(served)].iloc[0].to_dict() == served
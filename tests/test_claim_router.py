@@ -0,0 +1,228 @@
+import asyncio
+import io
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('shap')
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from api.admission import Overloaded, StageGate, StageTimeout  # noqa: E402
+from api.routers import claim as claim_router  # noqa: E402
+
+FRAUD = {'fraud_probability': 0.2, 'fraud_flag': False, 'risk_level': 'LOW',
+         'recommendation': 'Proceed with standard claim processing.'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stubs = {
+        'velocity_stage':     lambda claim: {'policy_number_7d': 1},
+        'nlp_stage':          lambda *args: {'anomaly_score': 0.1, 'triggered_keywords': []},
+        'predict_damage':     lambda img, return_embedding=False: {
+            'severity': 'minor', 'confidence': 0.9, 'embedding': None},
+        'run_photo_match':    lambda img, emb, claim_id=None: [],
+        'predict_fraud':      lambda claim, damage_pred=None: dict(FRAUD),
+        'record_claim':       lambda claim: None,
+        'observe_prediction': lambda *args, **kwargs: None,
+        'explain':            lambda claim: {'top_factors': []},
+    }
+    for name, fn in stubs.items():
+        monkeypatch.setattr(claim_router, name, fn)
+    app = FastAPI()
+    app.include_router(claim_router.router, prefix='/api/v1')
+    return TestClient(app)
+
+
+def post(client, path):
+    buf = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(buf, format='JPEG')
+    return client.post(path, files={'image': ('c.jpg', buf.getvalue(), 'image/jpeg')},
+                       data={'claim_data': json.dumps({'claim_id': 'C1'})})
+
+
+def test_stream_releases_admission_slot(client):
+    resp = post(client, '/api/v1/predict/fraud/stream')
+    stages = [json.loads(line)['stage'] for line in resp.text.splitlines()]
+    assert stages[-1] == 'summary'
+    assert claim_router.admission._in_flight == 0
+
+
+def test_unread_stream_still_releases_admission_slot():
+    # Client gone before the first byte: the body generator never runs
+    claim_router.admission.acquire()
+
+    async def never_iterated():
+        yield b''
+
+    response = claim_router._AdmittedStream(never_iterated())
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        raise OSError('connection reset')
+
+    scope = {'type': 'http', 'asgi': {'spec_version': '2.4'}}
+    with pytest.raises(Exception):
+        asyncio.run(response(scope, receive, send))
+    assert claim_router.admission._in_flight == 0
+
+    # A second release (from the generator's finally) is a no-op
+    response.release()
+    assert claim_router.admission._in_flight == 0
+
+
+def test_failed_velocity_lookup_is_skipped_not_fatal(client, monkeypatch):
+    def broken(claim):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(claim_router, 'velocity_stage', broken)
+    body = post(client, '/api/v1/predict/fraud').json()
+    assert body['claim_velocity'] is None
+    assert {'stage': 'velocity', 'reason': 'error'} in body['skipped_stages']
+
+
+def test_stream_records_in_stage_order(client):
+    resp = post(client, '/api/v1/predict/fraud/stream')
+    assert resp.status_code == 200
+    assert resp.headers['content-type'].startswith('application/x-ndjson')
+
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r['stage'] for r in records] == [
+        'velocity', 'nlp', 'damage', 'photo', 'fraud', 'explanation', 'summary']
+    summary = records[-1]['data']
+    assert summary['fraud_probability'] == FRAUD['fraud_probability']
+    assert summary['claim_velocity'] == {'policy_number_7d': 1}
+    assert summary['skipped_stages'] == []
+
+
+def test_stream_reports_late_failure_as_error_record(client, monkeypatch):
+    def broken(claim, damage_pred=None):
+        raise RuntimeError('booster missing')
+
+    monkeypatch.setattr(claim_router, 'predict_fraud', broken)
+    resp = post(client, '/api/v1/predict/fraud/stream')
+    assert resp.status_code == 200
+
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r['stage'] for r in records] == ['velocity', 'nlp', 'damage', 'photo', 'error']
+    assert records[-1]['detail'] == 'Fraud model error: booster missing'
+    assert claim_router.admission._in_flight == 0
+
+
+class _Refusing:
+    """Stand-in gate that is always full."""
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    async def run(self, fn, *args, **kwargs):
+        raise Overloaded(self.stage, 2)
+
+
+def test_full_admission_returns_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(claim_router.admission, '_in_flight', claim_router.admission.max_in_flight)
+    for path in ('/api/v1/predict/fraud', '/api/v1/predict/fraud/stream'):
+        resp = post(client, path)
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After'] == str(claim_router.admission.retry_after)
+
+
+def test_full_required_stage_returns_503(client, monkeypatch):
+    monkeypatch.setitem(claim_router.admission.gates, 'fraud', _Refusing('fraud'))
+    resp = post(client, '/api/v1/predict/fraud')
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '2'
+    assert claim_router.admission._in_flight == 0
+
+
+@pytest.mark.parametrize('load, dropped', [
+    (0.25, []),
+    (0.5,  [{'stage': 'shap', 'reason': 'degraded'}]),
+    (0.75, [{'stage': 'semantic_nlp', 'reason': 'degraded'}, {'stage': 'shap', 'reason': 'degraded'}]),
+])
+def test_degradation_plan_follows_load(client, monkeypatch, load, dropped):
+    admission = claim_router.admission
+    semantic  = []
+    monkeypatch.setattr(claim_router, 'nlp_stage', lambda text, claim_id, sem=True, index=True: (
+        semantic.append(sem) or {'anomaly_score': 0.1, 'triggered_keywords': []}))
+    # This request's own admission brings the load to the threshold
+    monkeypatch.setattr(admission, '_in_flight', int(load * admission.max_in_flight) - 1)
+
+    body = post(client, '/api/v1/predict/fraud').json()
+    assert body['skipped_stages'] == dropped
+    assert semantic == [load < 0.75]
+
+
+def test_full_nlp_gate_falls_back_to_keywords(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(claim_router, 'nlp_stage', lambda text, claim_id, sem=True, index=True: (
+        calls.append((sem, index)) or {'anomaly_score': 0.4, 'triggered_keywords': ['fire']}))
+    monkeypatch.setitem(claim_router.admission.gates, 'nlp', _Refusing('nlp'))
+
+    body = post(client, '/api/v1/predict/fraud').json()
+    assert calls == [(False, True)]
+    assert body['anomaly_score'] == 0.4
+    assert {'stage': 'semantic_nlp', 'reason': 'overload'} in body['skipped_stages']
+
+    # With the fallback's own gate full as well, NLP is dropped
+    monkeypatch.setitem(claim_router.admission.gates, 'keywords', _Refusing('keywords'))
+    body = post(client, '/api/v1/predict/fraud').json()
+    assert {'stage': 'nlp', 'reason': 'overload'} in body['skipped_stages']
+
+
+def test_late_optional_stages_are_skipped_with_reasons(client, monkeypatch):
+    def slow(*args, **kwargs):
+        time.sleep(0.3)
+        return {'top_factors': []}
+
+    monkeypatch.setattr(claim_router, 'explain', slow)
+    monkeypatch.setitem(claim_router.admission.gates, 'shap', StageGate('shap', 1, 0, 0.05, 2))
+    monkeypatch.setitem(claim_router.admission.gates, 'photo', _Refusing('photo'))
+
+    body = post(client, '/api/v1/predict/fraud').json()
+    assert {'stage': 'shap', 'reason': 'timeout'} in body['skipped_stages']
+    assert {'stage': 'photo', 'reason': 'overload'} in body['skipped_stages']
+    assert body['duplicate_photos'] == []
+
+
+def test_stage_gate_overload_timeout_and_slot_hold():
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return threading.current_thread().name
+
+    async def scenario():
+        gate  = StageGate('shap', concurrency=1, queue_limit=0, deadline=0.05, retry_after=3)
+        first = asyncio.ensure_future(gate.run(blocked))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded) as excinfo:
+            await gate.run(blocked)
+        assert excinfo.value.retry_after == 3
+
+        with pytest.raises(StageTimeout):
+            await first
+        # The thread is still running, so its slot stays taken
+        assert gate.snapshot()['running'] == 1
+        with pytest.raises(Overloaded):
+            await gate.run(blocked)
+
+        release.set()
+        for _ in range(100):
+            if not gate.snapshot()['running']:
+                break
+            await asyncio.sleep(0.01)
+        assert gate.snapshot()['running'] == 0
+        gate.deadline = 1.0
+        return await gate.run(blocked)
+
+    # Calls run on the gate's own threads, not the shared default executor
+    assert asyncio.run(scenario()).startswith('stage-shap')
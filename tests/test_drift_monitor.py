@@ -0,0 +1,173 @@
+import argparse
+import importlib.util
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from models.drift_monitor import (
+    LOG_STEPS, METRICS, N_BINS, SCORE_METRICS, UNIT_BINS, DriftMonitor, bin_values, build_reference,
+    category_bin, encode_features, psi,
+)
+from tests.conftest import make_claims
+
+_spec = importlib.util.spec_from_file_location(
+    'recalibrate_fraud_thresholds',
+    Path(__file__).resolve().parent.parent / 'scripts' / 'recalibrate_fraud_thresholds.py',
+)
+recalibrate = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(recalibrate)
+
+CURRENT = {'medium': 0.3, 'flag': 0.5, 'high': 0.7}
+
+
+def options(**overrides):
+    defaults = dict(flag_precision=None, high_precision=0.8, medium_recall=0.9, min_support=10)
+    return argparse.Namespace(**{**defaults, **overrides})
+
+
+def scored(n=2000, seed=0):
+    rng    = np.random.default_rng(seed)
+    # Four decimals, as the chosen thresholds are rounded to
+    scores = np.round(rng.beta(2, 5, n), 4)
+    labels = (rng.random(n) < scores).astype(np.int64)
+    return scores, labels
+
+
+def row(**values):
+    out = np.full(len(METRICS), np.nan)
+    for name, value in values.items():
+        out[METRICS.index(name)] = value
+    return out
+
+
+def test_psi_is_zero_for_identical_and_grows_with_shift():
+    ref = np.bincount(np.random.default_rng(0).integers(0, 100, 5000), minlength=N_BINS).astype(float)
+    assert psi(ref, ref) == pytest.approx(0.0)
+    assert psi(ref, ref * 3) == pytest.approx(0.0)
+
+    small = np.roll(ref, 5)
+    large = np.roll(ref, 40)
+    assert 0 < psi(ref, small) < psi(ref, large)
+
+
+def test_psi_needs_counts_on_both_sides():
+    ref = np.ones(N_BINS)
+    assert psi(ref, np.zeros(N_BINS)) is None
+    assert psi(np.zeros(N_BINS), ref) is None
+
+
+def test_bin_values_scores_features_and_missing():
+    idx, valid = bin_values(row(fraud_probability=0.237, anomaly_score=1.0, Age=0.0, Deductible=np.nan))
+    at = {name: i for i, name in enumerate(METRICS)}
+
+    assert idx[at['fraud_probability']] == 23
+    assert idx[at['anomaly_score']] == UNIT_BINS - 1
+    assert idx[at['Age']] == N_BINS // 2
+    assert not valid[at['Deductible']]
+    assert valid.sum() == 3
+
+    # Log bins are monotonic, symmetric around zero and one doubling apart
+    features = [bin_values(row(Age=v))[0][at['Age']] for v in (-7.0, -1.0, 1.0, 3.0, 7.0, 1e12)]
+    assert features == sorted(features)
+    assert features[1] + features[2] == N_BINS
+    assert features[3] - features[2] == LOG_STEPS
+    assert features[-1] == N_BINS - 1
+
+
+def test_categorical_features_bin_by_category():
+    at     = {name: i for i, name in enumerate(METRICS)}
+    offset = len(SCORE_METRICS)
+    claim  = make_claims(1, seed=0)[0]
+    values = encode_features({**claim, 'Make': 'Honda'}, np.empty(len(METRICS) - offset))
+
+    assert values[at['Make'] - offset] == category_bin('Honda')
+    assert category_bin('Honda') != category_bin('Toyota')
+    assert values[at['Age'] - offset] == int(claim['Age'])
+    assert np.isnan(category_bin(None))
+
+    full = np.full(len(METRICS), np.nan)
+    full[at['Make']] = category_bin('Honda')
+    assert bin_values(full)[0][at['Make']] == category_bin('Honda')
+
+
+def test_categorical_drift_is_detected():
+    claims = make_claims(400, seed=1)
+
+    def rows(makes):
+        values = np.full((len(claims), len(METRICS)), np.nan)
+        values[:, 0] = 0.2
+        for i, (claim, make) in enumerate(zip(claims, makes)):
+            encode_features({**claim, 'Make': make}, values[i, len(SCORE_METRICS):])
+        return values
+
+    reference = build_reference(rows(['Honda', 'Toyota'] * 200))
+    assert reference['Make']['mean'] is None
+
+    monitor = DriftMonitor(reference=reference)
+    for values in rows(['Honda'] * 100 + ['Pontiac'] * 300):
+        monitor.observe(values, now=0)
+    make = monitor.snapshot(now=0)['metrics']['Make']
+    assert make['status'] == 'significant'
+    assert make['window_mean'] is None
+    assert 'Make' in monitor.snapshot(now=0)['alerts']
+
+
+def test_sweep_groups_ties():
+    curve = recalibrate.sweep(np.array([0.2, 0.8, 0.5, 0.9, 0.8]), np.array([1, 1, 0, 1, 0]))
+    np.testing.assert_array_equal(curve['threshold'], [0.9, 0.8, 0.5, 0.2])
+    np.testing.assert_array_equal(curve['tp'], [1, 2, 2, 3])
+    np.testing.assert_allclose(curve['precision'], [1.0, 2 / 3, 0.5, 0.6])
+    np.testing.assert_allclose(curve['recall'], [1 / 3, 2 / 3, 2 / 3, 1.0])
+    np.testing.assert_allclose(curve['flag_rate'], [0.2, 0.6, 0.8, 1.0])
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'flag_precision': 0.6},
+    {'flag_precision': 0.99},
+    {'high_precision': 0.3, 'medium_recall': 0.2},
+    {'medium_recall': 0.999},
+])
+def test_choose_thresholds_keeps_order(overrides):
+    curve  = recalibrate.sweep(*scored())
+    chosen = recalibrate.choose_thresholds(curve, CURRENT, options(**overrides))
+    assert chosen['medium'] <= chosen['flag'] <= chosen['high']
+
+
+def test_choose_thresholds_picks_documented_cutoffs():
+    scores, labels = scored()
+    curve  = recalibrate.sweep(scores, labels)
+    chosen = recalibrate.choose_thresholds(curve, CURRENT, options(flag_precision=0.6))
+
+    flagged = scores >= chosen['high']
+    assert labels[flagged].mean() >= 0.8 and labels[flagged].sum() >= 10
+    assert labels[scores >= chosen['flag']].mean() >= 0.6
+    assert labels[scores >= chosen['medium']].sum() >= 0.9 * labels.sum()
+
+
+def test_choose_thresholds_falls_back_without_support():
+    curve = recalibrate.sweep(*scored())
+    flag  = recalibrate.choose_thresholds(curve, CURRENT, options())['flag']
+
+    chosen = recalibrate.choose_thresholds(curve, CURRENT, options(min_support=10**6))
+    assert chosen['high'] == round(max(flag, CURRENT['high']), 4)
+
+    low    = {**CURRENT, 'high': 0.0}
+    chosen = recalibrate.choose_thresholds(curve, low, options(min_support=10**6))
+    assert chosen['high'] == chosen['flag']
+
+
+def test_monitor_saves_periodically(tmp_path):
+    path    = str(tmp_path / 'drift_monitor.npz')
+    monitor = DriftMonitor(baseline_size=1, path=path, save_seconds=0)
+    monitor.observe(row(fraud_probability=0.4))
+
+    deadline = time.monotonic() + 10
+    while (monitor._saving or not os.path.exists(path)) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    restored = DriftMonitor(baseline_size=1)
+    assert restored.restore(path)
+    assert restored.snapshot()['metrics']['fraud_probability']['window_count'] == 1
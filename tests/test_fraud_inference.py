@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.fraud_classifier import predict
+from tests.conftest import make_claims
+
+
+@pytest.fixture
+def claims(fraud_artifact_path):
+    predict.load_fraud_model(fraud_artifact_path)
+    return make_claims(300)
+
+
+def reference_proba(claims) -> np.ndarray:
+    # The sklearn wrapper's predict_proba on the same encoding as training
+    X = pd.DataFrame([predict.encode_claim(c) for c in claims], columns=predict.FEATURE_COLS)
+    return predict._artifact['model'].predict_proba(X.astype(int))[:, 1]
+
+
+def test_fast_path_matches_predict_proba(claims):
+    fast = np.array([predict.predict_proba_fast(c) for c in claims])
+    np.testing.assert_allclose(fast, reference_proba(claims), atol=1e-6)
+
+
+def test_pandas_path_matches_predict_proba(claims):
+    ref = np.array([predict.predict_proba_pandas(c) for c in claims])
+    np.testing.assert_allclose(ref, reference_proba(claims), atol=1e-6)
+
+
+def test_batch_matches_predict_proba(claims):
+    batch = predict.predict_fraud_batch_proba(claims)
+    assert batch.shape == (len(claims),)
+    np.testing.assert_allclose(batch, reference_proba(claims), atol=1e-6)
+
+
+def test_batch_decisions_match_single(claims):
+    assert predict.predict_fraud_batch(claims[:50]) == [predict.predict_fraud(c) for c in claims[:50]]
+
+
+def test_batch_without_booster_raises(claims, monkeypatch):
+    monkeypatch.setattr(predict, '_booster', None)
+    with pytest.raises(RuntimeError, match='no XGBoost booster'):
+        predict.predict_fraud_batch_proba(claims)
@@ -0,0 +1,129 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.fraud_classifier.artifact import (
+    load_artifact, resolve_artifact_path, save_native, update_artifact
+)
+from models.fraud_classifier.predict import FEATURE_COLS
+from tests.conftest import make_claims
+
+
+def claims_frame(n=200):
+    rows = make_claims(n, seed=3)
+    # Numeric encoding as the predictor does it: strings become 0
+    return pd.DataFrame(
+        [[0 if isinstance(c[col], str) else c[col] for col in FEATURE_COLS] for c in rows],
+        columns=FEATURE_COLS
+    )
+
+
+@pytest.mark.parametrize('ext', ['.ubj', '.json'])
+def test_native_booster_matches_pickle(fraud_artifact_path, tmp_path, ext):
+    artifact = joblib.load(fraud_artifact_path)
+    native   = str(tmp_path / f'xgb_fraud_model{ext}')
+    save_native(artifact, native)
+
+    _, loaded = load_artifact(native, resolve=False)
+    X = claims_frame()
+    np.testing.assert_array_equal(
+        loaded['model'].predict_proba(X), artifact['model'].predict_proba(X)
+    )
+    assert loaded['feature_cols'] == FEATURE_COLS
+
+
+def test_native_booster_without_n_classes(fraud_artifact_path, tmp_path):
+    # Pickles from older XGBoost versions unpickle without n_classes_
+    artifact = joblib.load(fraud_artifact_path)
+    expected = artifact['model'].predict_proba(claims_frame())
+    del artifact['model'].n_classes_
+    save_native(artifact, str(tmp_path / 'old.ubj'))
+
+    _, loaded = load_artifact(str(tmp_path / 'old.ubj'), resolve=False)
+    np.testing.assert_array_equal(loaded['model'].predict_proba(claims_frame()), expected)
+
+
+def test_converted_artifact_is_preferred(fraud_artifact_path, tmp_path):
+    pkl = tmp_path / 'xgb_fraud_model.pkl'
+    pkl.write_bytes(open(fraud_artifact_path, 'rb').read())
+    assert resolve_artifact_path(str(pkl)) == str(pkl)
+    save_native(joblib.load(pkl), str(tmp_path / 'xgb_fraud_model.ubj'))
+    assert resolve_artifact_path(str(pkl)) == str(tmp_path / 'xgb_fraud_model.ubj')
+
+
+def age(path, seconds=60):
+    # Pretend path was written a minute before its neighbours
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+
+
+def test_stale_conversion_is_ignored(fraud_artifact_path, tmp_path):
+    pkl = str(tmp_path / 'xgb_fraud_model.pkl')
+    ubj = str(tmp_path / 'xgb_fraud_model.ubj')
+    artifact = joblib.load(fraud_artifact_path)
+    joblib.dump(artifact, pkl)
+    save_native(joblib.load(pkl), ubj, source=pkl)
+
+    # Same .pkl, but a checkout left it newer: the recorded hash still matches
+    age(ubj)
+    assert resolve_artifact_path(pkl) == ubj
+
+    # Retrained .pkl: the old conversion is not served
+    artifact['retrained'] = True
+    joblib.dump(artifact, pkl)
+    assert resolve_artifact_path(pkl) == pkl
+
+    # Metadata updates keep a conversion that matched the old .pkl current
+    save_native(joblib.load(pkl), ubj, source=pkl)
+    age(ubj)
+    update_artifact(pkl, {'thresholds': {'medium': 0.3, 'flag': 0.5, 'high': 0.7}})
+    assert resolve_artifact_path(pkl) == ubj
+    _, loaded = load_artifact(pkl)
+    assert loaded['thresholds']['flag'] == 0.5 and 'source_sha256' not in loaded
+
+
+def test_safetensors_round_trip(tmp_path):
+    torch = pytest.importorskip('torch')
+    pytest.importorskip('timm')
+    pytest.importorskip('safetensors')
+    from models.damage_classifier.model import DamageClassifier, load_safetensors_mmap
+
+    torch.manual_seed(0)
+    original = DamageClassifier(num_classes=3, pretrained=False).eval()
+    original.save(tmp_path / 'best_model.pt')
+    original.save(tmp_path / 'best_model.safetensors')
+
+    mapped = load_safetensors_mmap(tmp_path / 'best_model.safetensors')
+    state  = original.state_dict()
+    assert mapped.keys() == state.keys()
+    for name, tensor in state.items():
+        assert torch.equal(mapped[name], tensor), name
+
+    x = torch.randn(2, 3, 224, 224)
+    with torch.no_grad():
+        expected = original(x)
+        for path in ('best_model.pt', 'best_model.safetensors'):
+            loaded = DamageClassifier.load(tmp_path / path)
+            assert not any(t.is_meta for t in loaded.state_dict().values())
+            assert torch.equal(loaded(x), expected), path
+
+
+def test_stale_safetensors_is_ignored(tmp_path):
+    torch = pytest.importorskip('torch')
+    pytest.importorskip('timm')
+    pytest.importorskip('safetensors')
+    from models.damage_classifier.model import DamageClassifier, resolve_weights_path
+
+    pt, converted = tmp_path / 'best_model.pt', tmp_path / 'best_model.safetensors'
+    torch.manual_seed(0)
+    DamageClassifier(num_classes=3, pretrained=False).save(pt)
+    DamageClassifier.load(pt).save(converted, source=pt)
+    age(converted)
+    assert resolve_weights_path(pt) == str(converted)
+
+    torch.manual_seed(1)
+    DamageClassifier(num_classes=3, pretrained=False).save(pt)
+    assert resolve_weights_path(pt) == str(pt)
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from models import segment_store
+from models.damage_classifier.photo_index import MAX_SUPPORTED_DISTANCE, PhotoIndex
+
+DIM = 32
+
+
+def photos(n, seed=0):
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2**63, n, dtype=np.uint64)
+    # Non-negative, narrow-cone embeddings like pooled CNN features
+    embeddings = np.maximum(1.0 + 0.5 * rng.standard_normal((n, DIM)), 0).astype(np.float32)
+    return [f'C{seed}-{i}' for i in range(n)], hashes, embeddings
+
+
+def flip(phash, bits):
+    for b in bits:
+        phash ^= 1 << b
+    return phash
+
+
+def found(index, claim_id, phash, embedding):
+    phash = int(phash) if phash is not None else None
+    return any(m['claim_id'] == claim_id for m in index.query(phash, embedding))
+
+
+def test_save_and_reload_finds_near_duplicates(tmp_path):
+    ids, hashes, embs = photos(500)
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    index.add_many(ids, hashes, embs)
+    assert index.save() == 500
+
+    reloaded = PhotoIndex.load(str(tmp_path))
+    assert len(reloaded) == 500
+    assert found(reloaded, 'C0-7', flip(int(hashes[7]), [1, 20, 40, 60]), None)
+    assert found(reloaded, 'C0-9', None, embs[9] * 1.001)
+
+
+def test_unsaved_photos_are_queryable(tmp_path):
+    ids, hashes, embs = photos(10)
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    index.add_many(ids, hashes, embs)
+    assert found(index, 'C0-3', hashes[3], None)
+    assert not os.path.exists(tmp_path / 'manifest.json')
+
+
+def test_save_is_noop_without_new_photos(tmp_path):
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    assert index.save() == 0
+    index.add_many(*photos(5))
+    index.save()
+    assert index.save() == 0
+    with open(tmp_path / 'manifest.json') as f:
+        assert len(json.load(f)['segments']) == 1
+
+
+def test_flushes_after_flush_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(segment_store, 'FLUSH_ROWS', 8)
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    index.add_many(*photos(8))
+
+    deadline = time.monotonic() + 10
+    while not os.path.exists(tmp_path / 'manifest.json') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    while index._flushing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(PhotoIndex.load(str(tmp_path))) == 8
+
+
+def test_workers_sharing_a_directory_keep_each_others_photos(tmp_path):
+    a = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    b = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    ids_a, hashes_a, embs_a = photos(20, seed=1)
+    ids_b, hashes_b, embs_b = photos(30, seed=2)
+    a.add_many(ids_a, hashes_a, embs_a)
+    b.add_many(ids_b, hashes_b, embs_b)
+    a.save()
+    b.save()
+
+    # b's flush picked up a's segment as well
+    assert len(b) == 50
+    assert found(b, 'C1-4', hashes_a[4], None)
+    assert len(PhotoIndex.load(str(tmp_path))) == 50
+
+
+def test_compaction_merges_small_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(segment_store, 'MAX_SEGMENTS', 3)
+    monkeypatch.setattr(segment_store, 'MERGE_FACTOR', 2)
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    batches = [photos(10 + i, seed=i) for i in range(6)]
+    for batch in batches:
+        index.add_many(*batch)
+        index.save()
+
+    assert len(index._segments) <= 3
+    assert len(index) == sum(len(ids) for ids, _, _ in batches)
+    reloaded = PhotoIndex.load(str(tmp_path))
+    for ids, hashes, _ in batches:
+        assert found(reloaded, ids[-1], hashes[-1], None)
+    on_disk = {name for name in os.listdir(tmp_path) if name.startswith('seg-')}
+    assert on_disk == {seg.name for seg in reloaded._segments}
+
+
+def test_rejects_unsupported_max_distance(tmp_path):
+    index = PhotoIndex(str(tmp_path), embedding_dim=DIM)
+    index.query(0, max_distance=MAX_SUPPORTED_DISTANCE)
+    with pytest.raises(ValueError):
+        index.query(0, max_distance=MAX_SUPPORTED_DISTANCE + 1)
@@ -0,0 +1,79 @@
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip('torch')
+from PIL import Image  # noqa: E402
+
+from models import review_queue  # noqa: E402
+from models.review_queue import ReviewJob  # noqa: E402
+
+
+def photo_zip(names) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for name in names:
+            img = io.BytesIO()
+            Image.new('RGB', (16, 16), (len(name) * 10, 0, 0)).save(img, format='JPEG')
+            zf.writestr(f'{name}.jpg', img.getvalue())
+    return buf.getvalue()
+
+
+def fraud_result(claim):
+    if claim.get('claim_id') == 'BAD':
+        raise ValueError('bad claim')
+    return {'fraud_probability': 0.3, 'risk_level': 'LOW', 'fraud_flag': False,
+            'recommendation': 'Proceed with standard claim processing.'}
+
+
+@pytest.fixture(autouse=True)
+def stub_models(monkeypatch):
+    monkeypatch.setattr(review_queue, '_row_cache', review_queue.OrderedDict())
+    monkeypatch.setattr(review_queue, 'predict_damage_batch', lambda imgs, batch_size=32, return_embedding=False: [
+        {'severity': 'minor', 'confidence': 0.8, 'embedding': None} for _ in imgs])
+    monkeypatch.setattr(review_queue, 'predict_fraud_batch', lambda claims: [fraud_result(c) for c in claims])
+    monkeypatch.setattr(review_queue, 'run_velocity', lambda claim: None)
+    monkeypatch.setattr(review_queue, 'run_photo_match', lambda img, emb, claim_id=None: [])
+    monkeypatch.setattr(review_queue, 'record_claim', lambda claim: None)
+
+    def nlp(text, claim_id=None):
+        if text == 'explode':
+            raise RuntimeError('nlp blew up')
+        return {'anomaly_score': 0.1, 'triggered_keywords': []}
+
+    monkeypatch.setattr(review_queue, 'run_nlp', nlp)
+
+
+def run(claims, names):
+    job = ReviewJob(claims, photo_zip(names), batch_size=4).start()
+    job._thread.join(timeout=10)
+    assert not job.running
+    return job
+
+
+def test_failing_row_does_not_abort_the_job():
+    claims = [{'claim_id': f'C{i}', 'incident_description': 'explode' if i == 1 else 'ok'}
+              for i in range(6)]
+    job = run(claims, [c['claim_id'] for c in claims])
+
+    assert job.error is None
+    assert job.done == 6
+    errors = {row['claim_id']: row['error'] for row in job.results()}
+    assert errors.pop('C1') == 'scoring failed: nlp blew up'
+    assert set(errors.values()) == {None}
+
+
+def test_failing_batch_call_only_fails_the_bad_claim():
+    claims = [{'claim_id': cid} for cid in ('C0', 'BAD', 'C2')]
+    job = run(claims, ['C0', 'BAD', 'C2'])
+
+    rows = {row['claim_id']: row for row in job.results()}
+    assert rows['BAD']['error'] == 'scoring failed: bad claim'
+    assert rows['C0']['error'] is None and rows['C2']['error'] is None
+
+
+def test_zip_is_dropped_when_the_job_finishes():
+    job = run([{'claim_id': 'C0'}, {'claim_id': 'MISSING'}], ['C0'])
+    assert job._zip is None
+    assert [row['error'] for row in job.results()] == [None, 'image not found in zip']
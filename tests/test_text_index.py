@@ -0,0 +1,119 @@
+import json
+import os
+import time
+
+import pytest
+
+from models import segment_store
+from models.claim_nlp import text_index
+from models.claim_nlp.text_index import TextIndex
+
+NARRATIVE = ('my car was parked outside the {} office on {} street when a truck '
+             'reversed into the rear bumper and drove off without stopping')
+
+
+def texts(n, offset=0):
+    return [NARRATIVE.format(f'plaza{i}', f'elm{i * 7}') for i in range(offset, offset + n)]
+
+
+def matched(index, claim_id, text):
+    return any(m['claim_id'] == claim_id for m in index.query(text))
+
+
+def test_save_and_reload_finds_near_duplicates(tmp_path):
+    index = TextIndex(str(tmp_path))
+    for i, text in enumerate(texts(50)):
+        index.add(f'T{i}', text)
+    assert index.save() == 50
+
+    reloaded = TextIndex.load(str(tmp_path))
+    assert len(reloaded) == 50
+    edited = texts(1, offset=12)[0].replace('truck', 'van')
+    assert reloaded.query(edited)[0]['claim_id'] == 'T12'
+
+
+def test_unsaved_claims_are_queryable_and_save_is_noop_after(tmp_path):
+    index = TextIndex(str(tmp_path))
+    index.add('T0', texts(1)[0])
+    assert matched(index, 'T0', texts(1)[0])
+    assert index.save() == 1
+    assert index.save() == 0
+    with open(tmp_path / 'manifest.json') as f:
+        assert len(json.load(f)['segments']) == 1
+
+
+def test_flushes_after_flush_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(segment_store, 'FLUSH_ROWS', 4)
+    index = TextIndex(str(tmp_path))
+    for i, text in enumerate(texts(4)):
+        index.add(f'T{i}', text)
+
+    deadline = time.monotonic() + 10
+    while not os.path.exists(tmp_path / 'manifest.json') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    while index._flushing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(TextIndex.load(str(tmp_path))) == 4
+
+
+def test_workers_sharing_a_directory_keep_each_others_claims(tmp_path):
+    a, b = TextIndex(str(tmp_path)), TextIndex(str(tmp_path))
+    for i, text in enumerate(texts(5)):
+        a.add(f'A{i}', text)
+    for i, text in enumerate(texts(5, offset=100)):
+        b.add(f'B{i}', text)
+    a.save()
+    b.save()
+
+    assert len(b) == 10
+    assert matched(b, 'A3', texts(5)[3])
+    assert len(TextIndex.load(str(tmp_path))) == 10
+
+
+def test_compaction_merges_small_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(segment_store, 'MAX_SEGMENTS', 3)
+    monkeypatch.setattr(segment_store, 'MERGE_FACTOR', 2)
+    index = TextIndex(str(tmp_path))
+    for batch in range(6):
+        for i, text in enumerate(texts(3, offset=batch * 10)):
+            index.add(f'T{batch}-{i}', text)
+        index.save()
+
+    assert len(index._segments) <= 3
+    reloaded = TextIndex.load(str(tmp_path))
+    assert len(reloaded) == 18
+    for batch in range(6):
+        assert matched(reloaded, f'T{batch}-2', texts(1, offset=batch * 10 + 2)[0])
+    on_disk = {name for name in os.listdir(tmp_path) if name.startswith('seg-')}
+    assert on_disk == {seg.name for seg in reloaded._segments}
+
+
+def test_query_scores_without_holding_the_lock(tmp_path, monkeypatch):
+    index = TextIndex(str(tmp_path))
+    for i, text in enumerate(texts(3)):
+        index.add(f'T{i}', text)
+    index.save()
+    index.add('T3', texts(1, offset=3)[0])
+
+    probe = text_index._Segment.signatures_for
+
+    def signatures_for(segment, rows):
+        # add() must not wait behind a query's candidate scan
+        assert not index._lock.locked()
+        return probe(segment, rows)
+
+    monkeypatch.setattr(text_index._Segment, 'signatures_for', signatures_for)
+    assert matched(index, 'T1', texts(2)[1])
+    assert matched(index, 'T3', texts(1, offset=3)[0])
+
+
+def test_indexing_failure_keeps_nlp_score(monkeypatch):
+    pytest.importorskip('torch')
+    from models import pipeline
+
+    def broken(claim_id, text):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(pipeline, 'score_text', lambda text, claim_id=None, semantic=True: {'anomaly_score': 0.3})
+    monkeypatch.setattr(pipeline, 'index_claim_text', broken)
+    assert pipeline.nlp_stage('rear bumper damage', claim_id='C1') == {'anomaly_score': 0.3}